@@ -0,0 +1 @@
+# Shared helpers used by both analysis projects (project/ and extra_project/).
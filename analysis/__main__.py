@@ -0,0 +1,7 @@
+# python -m analysis jobs|gym|batch ... (see cli.py)
+import sys
+
+from .cli import main
+
+if __name__ == "__main__":
+    sys.exit(main())
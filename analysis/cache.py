@@ -0,0 +1,139 @@
+# On-disk cache of parsed datasets.
+# The first time a JSON file is loaded, the parsed data is written as a pickle snapshot into a
+# ".cache" directory next to the source file. Later loads of the same, unchanged file read the
+# snapshot instead and skip JSON parsing entirely.
+#
+# A snapshot is keyed on the absolute source path plus its modification time and size (and
+# optionally a hash of the content), so editing the file invalidates it automatically. The cache
+# directory is capped in size: when it grows beyond max_bytes, the least recently used snapshots
+# are deleted first.
+import hashlib
+import os
+import pickle
+
+CACHE_DIR_NAME = ".cache"
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024  # 512 MB
+SNAPSHOT_SUFFIX = ".pickle"
+
+
+# Default cache directory for a source file: a ".cache" directory next to it
+def default_cache_dir(path):
+    return os.path.join(os.path.dirname(os.path.abspath(path)), CACHE_DIR_NAME)
+
+
+# Hash the content of a file in blocks
+def file_digest(path, block_size=1024 * 1024):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# Build the snapshot file name for a source file
+# The first part identifies the source path, the second part its current version.
+# variant tells apart snapshots of the same file parsed in different ways.
+def snapshot_name(path, use_hash=False, variant=""):
+    path = os.path.abspath(path)
+    info = os.stat(path)
+    version = f"{info.st_mtime_ns}:{info.st_size}"
+    if use_hash:
+        version += ":" + file_digest(path)
+    source = f"{path}#{variant}" if variant else path
+    path_key = hashlib.sha1(source.encode("utf-8")).hexdigest()[:16]
+    version_key = hashlib.sha1(version.encode("utf-8")).hexdigest()[:16]
+    return f"{path_key}-{version_key}{SNAPSHOT_SUFFIX}"
+
+
+# List the snapshots in a cache directory as (last used time, size, path), least recently used first
+def list_snapshots(cache_dir):
+    snapshots = []
+    if not os.path.isdir(cache_dir):
+        return snapshots
+    for name in os.listdir(cache_dir):
+        if name.endswith(SNAPSHOT_SUFFIX):
+            snapshot = os.path.join(cache_dir, name)
+            try:
+                info = os.stat(snapshot)
+            except OSError:
+                continue
+            snapshots.append((info.st_mtime_ns, info.st_size, snapshot))
+    snapshots.sort()
+    return snapshots
+
+
+# Delete the least recently used snapshots until the cache directory fits in max_bytes
+def evict(cache_dir, max_bytes=DEFAULT_MAX_BYTES):
+    snapshots = list_snapshots(cache_dir)
+    total = sum(size for _, size, _ in snapshots)
+    removed = []
+    for _, size, snapshot in snapshots:
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(snapshot)
+        except OSError:
+            continue
+        total -= size
+        removed.append(snapshot)
+    return removed
+
+
+# Delete every snapshot in a cache directory
+def clear_cache(cache_dir):
+    for _, _, snapshot in list_snapshots(cache_dir):
+        try:
+            os.remove(snapshot)
+        except OSError:
+            pass
+
+
+# Load a file through the cache
+# parse(path) is only called when there is no valid snapshot for the current version of the file.
+# Its result is then stored (unless it is None) so the next call can skip parsing.
+# Give each different parse function its own variant name, so their snapshots are kept apart.
+# to_snapshot and from_snapshot convert the data to what is pickled and back, e.g. to store plain
+# values instead of objects of a class that is imported under different module paths.
+def cached_load(path, parse, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES, use_hash=False, variant="",
+                to_snapshot=None, from_snapshot=None):
+    if cache_dir is None:
+        cache_dir = default_cache_dir(path)
+    name = snapshot_name(path, use_hash, variant)
+    snapshot = os.path.join(cache_dir, name)
+
+    # Warm start: read the snapshot and mark it as recently used
+    # Any error while unpickling is a cache miss, not a failed load: besides a damaged file, a
+    # snapshot can name a class this process cannot import (e.g. one pickled under another module
+    # path). The file is then parsed again and the snapshot rewritten.
+    try:
+        with open(snapshot, 'rb') as file:
+            data = pickle.load(file)
+        if from_snapshot is not None:
+            data = from_snapshot(data)
+        os.utime(snapshot)
+        return data
+    except FileNotFoundError:
+        pass
+    except Exception as error:
+        print(f"Ignoring unreadable cache snapshot {snapshot}: {error!r}")
+
+    data = parse(path)
+    if data is None:
+        return None
+
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        # Older snapshots of the same source file can never be used again
+        path_key = name.split("-")[0]
+        for _, _, old in list_snapshots(cache_dir):
+            if os.path.basename(old).startswith(path_key + "-"):
+                os.remove(old)
+        # Write to a temporary file first so a crash never leaves a half-written snapshot
+        temp_file = f"{snapshot}.{os.getpid()}.tmp"
+        with open(temp_file, 'wb') as file:
+            pickle.dump(data if to_snapshot is None else to_snapshot(data), file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_file, snapshot)
+        evict(cache_dir, max_bytes)
+    except OSError as error:
+        print(f"Could not write cache snapshot {snapshot}: {error}")
+    return data
@@ -0,0 +1,380 @@
+# Command line interface of both analyses, run from the repository root:
+#   python -m analysis jobs --org "Kasvatus ja oppiminen, Perusopetus" --format csv --output-dir out
+#   python -m analysis jobs --source jobs.json --compact --near 24.94 60.17 5
+#   python -m analysis gym --source extra_project/json --start 2021-08-01 --end 2021-08-31 \
+#                          --filter groupId=OG30 --filter area=Pirkkola --output pirkkola.txt
+#   python -m analysis batch reports.json
+#
+# Start-up is kept short: this module only imports argparse, and each command imports the
+# analysis modules it runs when it runs. The analysis modules in turn import their optional
+# backends (NumPy for distances, the sketches of --approximate, asyncio for several feeds, the
+# HTTP stack for URLs, sqlite3 for --archive) only when they are used, so e.g. a gym report on a
+# local file loads none of them. Measure it with:
+#   python -X importtime -m analysis gym --help
+#
+# batch runs many reports over one loaded dataset in a single process. The configuration file is
+# a JSON object with a "jobs" and/or a "gym" section. A section takes the data options of its
+# command and a list of reports, each with the report options of the command (without the
+# leading "--", "-" written as "_", the filters as an object):
+#   {
+#     "jobs": {"source": "jobs.json", "compact": true,
+#              "reports": [{"org": "Kasvatus ja oppiminen, Perusopetus", "output_dir": "out/perusopetus"},
+#                          {"org": "Kaupunkiympäristö", "output_dir": "out/ymparisto", "format": "csv"}]},
+#     "gym": {"source": "extra_project/json",
+#             "reports": [{"filter": {"area": "Pirkkola"}, "output": "out/pirkkola.txt"},
+#                         {"filter": {"area": "Kivistö"}, "top_key": "groupId", "output": "out/kivisto.txt"}]}
+#   }
+# The job postings are loaded once for all the job reports, and the aggregates of all the gym
+# reports are registered in one engine, so the gym data is read once as well. Every stage is
+# timed with the ANALYSIS_* environment variables of analysis/instrument.py.
+import argparse
+import json
+import os
+from datetime import date
+from pathlib import Path
+
+from .instrument import Instrument
+
+ROOT = Path(__file__).resolve().parents[1]
+JOBS_URL = "http://gis.vantaa.fi/rest/tyopaikat/v1/kaikki"
+GYM_FILE = str(ROOT / "extra_project" / "json" / "ulkoliikunta-daily-2021.json")
+
+# Options of a job report and their defaults (the report of data_analysis.py)
+JOB_REPORT = {
+    "org": "Kasvatus ja oppiminen, Toisen asteen koulutus",
+    "output_dir": ".",
+    "format": "text",
+    "today": None,
+    "near": None,
+    "breakdown": None,
+}
+# Options of a gym report and their defaults (the report of gym_data_analysis.py)
+GYM_REPORT = {
+    "start": "2021-08-01",
+    "end": "2021-08-30",
+    "filter": {"groupId": "OG30", "area": "Pirkkola"},
+    "date_key": "utcdate",
+    "top_key": "area",
+    "k": 5,
+    "stats_key": "usageMinutes",
+    "distinct_key": "groupId",
+    "output": "gym_data_analysis.txt",
+}
+# Data options of the batch sections
+JOB_DATA = {"source": JOBS_URL, "compact": False, "cache": False, "archive": None}
+GYM_DATA = {"source": GYM_FILE, "workers": 1, "approximate": False, "raw": False}
+
+EXTENSIONS = {"text": ".txt", "csv": ".csv", "jsonl": ".jsonl", "columnar": ".columnar.jsonl"}
+
+
+# Start and end bounds of a date filter; a plain day ("2021-08-01") covers the whole day
+def date_bounds(start, end):
+    if len(start) == 10:
+        start += "T00:00:00.000Z"
+    if len(end) == 10:
+        end += "T23:59:59.999Z"
+    return start, end
+
+
+# Parse repeated key=value options into a dict
+def parse_filters(values):
+    filters = {}
+    for value in values:
+        key, sep, wanted = value.partition("=")
+        if not sep or not key:
+            raise ValueError(f"Expected key=value, got: {value}")
+        filters[key] = wanted
+    return filters
+
+
+# Fill in the defaults of a configuration, rejecting unknown options
+def with_defaults(config, defaults, section):
+    unknown = sorted(set(config) - set(defaults))
+    if unknown:
+        raise ValueError(f"Unknown {section} option(s): {', '.join(unknown)}")
+    return {**defaults, **config}
+
+
+def ensure_dir(path):
+    if path:
+        os.makedirs(path, exist_ok=True)
+
+
+# Load the job postings once and write every report of reports over them
+# source is a URL or file, or a list of them (downloaded concurrently and concatenated).
+# Returns the number of postings, or None when the data could not be loaded.
+def run_job_reports(source, reports, compact=False, cache=False, archive=None, instrument=None):
+    from project.src import data_analysis
+
+    instrument = instrument or Instrument()
+    reports = [with_defaults(report, JOB_REPORT, "job report") for report in reports]
+    sources = [source] if isinstance(source, str) else list(source)
+    with instrument.stage("load_json", inputs=[path for path in sources if os.path.isfile(path)]) as stage:
+        if len(sources) == 1:
+            data = data_analysis.load_json(sources[0], use_cache=cache, compact=compact)
+        else:
+            loaded = data_analysis.load_json_sources(dict(enumerate(sources)), compact=compact)
+            data = None if any(part is None for part in loaded.values()) else \
+                [entry for part in loaded.values() for entry in part]
+        stage.rows = len(data) if data else 0
+    if not data:
+        return None
+    rows = len(data)
+
+    # Counted once and shared by all the reports
+    with instrument.stage("job_posting_stats", rows=rows):
+        stats = data_analysis.JobPostingStats(data)
+    with instrument.stage("calculate_summary_statistics", rows=rows):
+        summary = data_analysis.calculate_summary_statistics(data, stats)
+    with instrument.stage("job_posting_analysis", rows=rows):
+        analysis = data_analysis.job_posting_analysis(data, stats)
+    if archive:
+        with instrument.stage("archive_postings", rows=rows, outputs=[archive]):
+            changes = data_analysis.archive_postings(data, archive)
+        if changes:
+            print(f"Archived to {archive}: {changes['added']} added, {changes['changed']} changed, "
+                  f"{changes['removed']} removed")
+
+    deadlines = {}   # today -> result of check_application_deadlines
+    for number, report in enumerate(reports):
+        today = report["today"]
+        if today not in deadlines:
+            with instrument.stage("check_application_deadlines", rows=rows, today=today):
+                deadlines[today] = data_analysis.check_application_deadlines(
+                    data, date.fromisoformat(today) if today else None)
+        write_job_report(data, stats, summary, analysis, deadlines[report["today"]], report, instrument, number)
+    return rows
+
+
+# Write the reports of one job report configuration into its output directory
+# stats is the JobPostingStats of data.
+def write_job_report(data, stats, summary, analysis, deadlines, report, instrument, number=0):
+    from project.src import data_analysis
+
+    rows = len(data)
+    output_dir = report["output_dir"]
+    ensure_dir(output_dir)
+    extension = EXTENSIONS[report["format"]]
+    org = report["org"]
+    with instrument.stage("filter_and_count_job_titles", rows=rows, report=number):
+        job_titles = data_analysis.filter_and_count_job_titles(data, org, stats=stats)
+
+    txt_file = os.path.join(output_dir, "report.txt")
+    csv_file = os.path.join(output_dir, "report.csv")
+    with instrument.stage("generate_reports", rows=rows, outputs=[txt_file, csv_file], report=number):
+        data_analysis.generate_reports(data, summary, analysis, org, job_titles, txt_file, csv_file)
+
+    listings = [
+        ("expired_jobs", deadlines["expired_postings"], "Expired Job Postings"),
+        ("available_jobs", deadlines["open_postings"], "Available Job Postings"),
+    ]
+    if report["near"]:
+        lon, lat, radius_km = report["near"]
+        with instrument.stage("find_jobs_near", rows=rows, report=number):
+            today = date.fromisoformat(report["today"]) if report["today"] else None
+            near = data_analysis.find_jobs_near(data, lon, lat, radius_km, open_only=True, today=today)
+        listings.append(("near_jobs", near, f"Open Job Postings within {radius_km} km of ({lon}, {lat})"))
+    if report["breakdown"]:
+        output_file = os.path.join(output_dir, "titles_by_organization" + extension)
+        with instrument.stage("write_title_breakdown", rows=rows, outputs=[output_file], report=number):
+            data_analysis.write_title_breakdown(data, output_file, report["format"],
+                                                by_field=report["breakdown"] == "field", stats=stats)
+    for name, postings, title in listings:
+        output_file = os.path.join(output_dir, name + extension)
+        with instrument.stage("write_job_listing", rows=len(postings), outputs=[output_file], report=number):
+            data_analysis.write_job_listing(postings, output_file, report["format"],
+                                            title=f"Total: {len(postings)}\n{title}")
+    print(f"Job reports written to: {output_dir}")
+
+
+# Results of the gym reports from raw scans of one memory-mapped JSON file (see gym_rawscan.py),
+# under the aggregate names of run_gym_reports
+def raw_scan_results(source, reports, names):
+    from extra_project.src.gym_rawscan import RawScanner
+
+    with RawScanner(source) as scanner:
+        results = {"total_entries": scanner.count()}
+        for report, (frequent, statistics, distinct, filtered) in zip(reports, names):
+            if frequent not in results:
+                results[frequent] = scanner.frequencies(report["top_key"], report["k"])
+            if statistics not in results:
+                results[statistics] = scanner.statistics(report["stats_key"])
+            if distinct not in results:
+                results[distinct] = scanner.distinct(report["distinct_key"])
+            start, end = date_bounds(report["start"], report["end"])
+            results[filtered] = list(scanner.records(report["filter"], report["date_key"], start, end))
+    return results
+
+
+# Read the gym data once and write every report of reports
+# source is a JSON file, a directory of JSON files or a list of URLs. A directory, or a file with
+# workers other than 1, is analysed in parallel (see gym_parallel.py). With raw=True a single file
+# is answered with raw scans instead of parsing it.
+# Returns the number of entries read.
+def run_gym_reports(source, reports, workers=1, approximate=False, raw=False, instrument=None):
+    from extra_project.src.gym_aggregates import (AggregationEngine, CountAggregate, DistinctAggregate,
+                                                  FilterAggregate, FrequencyAggregate, StatisticsAggregate)
+    from extra_project.src.gym_data_analysis import generate_report, stream_json_file
+    if approximate:
+        from extra_project.src.gym_sketches import ApproxDistinctAggregate as DistinctAggregate
+        from extra_project.src.gym_sketches import ApproxFrequencyAggregate as FrequencyAggregate
+        from extra_project.src.gym_sketches import ApproxStatisticsAggregate as StatisticsAggregate
+    # The report shows the median: exact, which keeps every value of stats_key in memory (O(n)),
+    # or from the fixed-memory KLL sketch with its rank error
+    statistics_options = {} if approximate else {"median": True}
+
+    instrument = instrument or Instrument()
+    reports = [with_defaults(report, GYM_REPORT, "gym report") for report in reports]
+    # Reports asking for the same statistic share one aggregate
+    engine = AggregationEngine()
+    engine.register("total_entries", CountAggregate())
+    names = []
+    for number, report in enumerate(reports):
+        frequent = f"frequent:{report['top_key']}:{report['k']}"
+        statistics = f"statistics:{report['stats_key']}"
+        distinct = f"distinct:{report['distinct_key']}"
+        filtered = f"filtered:{number}"
+        for name, make in ((frequent, lambda: FrequencyAggregate(report["top_key"], report["k"])),
+                           (statistics, lambda: StatisticsAggregate(report["stats_key"], **statistics_options)),
+                           (distinct, lambda: DistinctAggregate(report["distinct_key"]))):
+            if name not in engine.aggregates:
+                engine.register(name, make())
+        start, end = date_bounds(report["start"], report["end"])
+        engine.register(filtered, FilterAggregate(report["date_key"], start, end, report["filter"].items()))
+        names.append((frequent, statistics, distinct, filtered))
+
+    remote = not isinstance(source, str) or source.startswith(("http://", "https://"))
+    if raw and (remote or not os.path.isfile(source)):
+        raise ValueError("Raw scans need a single local JSON file")
+    inputs = [] if remote else [source]
+    with instrument.stage("raw_scan" if raw else "aggregate", inputs=inputs,
+                          aggregates=list(engine.aggregates)) as stage:
+        if raw:
+            results = raw_scan_results(source, reports, names)
+        elif remote:
+            from extra_project.src.gym_parallel import run_remote
+            results = run_remote(engine, [source] if isinstance(source, str) else source)
+        elif os.path.isdir(source) or workers != 1:
+            from extra_project.src.gym_parallel import run_parallel
+            results = run_parallel(engine, source, workers)
+        else:
+            results = engine.run(stream_json_file(source))
+        stage.rows = results["total_entries"]
+    if not results["total_entries"]:
+        return 0
+
+    for report, (frequent, statistics, distinct, filtered) in zip(reports, names):
+        output = report["output"]
+        ensure_dir(os.path.dirname(output))
+        with instrument.stage("generate_report", rows=results["total_entries"], outputs=[output]):
+            generate_report(
+                output,
+                results["total_entries"],
+                results[frequent],
+                results[statistics],
+                results[filtered],
+                {"Number of filtered entries": len(results[filtered])},
+                results[distinct]
+            )
+        print(f"Gym report written to: {output}")
+    return results["total_entries"]
+
+
+# Run the reports of a batch configuration (see the top of this file)
+def run_batch(config, instrument=None):
+    unknown = sorted(set(config) - {"jobs", "gym"})
+    if unknown:
+        raise ValueError(f"Unknown batch section(s): {', '.join(unknown)}")
+    instrument = instrument or Instrument()
+    status = 0
+    if "jobs" in config:
+        section = dict(config["jobs"])
+        reports = section.pop("reports", [{}])
+        section = with_defaults(section, JOB_DATA, "jobs")
+        if run_job_reports(section.pop("source"), reports, instrument=instrument, **section) is None:
+            status = 1
+    if "gym" in config:
+        section = dict(config["gym"])
+        reports = section.pop("reports", [{}])
+        section = with_defaults(section, GYM_DATA, "gym")
+        if not run_gym_reports(section.pop("source"), reports, instrument=instrument, **section):
+            status = 1
+    return status
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m analysis",
+                                     description="Job posting and gym data analyses")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    jobs = commands.add_parser("jobs", help="job posting reports")
+    jobs.add_argument("--source", action="append",
+                      help="URL or JSON file of the postings, repeat to combine several feeds "
+                           f"(default {JOBS_URL})")
+    jobs.add_argument("--org", default=JOB_REPORT["org"], help="organisation whose job titles are listed")
+    jobs.add_argument("--output-dir", default=JOB_REPORT["output_dir"], help="directory of the reports")
+    jobs.add_argument("--format", choices=list(EXTENSIONS), default=JOB_REPORT["format"],
+                      help="format of the job listings (default text)")
+    jobs.add_argument("--today", help="classify the deadlines as of this day (YYYY-MM-DD)")
+    jobs.add_argument("--near", nargs=3, type=float, metavar=("LON", "LAT", "KM"),
+                      help="also list the open postings within KM kilometres of a point")
+    jobs.add_argument("--breakdown", choices=["org", "field"],
+                      help="also list the job titles of every organisation (by field with 'field')")
+    jobs.add_argument("--compact", action="store_true", help="load the postings as compact records")
+    jobs.add_argument("--cache", action="store_true", help="cache the parsed file next to it")
+    jobs.add_argument("--archive", metavar="FILE", help="record the postings in a history archive (SQLite)")
+
+    gym = commands.add_parser("gym", help="gym data report")
+    gym.add_argument("--source", action="append",
+                     help="JSON file, directory of JSON files, or URL (repeat for several feeds); "
+                          "default extra_project/json/ulkoliikunta-daily-2021.json")
+    gym.add_argument("--start", default=GYM_REPORT["start"], help="first day of the filtered entries")
+    gym.add_argument("--end", default=GYM_REPORT["end"], help="last day of the filtered entries")
+    gym.add_argument("--filter", action="append", metavar="KEY=VALUE",
+                     help="keep entries with this value, repeatable (default groupId=OG30 area=Pirkkola)")
+    gym.add_argument("--top-key", default=GYM_REPORT["top_key"], help="key of the most frequent values")
+    gym.add_argument("--k", type=int, default=GYM_REPORT["k"], help="number of most frequent values")
+    gym.add_argument("--stats-key", default=GYM_REPORT["stats_key"], help="numeric key of the statistics")
+    gym.add_argument("--output", default=GYM_REPORT["output"], help="report file")
+    gym.add_argument("--workers", type=int, default=1, help="processes for a directory or large file")
+    gym.add_argument("--approximate", action="store_true",
+                     help="use fixed-memory sketches (the exact median keeps every value in memory)")
+    gym.add_argument("--raw", action="store_true",
+                     help="answer from raw scans of the memory-mapped file instead of parsing it")
+
+    batch = commands.add_parser("batch", help="run the reports of a JSON configuration file")
+    batch.add_argument("config", help="configuration file (see analysis/cli.py)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    instrument = Instrument.from_environment()
+    try:
+        if args.command == "jobs":
+            report = {"org": args.org, "output_dir": args.output_dir, "format": args.format,
+                      "today": args.today, "near": args.near, "breakdown": args.breakdown}
+            sources = args.source or [JOBS_URL]
+            status = 0 if run_job_reports(sources, [report], compact=args.compact, cache=args.cache,
+                                          archive=args.archive, instrument=instrument) is not None else 1
+        elif args.command == "gym":
+            report = {"start": args.start, "end": args.end, "top_key": args.top_key, "k": args.k,
+                      "stats_key": args.stats_key, "output": args.output}
+            if args.filter:
+                report["filter"] = parse_filters(args.filter)
+            sources = args.source or [GYM_FILE]
+            source = sources[0] if len(sources) == 1 else sources
+            status = 0 if run_gym_reports(source, [report], workers=args.workers,
+                                          approximate=args.approximate, raw=args.raw,
+                                          instrument=instrument) else 1
+        else:
+            with open(args.config, 'r') as file:
+                config = json.load(file)
+            status = run_batch(config, instrument)
+    except (ValueError, OSError) as error:
+        print(f"Error: {error}")
+        status = 1
+    finally:
+        # Also after a failure: the trace and profile of a failed run are the ones to look at
+        instrument.finish()
+    return status
@@ -0,0 +1,291 @@
+# Concurrent fetching of several JSON feeds with asyncio.
+# load_json downloads one URL at a time with a blocking call. fetch_all() downloads many feeds
+# (one per city, area or month) at the same time, so all of them arrive in about the time of
+# the slowest one:
+#   - at most concurrency requests run at once, and at most per_host of them to the same host
+#   - connections are kept open (HTTP/1.1 keep-alive) and reused per host
+#   - connecting and every read have a timeout, and the whole body has a deadline
+#   - redirects (301, 302, 303, 307, 308) are followed, up to max_redirects of them
+#   - connection errors, timeouts, 429 and 5xx answers are retried with exponential backoff
+#   - the body is decoded while it downloads (see jsonstream.py) and every record goes straight
+#     into a consumer, so a feed is never held in memory as raw text
+#
+#   results = fetch_all({"vantaa": VANTAA_URL, "helsinki": HELSINKI_URL})
+#   results["vantaa"]["result"]          # list of records
+#
+# A consumer is any object with add(record), created fresh for every attempt by the factory
+# given with the source; the gym aggregates (gym_aggregates.py) can be used directly:
+#   fetch_all({"2021-08": (url, lambda: StatisticsAggregate("usageMinutes"))})
+import asyncio
+import codecs
+import random
+import ssl
+import time
+import urllib.parse
+
+from .jsonstream import ArrayStreamDecoder
+
+USER_AGENT = "analysis-fetcher/1.0"
+READ_SIZE = 65536
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+REDIRECT_STATUSES = {301, 302, 303, 307, 308}
+# Answers that never have a body, whatever their headers say (besides the 1xx ones)
+NO_BODY_STATUSES = {204, 304}
+
+
+class FetchError(Exception):
+    def __init__(self, message, status=None, retry=True, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retry = retry
+        self.retry_after = retry_after
+
+
+# A redirect answer; the request is sent again to location
+class Redirect(Exception):
+    def __init__(self, status, location):
+        super().__init__(f"HTTP status {status} to {location}")
+        self.status = status
+        self.location = location
+
+
+# Default consumer: collects the records in a list
+class RecordList(list):
+    def add(self, record):
+        self.append(record)
+
+
+# Idle keep-alive connections of one host, and the limit of connections open to it
+class HostPool:
+    def __init__(self, limit):
+        self.slots = asyncio.Semaphore(limit)
+        self.idle = []
+
+    def take_idle(self):
+        while self.idle:
+            reader, writer = self.idle.pop()
+            if not writer.is_closing() and not reader.at_eof():
+                return reader, writer
+            writer.close()
+        return None
+
+    def close(self):
+        for _, writer in self.idle:
+            writer.close()
+        self.idle = []
+
+
+class AsyncFetcher:
+    # timeout limits connecting and every read; body_timeout limits reading a whole body
+    def __init__(self, concurrency=8, per_host=4, timeout=30, retries=3, backoff=0.5, max_backoff=30,
+                 verify=True, body_timeout=300, max_redirects=5):
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.timeout = timeout
+        self.body_timeout = body_timeout
+        self.max_redirects = max_redirects
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        # The Vantaa feed is loaded without certificate verification by load_json; verify=False does the same
+        self.ssl_context = ssl.create_default_context() if verify else ssl._create_unverified_context()
+        self.semaphore = None
+        self.pools = {}
+
+    # Fetch every source concurrently; sources maps a name to a URL or to (URL, consumer factory)
+    # Returns {name: {"url", "status", "result", "records", "bytes", "attempts", "seconds", "error"}}
+    # in the order of sources. A source that still fails after its retries has result None and
+    # the reason in error; the other sources are not affected.
+    async def fetch_all(self, sources):
+        self.semaphore = asyncio.Semaphore(self.concurrency)
+        try:
+            names = list(sources)
+            results = await asyncio.gather(*(self.fetch(*self._source(sources[name])) for name in names))
+            return dict(zip(names, results))
+        finally:
+            for pool in self.pools.values():
+                pool.close()
+            self.pools = {}
+
+    @staticmethod
+    def _source(source):
+        if isinstance(source, str):
+            return source, RecordList
+        return source
+
+    # Fetch one URL into a fresh consumer from make_consumer, retrying failed attempts
+    async def fetch(self, url, make_consumer=RecordList):
+        if self.semaphore is None:
+            self.semaphore = asyncio.Semaphore(self.concurrency)
+        started = time.perf_counter()
+        result = {"url": url, "status": None, "result": None, "records": 0, "bytes": 0,
+                  "attempts": 0, "seconds": None, "error": None}
+        for attempt in range(self.retries + 1):
+            result["attempts"] = attempt + 1
+            consumer = make_consumer()
+            try:
+                async with self.semaphore:
+                    status, records, size = await self._fetch_redirected(url, consumer)
+                result.update(status=status, result=consumer, records=records, bytes=size, error=None)
+                break
+            except (FetchError, OSError, EOFError, asyncio.TimeoutError, asyncio.LimitOverrunError, ValueError) as error:
+                retry = getattr(error, "retry", not isinstance(error, ValueError))
+                result["status"] = getattr(error, "status", None)
+                result["error"] = f"{type(error).__name__}: {error}" if str(error) else type(error).__name__
+                if not retry or attempt == self.retries:
+                    break
+                await asyncio.sleep(self._delay(attempt, getattr(error, "retry_after", None)))
+        result["seconds"] = round(time.perf_counter() - started, 6)
+        return result
+
+    # Exponential backoff with jitter, or the server's Retry-After when it is given
+    def _delay(self, attempt, retry_after=None):
+        if retry_after is not None:
+            return min(retry_after, self.max_backoff)
+        delay = min(self.backoff * 2 ** attempt, self.max_backoff)
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def _pool(self, key):
+        pool = self.pools.get(key)
+        if pool is None:
+            pool = self.pools[key] = HostPool(self.per_host)
+        return pool
+
+    # Fetch a URL, following its redirects
+    async def _fetch_redirected(self, url, consumer):
+        for _ in range(self.max_redirects + 1):
+            try:
+                return await self._fetch_once(url, consumer)
+            except Redirect as redirect:
+                url = urllib.parse.urljoin(url, redirect.location)
+                status = redirect.status
+        raise FetchError(f"More than {self.max_redirects} redirects", status=status, retry=False)
+
+    async def _fetch_once(self, url, consumer):
+        parts = urllib.parse.urlsplit(url)
+        if parts.scheme not in ("http", "https"):
+            raise FetchError(f"Unsupported URL scheme: {url}", retry=False)
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        pool = self._pool((parts.scheme, parts.hostname, port))
+        path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        async with pool.slots:
+            connection = pool.take_idle()
+            reused = connection is not None
+            if connection is None:
+                connection = await asyncio.wait_for(
+                    asyncio.open_connection(parts.hostname, port,
+                                            ssl=self.ssl_context if parts.scheme == "https" else None),
+                    self.timeout
+                )
+            reader, writer = connection
+            keep = False
+            try:
+                host = parts.hostname if parts.port is None else f"{parts.hostname}:{parts.port}"
+                writer.write(
+                    f"GET {path} HTTP/1.1\r\nHost: {host}\r\nUser-Agent: {USER_AGENT}\r\n"
+                    f"Accept: application/json\r\nAccept-Encoding: identity\r\nConnection: keep-alive\r\n\r\n"
+                    .encode("latin-1")
+                )
+                await asyncio.wait_for(writer.drain(), self.timeout)
+                try:
+                    status, headers = await self._read_head(reader)
+                except asyncio.IncompleteReadError:
+                    if reused:
+                        # The server closed the idle connection: a normal keep-alive race, retry on a new one
+                        raise FetchError("Connection closed by the server")
+                    raise
+                records, size, keep = await asyncio.wait_for(
+                    self._read_body(reader, status, headers, consumer), self.body_timeout)
+                return status, records, size
+            finally:
+                if keep:
+                    pool.idle.append((reader, writer))
+                else:
+                    writer.close()
+
+    # Status and headers of the answer; interim 1xx answers (e.g. 103 Early Hints) are skipped
+    async def _read_head(self, reader):
+        while True:
+            head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), self.timeout)
+            lines = head.decode("latin-1").split("\r\n")
+            try:
+                version, status, *_ = lines[0].split(" ", 2)
+                status = int(status)
+            except ValueError:
+                raise FetchError(f"Invalid HTTP status line: {lines[0]!r}", retry=False) from None
+            # 101 Switching Protocols is final; it is never asked for, so it fails like other answers
+            if not 100 <= status < 200 or status == 101:
+                break
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+        headers[":version"] = version
+        return status, headers
+
+    # Read the body, decoding it into the consumer; returns (records, bytes, connection reusable)
+    async def _read_body(self, reader, status, headers, consumer):
+        if status != 200:
+            # The body of another answer is not read: the connection is closed when the fetch fails
+            if status in REDIRECT_STATUSES and headers.get("location"):
+                raise Redirect(status, headers["location"])
+            retry_after = headers.get("retry-after")
+            raise FetchError(
+                f"HTTP status {status}", status=status, retry=status in RETRY_STATUSES,
+                retry_after=float(retry_after) if retry_after and retry_after.isdigit() else None
+            )
+        charset = "utf-8"
+        if "charset=" in headers.get("content-type", ""):
+            charset = headers["content-type"].split("charset=")[1].split(";")[0].strip()
+        text_decoder = codecs.getincrementaldecoder(charset)()
+        decoder = ArrayStreamDecoder()
+        records = 0
+        size = 0
+        async for chunk in self._body_chunks(reader, status, headers):
+            size += len(chunk)
+            for record in decoder.feed(text_decoder.decode(chunk)):
+                consumer.add(record)
+                records += 1
+        for record in decoder.feed(text_decoder.decode(b"", final=True)) + decoder.close():
+            consumer.add(record)
+            records += 1
+        keep = headers.get("connection", "").lower() != "close" and headers[":version"] == "HTTP/1.1" and (
+            "content-length" in headers or "chunked" in headers.get("transfer-encoding", ""))
+        return records, size, keep
+
+    # The body as byte chunks: Content-Length, chunked transfer encoding, or until the connection closes
+    # 1xx, 204 and 304 answers have no body, so nothing is read for them.
+    async def _body_chunks(self, reader, status, headers):
+        if status < 200 or status in NO_BODY_STATUSES:
+            return
+        if "chunked" in headers.get("transfer-encoding", "").lower():
+            while True:
+                line = await asyncio.wait_for(reader.readuntil(b"\r\n"), self.timeout)
+                length = int(line.split(b";")[0].strip(), 16)
+                if length == 0:
+                    # Trailer headers end with an empty line
+                    while (await asyncio.wait_for(reader.readuntil(b"\r\n"), self.timeout)) != b"\r\n":
+                        pass
+                    return
+                yield await asyncio.wait_for(reader.readexactly(length), self.timeout)
+                await asyncio.wait_for(reader.readexactly(2), self.timeout)
+        elif "content-length" in headers:
+            remaining = int(headers["content-length"])
+            while remaining:
+                chunk = await asyncio.wait_for(reader.read(min(READ_SIZE, remaining)), self.timeout)
+                if not chunk:
+                    raise FetchError("Connection closed before the end of the body")
+                remaining -= len(chunk)
+                yield chunk
+        else:
+            while True:
+                chunk = await asyncio.wait_for(reader.read(READ_SIZE), self.timeout)
+                if not chunk:
+                    return
+                yield chunk
+
+
+# Fetch several sources concurrently from synchronous code (see AsyncFetcher.fetch_all)
+def fetch_all(sources, **options):
+    return asyncio.run(AsyncFetcher(**options).fetch_all(sources))
@@ -0,0 +1,195 @@
+# Per-stage timing and memory instrumentation of the report pipelines.
+# Each stage of a run (loading, each analysis step, each report writer) is wrapped in a
+# context manager that records its duration, row count, bytes read and written, and peak memory:
+#
+#   instrument = Instrument.from_environment()
+#   with instrument.stage("load_json", inputs=[path]) as stage:
+#       data = load_json(path)
+#       stage.rows = len(data)
+#   with instrument.stage("generate_reports", rows=len(data), outputs=["report.txt"]):
+#       generate_reports(...)
+#   instrument.finish()
+#
+# Bytes read and written are the sizes of the stage's input and output files. Peak memory is
+# the peak resident set size of the process, or with tracemalloc enabled, the highest amount of
+# memory allocated by Python while the stage ran (data held from earlier stages included).
+#
+# Nothing is written unless asked for, so the scripts run as before. Environment variables:
+#   ANALYSIS_TRACE=path          write the stages to path when the run finishes ("-" for stderr)
+#   ANALYSIS_TRACE_FORMAT=chrome write a Chrome trace-event file (chrome://tracing, Perfetto)
+#                                instead of the default structured JSON
+#   ANALYSIS_TRACEMALLOC=1       measure the peak Python memory of every stage with tracemalloc
+#   ANALYSIS_PROFILE=path        profile the whole run with cProfile and save the stats to path
+#                                (read them with: python -m pstats path)
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows: peak RSS is not recorded there
+    resource = None
+
+TRACE_FORMATS = ("json", "chrome")
+
+
+# Peak resident set size of the process in bytes, or None when it cannot be read
+def peak_rss():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+# Total size of existing local files (URLs and missing files are ignored), or None without any
+def total_size(paths):
+    sizes = [os.path.getsize(path) for path in paths if isinstance(path, (str, os.PathLike)) and os.path.isfile(path)]
+    return sum(sizes) if sizes else None
+
+
+# One timed stage; rows can be set inside the with block once they are known
+class Stage:
+    def __init__(self, name, depth, rows=None, **fields):
+        self.name = name
+        self.depth = depth
+        self.rows = rows
+        self.fields = fields
+        self.start = None
+        self.duration = None
+        self.bytes_read = None
+        self.bytes_written = None
+        self.peak_memory = None
+        self.error = None
+
+    def as_dict(self):
+        record = {
+            "name": self.name,
+            "depth": self.depth,
+            "start_seconds": round(self.start, 6),
+            "duration_seconds": round(self.duration, 6),
+            "rows": self.rows,
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+            "peak_memory_bytes": self.peak_memory
+        }
+        if self.rows and self.duration:
+            record["rows_per_second"] = round(self.rows / self.duration)
+        if self.error:
+            record["error"] = self.error
+        record.update(self.fields)
+        return record
+
+
+class Instrument:
+    def __init__(self, trace_path=None, trace_format="json", use_tracemalloc=False, profile_path=None):
+        if trace_format not in TRACE_FORMATS:
+            raise ValueError(f"Unknown trace format: {trace_format} (expected one of {', '.join(TRACE_FORMATS)})")
+        self.trace_path = trace_path
+        self.trace_format = trace_format
+        self.use_tracemalloc = use_tracemalloc
+        self.profile_path = profile_path
+        self.stages = []
+        self.active = []     # stack of running stages with their running peak memory
+        self.origin = time.perf_counter()
+        self.started_at = time.time()
+        self.profiler = None
+        self.started_tracemalloc = use_tracemalloc and not tracemalloc.is_tracing()
+        if self.started_tracemalloc:
+            tracemalloc.start()
+        if profile_path:
+            import cProfile
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    # Instrument configured by the ANALYSIS_* environment variables
+    @classmethod
+    def from_environment(cls, environ=None):
+        environ = os.environ if environ is None else environ
+        return cls(
+            trace_path=environ.get("ANALYSIS_TRACE") or None,
+            trace_format=environ.get("ANALYSIS_TRACE_FORMAT", "json").lower(),
+            use_tracemalloc=environ.get("ANALYSIS_TRACEMALLOC", "") not in ("", "0"),
+            profile_path=environ.get("ANALYSIS_PROFILE") or None
+        )
+
+    # Time a stage; inputs and outputs are the files it reads and writes
+    @contextmanager
+    def stage(self, name, rows=None, inputs=(), outputs=(), **fields):
+        stage = Stage(name, len(self.active), rows, **fields)
+        stage.bytes_read = total_size(inputs)
+        if self.use_tracemalloc:
+            # The parent keeps the highest peak seen before this stage resets the counter
+            if self.active:
+                self.active[-1][1] = max(self.active[-1][1], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+        self.active.append([stage, 0])
+        stage.start = time.perf_counter() - self.origin
+        try:
+            yield stage
+        except BaseException as error:
+            stage.error = f"{type(error).__name__}: {error}"
+            raise
+        finally:
+            stage.duration = time.perf_counter() - self.origin - stage.start
+            _, running_peak = self.active.pop()
+            if self.use_tracemalloc:
+                stage.peak_memory = max(running_peak, tracemalloc.get_traced_memory()[1])
+                if self.active:
+                    self.active[-1][1] = max(self.active[-1][1], stage.peak_memory)
+            else:
+                stage.peak_memory = peak_rss()
+            stage.bytes_written = total_size(outputs)
+            self.stages.append(stage)
+
+    # The recorded stages in start order
+    def records(self):
+        return [stage.as_dict() for stage in sorted(self.stages, key=lambda stage: stage.start)]
+
+    def to_json(self):
+        return {
+            "started_at": self.started_at,
+            "memory": "tracemalloc" if self.use_tracemalloc else "peak_rss",
+            "stages": self.records()
+        }
+
+    # Chrome trace-event format: one complete ("X") event per stage, times in microseconds
+    def to_chrome_trace(self):
+        pid, tid = os.getpid(), threading.get_ident()
+        events = []
+        for record in self.records():
+            args = {key: value for key, value in record.items()
+                    if key not in ("name", "depth", "start_seconds", "duration_seconds") and value is not None}
+            events.append({
+                "name": record["name"], "cat": "stage", "ph": "X", "pid": pid, "tid": tid,
+                "ts": round(record["start_seconds"] * 1e6, 1), "dur": round(record["duration_seconds"] * 1e6, 1),
+                "args": args
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_trace(self, path, trace_format=None):
+        trace_format = trace_format or self.trace_format
+        trace = self.to_chrome_trace() if trace_format == "chrome" else self.to_json()
+        if path == "-":
+            json.dump(trace, sys.stderr, indent=2)
+            sys.stderr.write("\n")
+            return
+        with open(path, 'w') as file:
+            json.dump(trace, file, indent=2)
+
+    # Stop profiling and write the configured outputs
+    def finish(self):
+        if self.profiler is not None:
+            self.profiler.disable()
+            self.profiler.dump_stats(self.profile_path)
+            self.profiler = None
+        if self.started_tracemalloc:
+            tracemalloc.stop()
+            self.started_tracemalloc = False
+        if self.trace_path:
+            self.write_trace(self.trace_path)
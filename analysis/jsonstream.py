@@ -0,0 +1,156 @@
+# Incremental decoding of a JSON array whose text arrives in pieces (file chunks, network reads).
+# ArrayStreamDecoder takes the text as it comes and returns every array element as soon as it
+# is complete, so only the current element and the unread rest of the last piece are kept in
+# memory:
+#
+#   decoder = ArrayStreamDecoder()
+#   for chunk in chunks:
+#       for record in decoder.feed(chunk):
+#           ...
+#   decoder.close()   # raises json.JSONDecodeError if the array was not complete
+#
+# A document whose top level is not an array (e.g. {"error": ...}) is collected whole and
+# returned by close(), decoded, as a single record.
+#
+# count_quotes, record_end and enclosing_record_start find the records of an array of flat
+# objects in raw bytes (a file read in blocks, or memory-mapped) without parsing them. Braces
+# inside string values are told apart by the parity of the unescaped quotes before them.
+import codecs
+import json
+import re
+
+# A quote after a run of backslashes; it is escaped when the run is odd
+ESCAPED_QUOTE = re.compile(rb'\\+"')
+COUNT_BLOCK = 1024 * 1024
+
+
+class ArrayStreamDecoder:
+    def __init__(self):
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.started = False
+        self.finished = False
+        self.whole = False     # the document is not an array: decode it at the end
+        self.after_element = False   # an element was read: a "," or the closing "]" comes next
+        self.after_comma = False     # a "," was read: an element must come next
+
+    # Add the next piece of text and return the elements it completed
+    def feed(self, text):
+        if self.finished:
+            if text.strip():
+                raise json.JSONDecodeError("Extra data after the end of the array", text, 0)
+            return []
+        self.buffer += text
+        if self.whole:
+            return []
+        return self._decode(final=False)
+
+    # End of the input: return the remaining elements (or the whole non-array document)
+    def close(self):
+        if self.whole:
+            return [json.loads(self.buffer)]
+        records = self._decode(final=True)
+        if not self.finished:
+            raise json.JSONDecodeError("Unexpected end of data", self.buffer, len(self.buffer))
+        return records
+
+    def _decode(self, final):
+        records = []
+        buffer = self.buffer
+        pos = 0
+        while True:
+            # Skip the whitespace between tokens
+            while pos < len(buffer) and buffer[pos].isspace():
+                pos += 1
+            if pos >= len(buffer):
+                break
+            if not self.started:
+                if buffer[pos] != "[":
+                    self.whole = True
+                    return records
+                self.started = True
+                pos += 1
+                continue
+            if buffer[pos] == "]" and not self.after_comma:
+                self.finished = True
+                pos += 1
+                if buffer[pos:].strip():
+                    raise json.JSONDecodeError("Extra data after the end of the array", buffer, pos)
+                pos = len(buffer)
+                break
+            # Exactly one comma between two elements
+            if self.after_element:
+                if buffer[pos] != ",":
+                    raise json.JSONDecodeError("Expecting ',' delimiter", buffer, pos)
+                self.after_element = False
+                self.after_comma = True
+                pos += 1
+                continue
+            if buffer[pos] in ",]":
+                raise json.JSONDecodeError("Expecting value", buffer, pos)
+            try:
+                record, end = self.decoder.raw_decode(buffer, pos)
+                # A value that ends exactly at the end of the buffer may be cut short (e.g. a number)
+                if end == len(buffer) and not final:
+                    break
+            except json.JSONDecodeError:
+                if final:
+                    raise
+                break
+            records.append(record)
+            self.after_element = True
+            self.after_comma = False
+            pos = end
+        self.buffer = buffer[pos:]
+        return records
+
+
+# Decode a JSON array from an iterable of byte chunks, yielding the elements one at a time
+def iter_array_bytes(chunks, encoding="utf-8"):
+    text_decoder = codecs.getincrementaldecoder(encoding)()
+    decoder = ArrayStreamDecoder()
+    for chunk in chunks:
+        yield from decoder.feed(text_decoder.decode(chunk))
+    yield from decoder.feed(text_decoder.decode(b"", final=True))
+    yield from decoder.close()
+
+
+# Number of the quotes in data[start:end] (bytes or mmap) that are not escaped by a backslash
+def count_quotes(data, start, end):
+    quotes = 0
+    for block in range(start, end, COUNT_BLOCK):
+        quotes += data[block:min(block + COUNT_BLOCK, end)].count(b'"')
+    # A run of backslashes may begin before start
+    run_start = start
+    while run_start > 0 and data[run_start - 1:run_start] == b"\\":
+        run_start -= 1
+    if data.find(b"\\", run_start, end) != -1:
+        for match in ESCAPED_QUOTE.finditer(data, run_start, end):
+            if (match.end() - 1 - match.start()) % 2:
+                quotes -= 1
+    return quotes
+
+
+# End (just after the closing "}") of the flat object starting at data[start], or None when it is not
+# closed in data; a "}" inside a string value does not end it
+def record_end(data, start):
+    close = data.find(b"}", start)
+    while close != -1:
+        text = data[start:close]
+        # Most records have no backslash: their quotes can simply be counted
+        quotes = text.count(b'"') if b"\\" not in text else count_quotes(data, start, close)
+        if quotes % 2 == 0:
+            return close + 1
+        close = data.find(b"}", close + 1)
+    return None
+
+
+# Start of the last flat object that opens in data[known:pos + 1], or None when there is none
+# data[known] must lie between two objects (not inside one), e.g. at the end of the previous object.
+def enclosing_record_start(data, known, pos):
+    brace = data.rfind(b"{", known, pos + 1)
+    while brace != -1:
+        if count_quotes(data, known, brace) % 2 == 0:
+            return brace
+        brace = data.rfind(b"{", known, brace)
+    return None
@@ -0,0 +1,36 @@
+# Ranking helpers shared by the job posting and gym analyses.
+# Both work on {value: count} dicts. Sorting is O(n log n) and top_k uses a heap, O(n log k),
+# so ranking stays fast even with tens of thousands of distinct values.
+#
+# Tie-breaking rules for equal counts:
+#   FIRST_SEEN - keep the order in which the values appear in the dict (the default)
+#   BY_VALUE   - order equal counts by the value itself, e.g. alphabetically
+import heapq
+
+FIRST_SEEN = "first_seen"
+BY_VALUE = "value"
+
+
+def _sort_key(tie_break):
+    if tie_break == FIRST_SEEN:
+        return lambda item: -item[1]
+    if tie_break == BY_VALUE:
+        return lambda item: (-item[1], item[0])
+    raise ValueError(f"Unknown tie-breaking rule: {tie_break}")
+
+
+# Return all (value, count) pairs ordered by count, highest first
+def rank_descending(counts, tie_break=FIRST_SEEN):
+    # sorted() is stable, so FIRST_SEEN keeps the dict order for equal counts
+    return sorted(counts.items(), key=_sort_key(tie_break))
+
+
+# Return the k (value, count) pairs with the highest counts, highest first
+# k=None returns every pair, like rank_descending.
+def top_k(counts, k, tie_break=FIRST_SEEN):
+    if k is None:
+        return rank_descending(counts, tie_break)
+    if k <= 0:
+        return []
+    # nsmallest is stable as well: equal keys keep their input order
+    return heapq.nsmallest(k, counts.items(), key=_sort_key(tie_break))
@@ -0,0 +1,76 @@
+import json
+import os
+import sys
+from pathlib import Path
+
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from analysis.cache import cached_load, evict, list_snapshots, snapshot_name
+
+sample_data = [{"id": 1, "organisaatio": "Org A"}, {"id": 2, "organisaatio": "Org B"}]
+
+def counting_parser(calls):
+    def parse(path):
+        calls.append(path)
+        with open(path) as file:
+            return json.load(file)
+    return parse
+
+def test_warm_start_skips_parsing(tmp_path):
+    source = tmp_path / "data.json"
+    source.write_text(json.dumps(sample_data))
+    calls = []
+
+    assert cached_load(str(source), counting_parser(calls)) == sample_data
+    assert cached_load(str(source), counting_parser(calls)) == sample_data
+    assert len(calls) == 1
+    assert len(list_snapshots(str(tmp_path / ".cache"))) == 1
+
+def test_changed_file_is_parsed_again(tmp_path):
+    source = tmp_path / "data.json"
+    source.write_text(json.dumps(sample_data))
+    calls = []
+    cached_load(str(source), counting_parser(calls))
+
+    source.write_text(json.dumps(sample_data[:1]))
+    os.utime(source, ns=(0, 10 ** 18))
+    assert cached_load(str(source), counting_parser(calls), use_hash=True) == sample_data[:1]
+    assert len(calls) == 2
+    # The snapshot of the old version is replaced, not kept next to the new one
+    assert len(list_snapshots(str(tmp_path / ".cache"))) == 1
+
+def test_evict_least_recently_used(tmp_path):
+    cache_dir = tmp_path / "cache"
+    for i, name in enumerate(["a.json", "b.json", "c.json"]):
+        source = tmp_path / name
+        source.write_text(json.dumps(sample_data))
+        cached_load(str(source), counting_parser([]), cache_dir=str(cache_dir))
+        snapshot = list_snapshots(str(cache_dir))[-1][2]
+        os.utime(snapshot, ns=(i * 10 ** 9, i * 10 ** 9))
+
+    size = list_snapshots(str(cache_dir))[0][1]
+    removed = evict(str(cache_dir), max_bytes=2 * size)
+    assert len(removed) == 1
+    assert len(list_snapshots(str(cache_dir))) == 2
+
+def test_none_is_not_cached(tmp_path):
+    source = tmp_path / "data.json"
+    source.write_text("[]")
+    assert cached_load(str(source), lambda path: None) is None
+    assert list_snapshots(str(tmp_path / ".cache")) == []
+
+def test_snapshot_with_unknown_class_is_parsed_again(tmp_path):
+    source = tmp_path / "data.json"
+    source.write_text(json.dumps(sample_data))
+    cache_dir = tmp_path / ".cache"
+    cache_dir.mkdir()
+    snapshot = cache_dir / snapshot_name(str(source))
+    # A pickle of a class from a module that cannot be imported here
+    snapshot.write_bytes(b"cno_such_module\nJobPosting\n.")
+    calls = []
+
+    assert cached_load(str(source), counting_parser(calls)) == sample_data
+    assert len(calls) == 1
+    # The snapshot was rewritten and is used on the next load
+    assert cached_load(str(source), counting_parser(calls)) == sample_data
+    assert len(calls) == 1
@@ -0,0 +1,156 @@
+import json
+import pytest
+import subprocess
+import sys
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.append(str(ROOT))
+from analysis.cli import date_bounds, main, parse_filters
+
+
+def postings():
+    return [
+        {"id": 1, "organisaatio": "Org A", "ammattiala": "Opetusala", "tyotehtava": "Opettaja",
+         "tyoavain": "a", "osoite": "", "haku_paattyy_pvm": "2025-04-25", "x": 24.94, "y": 60.17, "linkki": "a"},
+        {"id": 2, "organisaatio": "Org A", "ammattiala": "Opetusala", "tyotehtava": "Rehtori",
+         "tyoavain": "b", "osoite": "", "haku_paattyy_pvm": "2025-06-01", "x": 24.95, "y": 60.17, "linkki": "b"},
+        {"id": 3, "organisaatio": "Org B", "ammattiala": "Hoitoala", "tyotehtava": "Hoitaja",
+         "tyoavain": "c", "osoite": "", "haku_paattyy_pvm": "2025-06-01", "x": 25.50, "y": 60.40, "linkki": "c"},
+    ]
+
+
+def gym_entries():
+    return [
+        {"utcdate": f"2021-08-0{day}T10:00:00.000Z", "groupId": group, "area": area, "usageMinutes": minutes,
+         "serialNumber": f"s{day}"}
+        for day, group, area, minutes in [(1, "OG30", "Pirkkola", 10), (2, "OG30", "Pirkkola", 20),
+                                          (3, "OG31", "Kivistö", 30), (4, "OG30", "Kivistö", 40)]
+    ]
+
+
+def test_helpers():
+    assert date_bounds("2021-08-01", "2021-08-30") == ("2021-08-01T00:00:00.000Z", "2021-08-30T23:59:59.999Z")
+    assert date_bounds("2021-08-01T12:00", "2021-08-30T12:00") == ("2021-08-01T12:00", "2021-08-30T12:00")
+    assert parse_filters(["area=Pirkkola", "groupId=OG=30"]) == {"area": "Pirkkola", "groupId": "OG=30"}
+
+
+def test_jobs_command(tmp_path):
+    source = tmp_path / "jobs.json"
+    source.write_text(json.dumps(postings()))
+    output_dir = tmp_path / "out"
+    status = main(["jobs", "--source", str(source), "--org", "Org A", "--output-dir", str(output_dir),
+                   "--format", "csv", "--today", "2025-05-01", "--near", "24.94", "60.17", "2", "--compact",
+                   "--breakdown", "org"])
+    assert status == 0
+    assert (output_dir / "expired_jobs.csv").read_text().splitlines()[1:] == ["Opettaja,Org A,2025-04-25"]
+    assert len((output_dir / "available_jobs.csv").read_text().splitlines()) == 3
+    # Only the open posting within 2 km
+    assert (output_dir / "near_jobs.csv").read_text().splitlines()[1:] == ["Rehtori,Org A,2025-06-01"]
+    assert (output_dir / "titles_by_organization.csv").read_text().splitlines() == [
+        "Organization,Job Title,Count", "Org A,Opettaja,1", "Org A,Rehtori,1", "Org B,Hoitaja,1"
+    ]
+    report = (output_dir / "report.txt").read_text()
+    assert "Job titles posted by 'Org A'" in report and "Rehtori" in report
+
+
+def test_jobs_command_missing_source(tmp_path, capsys):
+    assert main(["jobs", "--source", str(tmp_path / "missing.json")]) == 1
+
+
+def test_gym_command(tmp_path):
+    source = tmp_path / "gym.json"
+    source.write_text(json.dumps(gym_entries()))
+    output = tmp_path / "gym.txt"
+    status = main(["gym", "--source", str(source), "--filter", "area=Kivistö", "--start", "2021-08-01",
+                   "--end", "2021-08-03", "--output", str(output)])
+    assert status == 0
+    report = output.read_text()
+    assert report.startswith("Total Entries: 4\n")
+    assert "Number of filtered entries: 1" in report
+    assert "Average                         25.0" in report
+    assert "Exact median: every value was kept in memory (O(n))" in report
+
+    main(["gym", "--source", str(source), "--approximate", "--output", str(output)])
+    report = output.read_text()
+    assert "Percentile rank error" in report and "Exact median" not in report
+
+
+def test_batch_runs_all_reports(tmp_path):
+    jobs = tmp_path / "jobs.json"
+    jobs.write_text(json.dumps(postings()))
+    gym_dir = tmp_path / "gym"
+    gym_dir.mkdir()
+    entries = gym_entries()
+    (gym_dir / "a.json").write_text(json.dumps(entries[:2]))
+    (gym_dir / "b.json").write_text(json.dumps(entries[2:]))
+    config = {
+        "jobs": {"source": str(jobs), "reports": [
+            {"org": "Org A", "output_dir": str(tmp_path / "a")},
+            {"org": "Org B", "output_dir": str(tmp_path / "b"), "format": "jsonl", "today": "2025-05-01"},
+        ]},
+        "gym": {"source": str(gym_dir), "reports": [
+            {"output": str(tmp_path / "pirkkola.txt")},
+            {"filter": {"area": "Kivistö"}, "top_key": "groupId", "output": str(tmp_path / "kivisto.txt")},
+        ]},
+    }
+    config_file = tmp_path / "batch.json"
+    config_file.write_text(json.dumps(config))
+    assert main(["batch", str(config_file)]) == 0
+
+    assert "Job titles posted by 'Org B'" in (tmp_path / "b" / "report.txt").read_text()
+    assert [json.loads(line)["tyotehtava"] for line in (tmp_path / "b" / "available_jobs.jsonl").open()] == \
+        ["Rehtori", "Hoitaja"]
+    assert "Number of filtered entries: 2" in (tmp_path / "pirkkola.txt").read_text()
+    kivisto = (tmp_path / "kivisto.txt").read_text()
+    assert "Number of filtered entries: 2" in kivisto and "OG31" in kivisto
+
+
+def test_batch_rejects_unknown_options(tmp_path, capsys):
+    config_file = tmp_path / "batch.json"
+    config_file.write_text(json.dumps({"gym": {"reports": [{"outptu": "x.txt"}]}}))
+    assert main(["batch", str(config_file)]) == 1
+    assert "Unknown gym report option(s): outptu" in capsys.readouterr().out
+
+
+def test_trace_is_written_when_a_stage_fails(tmp_path, monkeypatch):
+    source = tmp_path / "gym.json"
+    source.write_text(json.dumps(gym_entries()))
+    trace = tmp_path / "trace.json"
+    monkeypatch.setenv("ANALYSIS_TRACE", str(trace))
+
+    def generate_report(*args):
+        raise RuntimeError("disk full")
+    from extra_project.src import gym_data_analysis
+    monkeypatch.setattr(gym_data_analysis, "generate_report", generate_report)
+    with pytest.raises(RuntimeError):
+        main(["gym", "--source", str(source), "--output", str(tmp_path / "gym.txt")])
+    assert trace.exists()
+
+def test_optional_backends_are_not_imported(tmp_path):
+    source = tmp_path / "gym.json"
+    source.write_text(json.dumps(gym_entries()))
+    # A gym report on a local file needs none of the optional backends
+    script = (
+        "import sys\n"
+        "from analysis.cli import main\n"
+        f"main(['gym', '--source', {str(source)!r}, '--output', {str(tmp_path / 'gym.txt')!r}])\n"
+        "import project.src.data_analysis\n"
+        "print(sorted(name for name in ('numpy', 'asyncio', 'urllib.request', 'http.client', 'sqlite3',"
+        " 'extra_project.src.gym_sketches', 'cProfile') if name in sys.modules))\n"
+    )
+    result = subprocess.run([sys.executable, "-c", script], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert result.stdout.splitlines()[-1] == "[]"
+
+def test_modules_import_as_packages_from_the_root():
+    # Every module is imported by its package path, and importing one leaves sys.path alone
+    script = (
+        "import sys\n"
+        "before = list(sys.path)\n"
+        "import extra_project.src.gym_parallel, extra_project.src.gym_rawscan, extra_project.src.gym_query\n"
+        "import project.src.data_analysis, project.src.job_archive\n"
+        "print(sys.path == before)\n"
+    )
+    result = subprocess.run([sys.executable, "-c", script], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert result.stdout.splitlines()[-1] == "True"
@@ -0,0 +1,191 @@
+import json
+import pytest
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from analysis.fetcher import fetch_all
+from analysis.jsonstream import ArrayStreamDecoder, iter_array_bytes
+
+records = [{"id": i, "area": "Hietaniemi" if i % 2 else "Pirkkola", "usageMinutes": i * 10} for i in range(50)]
+
+
+# Local stand-in for the feeds: /slow/<seconds>, /flaky, /chunked, /missing, /object, /moved/<hops>,
+# /loop, /trickle, /empty, /hint, anything else
+class FeedHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    clients = set()
+    requests = []
+
+    def do_GET(self):
+        FeedHandler.clients.add(self.client_address)
+        FeedHandler.requests.append(self.path)
+        body = json.dumps(records).encode("utf-8")
+        if self.path.startswith("/slow/"):
+            time.sleep(float(self.path.split("?")[0].split("/")[2]))
+        if self.path == "/flaky" and FeedHandler.requests.count("/flaky") == 1:
+            return self._send(503, b"busy")
+        if self.path == "/missing":
+            return self._send(404, b"not found")
+        if self.path == "/object":
+            return self._send(200, b'{"error": "no data"}')
+        if self.path.startswith("/moved/"):
+            hops = int(self.path.split("/")[2])
+            return self._redirect(307 if hops % 2 else 301, f"/moved/{hops - 1}" if hops > 1 else "/data")
+        if self.path == "/loop":
+            return self._redirect(302, "/loop")
+        if self.path == "/empty":
+            # No body and no Content-Length, on a connection kept open
+            self.send_response(204)
+            self.end_headers()
+            return
+        if self.path == "/hint":
+            self.wfile.write(b"HTTP/1.1 103 Early Hints\r\nLink: </data>; rel=preload\r\n\r\n")
+            return self._send(200, body)
+        if self.path == "/trickle":
+            # Every read gets a byte in time, but the whole body takes far too long
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            for start in range(0, len(body), 20):
+                self.wfile.write(body[start:start + 20])
+                self.wfile.flush()
+                time.sleep(0.05)
+            return
+        if self.path == "/chunked":
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for start in range(0, len(body), 100):
+                piece = body[start:start + 100]
+                self.wfile.write(f"{len(piece):x}\r\n".encode() + piece + b"\r\n")
+            self.wfile.write(b"0\r\n\r\n")
+            return
+        self._send(200, body)
+
+    def _send(self, status, body):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _redirect(self, status, location):
+        self.send_response(status)
+        self.send_header("Location", location)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def base_url():
+    FeedHandler.clients = set()
+    FeedHandler.requests = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FeedHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_array_stream_decoder():
+    text = json.dumps(records, indent=1)
+    decoder = ArrayStreamDecoder()
+    decoded = []
+    for start in range(0, len(text), 7):
+        decoded.extend(decoder.feed(text[start:start + 7]))
+    decoded.extend(decoder.close())
+    assert decoded == records
+    # Multi-byte characters split between chunks
+    data = json.dumps([{"area": "Kivikko ääkköset"}], ensure_ascii=False).encode("utf-8")
+    assert list(iter_array_bytes(data[i:i + 1] for i in range(len(data)))) == [{"area": "Kivikko ääkköset"}]
+    decoder = ArrayStreamDecoder()
+    decoder.feed("[1, 2")
+    with pytest.raises(json.JSONDecodeError):
+        decoder.close()
+
+def test_array_stream_decoder_requires_one_comma_between_elements():
+    for text in ["[1,,2]", "[1 2]", "[,1]", "[1,]", "[{} {}]"]:
+        decoder = ArrayStreamDecoder()
+        with pytest.raises(json.JSONDecodeError):
+            # One character at a time, so the delimiters arrive on their own
+            for char in text:
+                decoder.feed(char)
+            decoder.close()
+    decoder = ArrayStreamDecoder()
+    assert [record for char in "[ 1 ,\n 2 ]" for record in decoder.feed(char)] + decoder.close() == [1, 2]
+    assert ArrayStreamDecoder().feed("[]") == []
+
+def test_sources_fetched_concurrently(base_url):
+    sources = {f"feed{i}": f"{base_url}/slow/0.4?month={i}" for i in range(4)}
+    started = time.perf_counter()
+    results = fetch_all(sources, concurrency=4, per_host=4)
+    elapsed = time.perf_counter() - started
+    assert list(results) == list(sources)
+    assert all(result["result"] == records and result["status"] == 200 for result in results.values())
+    # About the time of the slowest source, not the sum of all of them
+    assert elapsed < 1.2
+
+def test_connections_are_reused(base_url):
+    results = fetch_all({f"feed{i}": f"{base_url}/data?{i}" for i in range(6)}, per_host=1)
+    assert all(result["records"] == 50 for result in results.values())
+    assert len(FeedHandler.clients) == 1
+
+def test_retry_and_errors(base_url):
+    results = fetch_all({
+        "flaky": f"{base_url}/flaky",
+        "missing": f"{base_url}/missing",
+        "chunked": f"{base_url}/chunked",
+        "object": f"{base_url}/object"
+    }, backoff=0.01)
+    assert (results["flaky"]["attempts"], results["flaky"]["result"]) == (2, records)
+    # Client errors are not retried
+    assert (results["missing"]["attempts"], results["missing"]["status"], results["missing"]["result"]) == (1, 404, None)
+    assert results["missing"]["error"] == "FetchError: HTTP status 404"
+    assert results["chunked"]["result"] == records
+    assert results["object"]["result"] == [{"error": "no data"}]
+
+def test_timeout(base_url):
+    result = fetch_all({"slow": f"{base_url}/slow/1"}, timeout=0.2, retries=1, backoff=0.01)["slow"]
+    assert result["result"] is None and result["attempts"] == 2
+    assert "Timeout" in result["error"]
+
+def test_redirects_are_followed(base_url):
+    results = fetch_all({"moved": f"{base_url}/moved/3", "loop": f"{base_url}/loop"}, max_redirects=4, backoff=0.01)
+    assert (results["moved"]["status"], results["moved"]["result"]) == (200, records)
+    assert results["loop"]["result"] is None and results["loop"]["attempts"] == 1
+    assert results["loop"]["error"] == "FetchError: More than 4 redirects"
+
+def test_body_deadline(base_url):
+    started = time.perf_counter()
+    result = fetch_all({"trickle": f"{base_url}/trickle"}, timeout=1, body_timeout=0.3, retries=0)["trickle"]
+    assert result["result"] is None and "Timeout" in result["error"]
+    assert time.perf_counter() - started < 1
+
+def test_answers_without_body(base_url):
+    started = time.perf_counter()
+    results = fetch_all({"empty": f"{base_url}/empty", "hint": f"{base_url}/hint"}, timeout=2, backoff=0.01)
+    # 204 is answered at once instead of waiting for the connection to close
+    assert (results["empty"]["status"], results["empty"]["attempts"], results["empty"]["result"]) == (204, 1, None)
+    assert (results["hint"]["status"], results["hint"]["result"]) == (200, records)
+    assert time.perf_counter() - started < 1
+
+def test_stream_into_aggregate(base_url):
+    class Total:
+        def __init__(self):
+            self.minutes = 0
+
+        def add(self, record):
+            self.minutes += record["usageMinutes"]
+
+    result = fetch_all({"total": (f"{base_url}/chunked", Total)})["total"]
+    assert result["result"].minutes == sum(record["usageMinutes"] for record in records)
@@ -0,0 +1,56 @@
+import json
+import pytest
+import sys
+from pathlib import Path
+
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from analysis.instrument import Instrument
+
+
+def test_stages(tmp_path):
+    source = tmp_path / "data.json"
+    source.write_text(json.dumps([{"id": i} for i in range(100)]))
+    output = tmp_path / "report.txt"
+
+    instrument = Instrument(use_tracemalloc=True)
+    with instrument.stage("load", inputs=[str(source), "http://example.com/data"]) as stage:
+        data = json.loads(source.read_text())
+        stage.rows = len(data)
+    with instrument.stage("report", rows=len(data), outputs=[str(output)], fmt="text"):
+        with instrument.stage("format"):
+            lines = [f"{entry['id']}\n" for entry in data] * 100
+        output.write_text("".join(lines))
+    instrument.finish()
+
+    load, report, nested = instrument.records()
+    assert (load["name"], load["rows"], load["bytes_read"], load["bytes_written"]) == ("load", 100, source.stat().st_size, None)
+    assert (report["depth"], report["fmt"], report["bytes_written"]) == (0, "text", output.stat().st_size)
+    assert nested["name"] == "format" and nested["depth"] == 1
+    # The outer stage saw at least the peak of the nested one
+    assert report["peak_memory_bytes"] >= nested["peak_memory_bytes"] > 0
+    assert report["duration_seconds"] >= nested["duration_seconds"]
+
+def test_failed_stage_is_recorded():
+    instrument = Instrument()
+    with pytest.raises(ValueError):
+        with instrument.stage("parse"):
+            raise ValueError("bad data")
+    assert instrument.records()[0]["error"] == "ValueError: bad data"
+
+def test_environment_outputs(tmp_path):
+    trace = tmp_path / "trace.json"
+    profile = tmp_path / "run.prof"
+    instrument = Instrument.from_environment({
+        "ANALYSIS_TRACE": str(trace), "ANALYSIS_TRACE_FORMAT": "chrome", "ANALYSIS_PROFILE": str(profile)
+    })
+    with instrument.stage("sum", rows=1000):
+        sum(range(1000))
+    instrument.finish()
+
+    events = json.loads(trace.read_text())["traceEvents"]
+    assert [(event["name"], event["ph"], event["args"]["rows"]) for event in events] == [("sum", "X", 1000)]
+    assert profile.stat().st_size > 0
+
+    with pytest.raises(ValueError):
+        Instrument.from_environment({"ANALYSIS_TRACE_FORMAT": "xml"})
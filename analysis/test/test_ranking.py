@@ -0,0 +1,25 @@
+import pytest
+import sys
+from pathlib import Path
+
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from analysis.ranking import BY_VALUE, rank_descending, top_k
+
+counts = {"b": 2, "a": 5, "d": 2, "c": 1, "e": 5}
+
+def test_rank_descending_keeps_first_seen_order_for_ties():
+    assert rank_descending(counts) == [("a", 5), ("e", 5), ("b", 2), ("d", 2), ("c", 1)]
+
+def test_rank_descending_by_value():
+    assert rank_descending({"d": 2, "b": 2, "a": 1}, BY_VALUE) == [("b", 2), ("d", 2), ("a", 1)]
+
+def test_top_k():
+    assert top_k(counts, 3) == [("a", 5), ("e", 5), ("b", 2)]
+    assert top_k(counts, 0) == []
+    assert top_k(counts, None) == rank_descending(counts)
+    assert top_k(counts, 10) == rank_descending(counts)
+
+def test_unknown_tie_break():
+    with pytest.raises(ValueError):
+        top_k(counts, 2, "random")
@@ -0,0 +1,57 @@
+import csv
+import json
+import pytest
+import sys
+from pathlib import Path
+
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from analysis.writers import ReportWriter, read_columnar, write_rows
+
+columns = ["tyotehtava", "organisaatio"]
+rows = [
+    {"tyotehtava": 'Lehtori "matematiikka", fysiikka', "organisaatio": "Org A"},
+    {"tyotehtava": "Teacher", "organisaatio": "Org B"},
+    {"tyotehtava": "Nurse", "organisaatio": "Org C"}
+]
+
+def test_csv_quoting(tmp_path):
+    path = tmp_path / "out.csv"
+    assert write_rows(str(path), iter(rows), columns, "csv") == 3
+    with open(path, newline="", encoding="utf-8") as file:
+        parsed = list(csv.reader(file))
+    assert parsed[0] == columns
+    assert parsed[1] == ['Lehtori "matematiikka", fysiikka', "Org A"]
+
+def test_json_lines(tmp_path):
+    path = tmp_path / "out.jsonl"
+    write_rows(str(path), (row for row in rows), columns, "jsonl")
+    with open(path, encoding="utf-8") as file:
+        assert [json.loads(line) for line in file] == rows
+
+def test_columnar_row_groups(tmp_path):
+    path = tmp_path / "out.columnar"
+    write_rows(str(path), rows, columns, "columnar", row_group_size=2)
+    groups = list(read_columnar(str(path)))
+    assert [group["num_rows"] for group in groups] == [2, 1]
+    assert groups[0]["columns"]["organisaatio"] == ["Org A", "Org B"]
+
+def test_text_table(tmp_path):
+    path = tmp_path / "out.txt"
+    write_rows(str(path), [("Teacher", 3)], ["title", "count"], "text", widths=[10, 5], title="Titles")
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert lines[0] == "Titles"
+    assert lines[-1] == "Teacher   |     3"
+
+def test_unknown_format(tmp_path):
+    with pytest.raises(ValueError):
+        write_rows(str(tmp_path / "out.parquet"), rows, columns, "parquet")
+    assert not (tmp_path / "out.parquet").exists()
+
+def test_failed_writer_leaves_no_file(tmp_path):
+    path = tmp_path / "out.csv"
+    with pytest.raises(TypeError):
+        write_rows(str(path), rows, columns, "csv", widths=[10, 5])
+    assert not path.exists()
+    with pytest.raises(TypeError):
+        ReportWriter(None, columns)
@@ -0,0 +1,190 @@
+# Streaming report writers shared by the job posting and gym analyses.
+# A writer takes rows one at a time (dicts or sequences) and writes them through a large
+# output buffer, so listings with millions of rows can be written straight from an iterator
+# without building a list first. Available formats:
+#   text     - fixed-width text table
+#   csv      - RFC 4180 CSV (fields with commas, quotes or newlines are quoted correctly)
+#   jsonl    - one JSON object per line
+#   columnar - row groups stored column by column, one JSON object per row group
+#
+# Usage:
+#   with open_writer("expired.csv", "csv", ["tyotehtava", "organisaatio"]) as writer:
+#       writer.write_rows(expired_postings)
+import csv
+import json
+import os
+from abc import ABC, abstractmethod
+
+BUFFER_SIZE = 1024 * 1024  # 1 MB
+FORMATS = ("text", "csv", "jsonl", "columnar")
+
+
+# Open a file for writing with a large buffer, so many small writes become few system calls
+def open_buffered(path, newline=None):
+    return open(path, 'w', buffering=BUFFER_SIZE, encoding="utf-8", newline=newline)
+
+
+# Base class: turns dict rows into tuples in the order of columns
+# Each format implements write_row (and write_header when it has one).
+class ReportWriter(ABC):
+    def __init__(self, file, columns):
+        self.file = file
+        self.columns = list(columns)
+        self.rows_written = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def values(self, row):
+        if isinstance(row, dict):
+            return tuple(row.get(column, "") for column in self.columns)
+        return tuple(row)
+
+    def write_header(self):
+        pass
+
+    @abstractmethod
+    def write_row(self, row):
+        pass
+
+    def write_rows(self, rows):
+        for row in rows:
+            self.write_row(row)
+        return self.rows_written
+
+    def close(self):
+        self.file.close()
+
+
+# Fixed-width text table
+# Values other than text and numbers (e.g. dates) are written as str(value).
+# widths gives the width of each column (default 35) and aligns its alignment ("<" or ">");
+# without aligns, numbers are right-aligned and text left-aligned.
+class TextTableWriter(ReportWriter):
+    def __init__(self, file, columns, widths=None, headers=None, separator="| ", title=None, aligns=None):
+        super().__init__(file, columns)
+        self.widths = list(widths) if widths else [35] * len(self.columns)
+        self.aligns = list(aligns) if aligns else None
+        self.headers = list(headers) if headers else self.columns
+        self.separator = separator
+        self.title = title
+
+    def _line(self, values):
+        cells = []
+        for i, (value, width) in enumerate(zip(values, self.widths)):
+            if self.aligns:
+                align = self.aligns[i]
+            elif isinstance(value, (int, float)) and not isinstance(value, bool):
+                align = ">"
+            else:
+                align = "<"
+            if value is None:
+                value = ""
+            elif not isinstance(value, (str, int, float)):
+                # e.g. dates, whose format() would treat the alignment as a strftime format
+                value = str(value)
+            cells.append(f"{value:{align}{width}}")
+        return self.separator.join(cells) + "\n"
+
+    def write_header(self):
+        rule = sum(self.widths) + len(self.separator) * (len(self.widths) - 1)
+        if self.title:
+            self.file.write(f"{self.title}\n")
+        self.file.write("=" * rule + "\n")
+        self.file.write(self._line(self.headers))
+        self.file.write("-" * rule + "\n")
+
+    def write_row(self, row):
+        self.file.write(self._line(self.values(row)))
+        self.rows_written += 1
+
+
+# RFC 4180 CSV through the csv module
+class CsvWriter(ReportWriter):
+    def __init__(self, file, columns, headers=None):
+        super().__init__(file, columns)
+        self.headers = list(headers) if headers else self.columns
+        self.writer = csv.writer(file, lineterminator="\r\n")
+
+    def write_header(self):
+        self.writer.writerow(self.headers)
+
+    def write_row(self, row):
+        self.writer.writerow(self.values(row))
+        self.rows_written += 1
+
+
+# One JSON object per line; values JSON does not support (e.g. dates) are written as strings
+class JsonLinesWriter(ReportWriter):
+    def write_row(self, row):
+        self.file.write(json.dumps(dict(zip(self.columns, self.values(row))), ensure_ascii=False, default=str) + "\n")
+        self.rows_written += 1
+
+
+# Columnar output: rows are collected into row groups of row_group_size rows and each group
+# is written as {"num_rows": n, "columns": {column: [values...]}} on its own line, like the
+# row groups of a Parquet file. Only one row group is held in memory at a time.
+class ColumnarWriter(ReportWriter):
+    def __init__(self, file, columns, row_group_size=65536):
+        super().__init__(file, columns)
+        self.row_group_size = row_group_size
+        self.group = [[] for _ in self.columns]
+
+    def write_header(self):
+        self.file.write(json.dumps({"columns": self.columns}) + "\n")
+
+    def write_row(self, row):
+        for column, value in zip(self.group, self.values(row)):
+            column.append(value)
+        self.rows_written += 1
+        if len(self.group[0]) >= self.row_group_size:
+            self.flush_group()
+
+    def flush_group(self):
+        if self.group and self.group[0]:
+            group = {"num_rows": len(self.group[0]), "columns": dict(zip(self.columns, self.group))}
+            self.file.write(json.dumps(group, ensure_ascii=False, default=str) + "\n")
+            self.group = [[] for _ in self.columns]
+
+    def close(self):
+        self.flush_group()
+        super().close()
+
+
+# Read back a file written by ColumnarWriter, one row group at a time
+def read_columnar(path):
+    with open(path, 'r', encoding="utf-8") as file:
+        json.loads(file.readline())
+        for line in file:
+            yield json.loads(line)
+
+
+# Writer class of each format
+WRITERS = {"text": TextTableWriter, "csv": CsvWriter, "jsonl": JsonLinesWriter, "columnar": ColumnarWriter}
+
+
+# Open a writer for the given format and write its header
+# Extra keyword arguments are passed to the writer (e.g. widths and title for text tables).
+# If the writer cannot be built or its header written (e.g. an unknown option), the file is closed
+# and removed before the error is raised, so no half-written report is left behind.
+def open_writer(path, fmt, columns, **options):
+    if fmt not in WRITERS:
+        raise ValueError(f"Unknown report format: {fmt} (expected one of {', '.join(FORMATS)})")
+    file = open_buffered(path, newline="" if fmt == "csv" else None)
+    try:
+        writer = WRITERS[fmt](file, columns, **options)
+        writer.write_header()
+    except BaseException:
+        file.close()
+        os.remove(path)
+        raise
+    return writer
+
+
+# Write an iterable of rows to a file in the given format and return the number of rows written
+def write_rows(path, rows, columns, fmt="text", **options):
+    with open_writer(path, fmt, columns, **options) as writer:
+        return writer.write_rows(rows)
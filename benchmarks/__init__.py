@@ -0,0 +1 @@
+# Benchmarks for the job posting and gym analyses (run with: python -m benchmarks --help).
@@ -0,0 +1,70 @@
+# Command line interface of the benchmarks, run from the repository root:
+#   python -m benchmarks run --sizes 1000 100000 --output results.json
+#   python -m benchmarks run --suite gym --case "calc*" --areas 50 --groups 500
+#   python -m benchmarks compare baseline.json results.json --threshold 0.1
+#   python -m benchmarks generate jobs 1000000 jobs.json --orgs 200
+# compare exits with status 1 when any case regressed, so it can gate a CI job.
+import argparse
+import sys
+
+from .cases import SUITES
+from .generators import write_json
+from .runner import (DEFAULT_SIZES, DEFAULT_THRESHOLD, compare_results, load_results, print_comparison,
+                     run_benchmarks, save_results)
+
+
+def add_cardinality_options(parser):
+    parser.add_argument("--orgs", type=int, help="distinct organisations in job postings (default 50)")
+    parser.add_argument("--titles", type=int, help="distinct job titles (default 300)")
+    parser.add_argument("--areas", type=int, help="distinct gym areas (default 3)")
+    parser.add_argument("--groups", type=int, help="distinct gym groupIds (default 8)")
+    parser.add_argument("--seed", type=int, default=0, help="random seed of the generators (default 0)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Benchmarks of the analysis scripts")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="run benchmarks and save the results as JSON")
+    run.add_argument("--suite", action="append", choices=list(SUITES), help="suite to run (default all)")
+    run.add_argument("--case", action="append", help="case name or pattern, e.g. 'report' or 'calc*' (default all)")
+    run.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="dataset sizes in rows")
+    run.add_argument("--repeat", type=int, default=3, help="timed runs per case (the fastest is kept)")
+    run.add_argument("--no-isolate", action="store_true", help="run the cases in this process")
+    run.add_argument("--output", default="benchmark_results.json", help="results file")
+    add_cardinality_options(run)
+
+    compare = commands.add_parser("compare", help="compare two results files")
+    compare.add_argument("old")
+    compare.add_argument("new")
+    compare.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                         help="relative change reported as a regression (default 0.1)")
+
+    generate = commands.add_parser("generate", help="write a synthetic dataset to a JSON file")
+    generate.add_argument("suite", choices=list(SUITES))
+    generate.add_argument("rows", type=int)
+    generate.add_argument("output")
+    add_cardinality_options(generate)
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        results = run_benchmarks(
+            args.suite, args.sizes, args.case, repeat=args.repeat, seed=args.seed, isolate=not args.no_isolate,
+            orgs=args.orgs, titles=args.titles, areas=args.areas, groups=args.groups
+        )
+        save_results(results, args.output)
+        print(f"Results written to: {args.output}")
+        return 0
+    if args.command == "compare":
+        regressions = print_comparison(compare_results(load_results(args.old), load_results(args.new), args.threshold))
+        print(f"\n{regressions} regression(s)")
+        return 1 if regressions else 0
+    generate_records, option_names, _, _ = SUITES[args.suite]
+    options = {name: getattr(args, name) for name in option_names if getattr(args, name) is not None}
+    count = write_json(args.output, generate_records(args.rows, seed=args.seed, **options))
+    print(f"{count} records written to: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
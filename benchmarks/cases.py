@@ -0,0 +1,142 @@
+# Benchmark cases: every public function of data_analysis.py and gym_data_analysis.py, plus
+# the end-to-end report runs of both scripts' __main__ blocks.
+# A suite has a dataset generator, a loader and a dict of cases. The generated dataset is written
+# to a JSON file once; the loader parses it into the context every case takes (not measured).
+# The context holds the parsed records ("data"), the JSON file ("path") and a scratch directory
+# for reports ("workdir").
+import os
+
+from .generators import generate_gym_entries, generate_job_postings
+
+
+# Load the dataset file of a suite into the context of its cases (runs in the benchmark process)
+def load_jobs(path, workdir):
+    from project.src import data_analysis
+    data = data_analysis.read_json_file(path)
+    orgs = list(dict.fromkeys(entry["organisaatio"] for entry in data))
+    return {"data": data, "path": path, "workdir": workdir, "org": data[0]["organisaatio"], "orgs": orgs}
+
+
+def load_gym(path, workdir):
+    from extra_project.src import gym_data_analysis
+    return {"data": gym_data_analysis.read_json_file(path), "path": path, "workdir": workdir}
+
+
+def _out(ctx, name):
+    return os.path.join(ctx["workdir"], name)
+
+
+# End-to-end run of data_analysis.py's __main__ block on a local file
+def jobs_report(ctx):
+    from project.src import data_analysis as da
+    data = da.load_json(ctx["path"])
+    jobs = da.check_application_deadlines(data)
+    stats = da.JobPostingStats(data)
+    summary = da.calculate_summary_statistics(data, stats)
+    analysis = da.job_posting_analysis(data, stats)
+    job_titles = da.filter_and_count_job_titles(data, ctx["org"], stats=stats)
+    da.generate_reports(data, summary, analysis, ctx["org"], job_titles,
+                        _out(ctx, "report.txt"), _out(ctx, "report.csv"))
+    da.generate_expired_and_Opening_jobs_report(jobs["expired_postings"], jobs["open_postings"],
+                                                _out(ctx, "expired_jobs.txt"), _out(ctx, "available_jobs.txt"))
+
+
+def _jobs_generate_reports(ctx):
+    from project.src import data_analysis as da
+    data = ctx["data"]
+    stats = da.JobPostingStats(data)
+    da.generate_reports(data, da.calculate_summary_statistics(data, stats), da.job_posting_analysis(data, stats),
+                        ctx["org"], da.filter_and_count_job_titles(data, ctx["org"], stats=stats),
+                        _out(ctx, "report.txt"), _out(ctx, "report.csv"))
+
+
+def _jobs_expired_report(ctx):
+    from project.src import data_analysis as da
+    jobs = da.check_application_deadlines(ctx["data"])
+    da.generate_expired_and_Opening_jobs_report(jobs["expired_postings"], jobs["open_postings"],
+                                                _out(ctx, "expired_jobs.txt"), _out(ctx, "available_jobs.txt"))
+
+
+def _da():
+    from project.src import data_analysis
+    return data_analysis
+
+
+# The job titles of every organisation, asked one organisation at a time from the statistics of the data
+def _titles_of_all_orgs(ctx):
+    da = _da()
+    stats = da.JobPostingStats(ctx["data"])
+    return {org: da.filter_and_count_job_titles(ctx["data"], org, stats=stats) for org in ctx["orgs"]}
+
+
+JOB_CASES = {
+    "load_json": lambda ctx: _da().load_json(ctx["path"]),
+    "count_entries": lambda ctx: _da().count_entries(ctx["data"]),
+    "calculate_summary_statistics": lambda ctx: _da().calculate_summary_statistics(ctx["data"]),
+    "job_posting_analysis": lambda ctx: _da().job_posting_analysis(ctx["data"]),
+    "filter_and_count_job_titles": lambda ctx: _da().filter_and_count_job_titles(ctx["data"], ctx["org"]),
+    "filter_and_count_job_titles_all_orgs": _titles_of_all_orgs,
+    "check_application_deadlines": lambda ctx: _da().check_application_deadlines(ctx["data"]),
+    "find_jobs_near": lambda ctx: _da().find_jobs_near(ctx["data"], 25.04, 60.29, 5, open_only=True),
+    "write_job_listing": lambda ctx: _da().write_job_listing(ctx["data"], _out(ctx, "listing.txt")),
+    "generate_reports": _jobs_generate_reports,
+    "generate_expired_and_Opening_jobs_report": _jobs_expired_report,
+    "report": jobs_report,
+}
+
+
+# The filter of gym_data_analysis.py's __main__ block
+GYM_FILTER = ("utcdate", "2021-08-01T00:00:00.000Z", "2021-08-30T23:59:59.999Z",
+              "groupId", "OG10", "area", "Hietaniemi")
+
+
+# End-to-end run of gym_data_analysis.py's __main__ block
+def gym_report(ctx):
+    from extra_project.src import gym_data_analysis as gym
+    from extra_project.src.gym_aggregates import (AggregationEngine, CountAggregate, DistinctAggregate,
+                                                  FilterAggregate, FrequencyAggregate, StatisticsAggregate)
+    date_key, start, end, key, value, key2, value2 = GYM_FILTER
+    engine = AggregationEngine()
+    engine.register("total_entries", CountAggregate())
+    engine.register("frequent", FrequencyAggregate("area", 5))
+    engine.register("statistics", StatisticsAggregate("usageMinutes", median=True))
+    engine.register("filtered", FilterAggregate(date_key, start, end, [(key, value), (key2, value2)]))
+    engine.register("group_ids", DistinctAggregate("groupId"))
+    results = engine.run(gym.stream_json_file(ctx["path"]))
+    filtered = results["filtered"]
+    gym.generate_report(_out(ctx, "gym_data_analysis.txt"), results["total_entries"], results["frequent"],
+                        results["statistics"], filtered, {"Number of filtered entries": len(filtered)},
+                        results["group_ids"])
+
+
+def _gym_generate_report(ctx):
+    from extra_project.src import gym_data_analysis as gym
+    data = ctx["data"]
+    filtered = gym.filter_by_date_and_key(data, *GYM_FILTER)
+    gym.generate_report(_out(ctx, "gym_data_analysis.txt"), gym.count_entries(data),
+                        gym.most_frequent_entries(data, "area"), gym.calculate_statistics(data, "usageMinutes"),
+                        filtered, {"Number of filtered entries": len(filtered)}, gym.get_all_group_ids(data))
+
+
+def _gym():
+    from extra_project.src import gym_data_analysis
+    return gym_data_analysis
+
+
+GYM_CASES = {
+    "read_json_file": lambda ctx: _gym().read_json_file(ctx["path"]),
+    "stream_json_file": lambda ctx: _gym().count_entries(_gym().stream_json_file(ctx["path"])),
+    "count_entries": lambda ctx: _gym().count_entries(ctx["data"]),
+    "most_frequent_entries": lambda ctx: _gym().most_frequent_entries(ctx["data"], "area"),
+    "calculate_statistics": lambda ctx: _gym().calculate_statistics(ctx["data"], "usageMinutes"),
+    "filter_by_date_and_key": lambda ctx: _gym().filter_by_date_and_key(ctx["data"], *GYM_FILTER),
+    "get_all_group_ids": lambda ctx: _gym().get_all_group_ids(ctx["data"]),
+    "generate_report": _gym_generate_report,
+    "report": gym_report,
+}
+
+# Suite name -> (dataset generator, its cardinality options, context loader, cases)
+SUITES = {
+    "jobs": (generate_job_postings, ("orgs", "titles"), load_jobs, JOB_CASES),
+    "gym": (generate_gym_entries, ("areas", "groups"), load_gym, GYM_CASES),
+}
@@ -0,0 +1,97 @@
+# Seeded generators of synthetic datasets shaped like the real inputs.
+# generate_job_postings() produces records with the fields of the Vantaa job feed
+# (project/json/data.json) and generate_gym_entries() records like the ulkoliikunta files
+# (extra_project/json). The same seed and parameters always give the same records.
+#
+# Categorical values (organisations, titles, areas, groups) follow a Zipf-like distribution,
+# like the real data where a few organisations post most of the jobs; the number of distinct
+# values is set with the cardinality arguments. Records are generated lazily in batches, so
+# 10 ** 7 rows can be written to a file without holding them all in memory.
+import json
+import random
+from datetime import date, timedelta
+
+BATCH_SIZE = 10000
+
+# Centre of Vantaa, the job postings are scattered around it
+VANTAA = (25.04, 60.29)
+
+
+# Cumulative Zipf-like weights (1 / rank) for n values
+def zipf_weights(n, exponent=1.0):
+    cumulative = []
+    total = 0.0
+    for rank in range(1, n + 1):
+        total += 1 / rank ** exponent
+        cumulative.append(total)
+    return cumulative
+
+
+# Pick n values in batches of BATCH_SIZE from values with cumulative weights
+def _choices(rng, values, cumulative, n):
+    while n > 0:
+        size = min(n, BATCH_SIZE)
+        yield from rng.choices(values, cum_weights=cumulative, k=size)
+        n -= size
+
+
+# Job postings with the fields of the Vantaa feed
+# orgs and titles set the number of distinct organisations and job titles; the deadlines are
+# spread over deadline_days days around start (about half of them expired on that day).
+def generate_job_postings(n, orgs=50, titles=300, seed=0, start=date(2025, 5, 1), deadline_days=120):
+    rng = random.Random(seed)
+    org_names = [f"Toimiala {i // 10 + 1}, Yksikkö {i + 1}" for i in range(orgs)]
+    title_names = [f"Tehtävä {i + 1}" for i in range(titles)]
+    # Each title belongs to one organisation, so filtering by organisation is selective
+    title_orgs = [org_names[rng.randrange(orgs)] for _ in range(titles)]
+    title_weights = zipf_weights(titles)
+    first_day = start - timedelta(days=deadline_days // 2)
+    for i, title_index in enumerate(_choices(rng, range(titles), title_weights, n)):
+        link = f"https://vantaa.rekrytointi.com/paikat/?o=A_RJ&jgid=1&jid={10000 + i}"
+        yield {
+            "id": i + 1,
+            "organisaatio": title_orgs[title_index],
+            "ammattiala": f"Ammattiala {title_index % 20 + 1}",
+            "tyotehtava": title_names[title_index],
+            "tyoavain": link,
+            "osoite": "",
+            "haku_paattyy_pvm": (first_day + timedelta(days=rng.randrange(deadline_days))).isoformat(),
+            "x": VANTAA[0] + rng.gauss(0, 0.08),
+            "y": VANTAA[1] + rng.gauss(0, 0.04),
+            "linkki": link
+        }
+
+
+# Daily gym usage entries like the ulkoliikunta files
+# areas and groups set the number of distinct areas and groupIds, trackables the number of
+# devices per group; the dates are spread over days days of year.
+def generate_gym_entries(n, areas=3, groups=8, trackables=3, days=365, year=2021, seed=0):
+    rng = random.Random(seed)
+    area_names = ["Hietaniemi", "Pirkkola", "Kivikko"][:areas] + [f"Area {i + 1}" for i in range(3, areas)]
+    area_weights = zipf_weights(len(area_names), 0.5)
+    first_day = date(year, 1, 1)
+    for area in _choices(rng, area_names, area_weights, n):
+        group = rng.randrange(groups)
+        sets = max(0, int(rng.gauss(150, 80)))
+        yield {
+            "utcdate": f"{(first_day + timedelta(days=rng.randrange(days))).isoformat()}T00:00:00.000Z",
+            "area": area,
+            "groupId": f"OG{10 + group}",
+            "trackableId": f"OG{10 + group}_{10000 + group * trackables + rng.randrange(trackables)}",
+            "usageMinutes": max(0, int(rng.gauss(215, 130))),
+            "sets": sets,
+            "repetitions": sets * rng.randint(5, 10)
+        }
+
+
+# Write records to a file as one JSON array, one record at a time
+def write_json(path, records):
+    count = 0
+    with open(path, 'w', encoding="utf-8") as file:
+        file.write("[")
+        for record in records:
+            file.write(",\n" if count else "\n")
+            file.write(json.dumps(record, ensure_ascii=False))
+            count += 1
+        file.write("\n]\n")
+    return count
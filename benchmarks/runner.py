@@ -0,0 +1,190 @@
+# Benchmark runner and result comparison.
+# For every suite and dataset size the generated dataset is written to a JSON file once, then
+# every case runs in its own fresh process, so the peak RSS of one case does not hide the next.
+# In that process the dataset is loaded first (not measured), the case is timed repeat times,
+# and finally run once more under tracemalloc to record the Python allocations:
+#   wall_seconds      - fastest of the timed runs (wall_seconds_all has every run)
+#   peak_rss_bytes    - peak resident set size of the process, dataset included
+#   rss_growth_bytes  - how much the case raised the peak RSS above the loaded dataset
+#   alloc_peak_bytes  - peak memory allocated by Python during the case (tracemalloc)
+#   alloc_blocks      - number of memory blocks the case allocated and still held at its peak
+# Results are saved as JSON together with the commit, Python version and machine, and two
+# result files can be compared to catch regressions between commits.
+import contextlib
+import datetime
+import fnmatch
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows: peak RSS is not recorded there
+    resource = None
+
+from .cases import SUITES
+from .generators import write_json
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+DEFAULT_THRESHOLD = 0.10
+# Cases faster than this are too noisy to flag as time regressions
+MIN_SECONDS = 0.001
+
+
+# Peak resident set size of this process in bytes, or None when it cannot be read
+def peak_rss():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+# Run one case in the current process and return its measurements
+def measure_case(suite, case, path, repeat=3):
+    _, _, load, cases = SUITES[suite]
+    function = cases[case]
+    with tempfile.TemporaryDirectory() as workdir, open(os.devnull, 'w') as devnull:
+        ctx = load(path, workdir)
+        # The scripts print progress messages; keep them out of the benchmark output
+        with contextlib.redirect_stdout(devnull):
+            # One untimed run, so imports and first-use costs are not timed
+            function(ctx)
+            baseline_rss = peak_rss()
+            times = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                function(ctx)
+                times.append(time.perf_counter() - start)
+            rss = peak_rss()
+
+            tracemalloc.start()
+            tracemalloc.reset_peak()
+            before = tracemalloc.take_snapshot()
+            function(ctx)
+            _, alloc_peak = tracemalloc.get_traced_memory()
+            after = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, "filename") if stat.count_diff > 0)
+    return {
+        "wall_seconds": min(times),
+        "wall_seconds_all": times,
+        "peak_rss_bytes": rss,
+        "rss_growth_bytes": None if rss is None else rss - baseline_rss,
+        "alloc_peak_bytes": alloc_peak,
+        "alloc_blocks": blocks
+    }
+
+
+# Run one case in a fresh process
+def _measure_isolated(suite, case, path, repeat):
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        return pool.submit(measure_case, suite, case, path, repeat).result()
+
+
+# Commit of the working tree, or None outside a git repository
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# Run the benchmarks and return the results
+# suites and cases select what to run (cases are fnmatch patterns such as "report" or "calc*");
+# options are the generator cardinalities (orgs, titles, areas, groups). With isolate=False the
+# cases run in this process, which is faster but makes peak RSS cumulative.
+def run_benchmarks(suites=None, sizes=DEFAULT_SIZES, cases=None, repeat=3, seed=0, isolate=True,
+                   progress=print, **options):
+    results = []
+    for suite in suites or SUITES:
+        generate, option_names, _, suite_cases = SUITES[suite]
+        names = [name for name in suite_cases if not cases or any(fnmatch.fnmatch(name, p) for p in cases)]
+        if not names:
+            continue
+        generator_options = {name: options[name] for name in option_names if options.get(name) is not None}
+        for rows in sizes:
+            with tempfile.TemporaryDirectory() as datadir:
+                path = os.path.join(datadir, f"{suite}.json")
+                write_json(path, generate(rows, seed=seed, **generator_options))
+                for name in names:
+                    if isolate:
+                        measured = _measure_isolated(suite, name, path, repeat)
+                    else:
+                        measured = measure_case(suite, name, path, repeat)
+                    result = {"suite": suite, "case": name, "rows": rows}
+                    result.update(measured)
+                    results.append(result)
+                    if progress:
+                        progress(f"{suite:<5} {name:<42} {rows:>9} rows {measured['wall_seconds']:>10.4f} s")
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "machine": platform.platform(),
+            "seed": seed,
+            "repeat": repeat,
+            "options": options
+        },
+        "results": results
+    }
+
+
+def save_results(results, path):
+    with open(path, 'w') as file:
+        json.dump(results, file, indent=2)
+
+
+def load_results(path):
+    with open(path, 'r') as file:
+        return json.load(file)
+
+
+# Compare two result sets case by case
+# Returns a list of rows (suite, case, rows, metric, old, new, ratio, status) where status is
+# "regression" when new is more than threshold worse than old, "improved" when it is that much
+# better and "" otherwise. Cases present in only one of the result sets are skipped.
+def compare_results(old, new, threshold=DEFAULT_THRESHOLD, metrics=("wall_seconds", "peak_rss_bytes", "alloc_peak_bytes")):
+    old_results = {(r["suite"], r["case"], r["rows"]): r for r in old["results"]}
+    rows = []
+    for result in new["results"]:
+        key = (result["suite"], result["case"], result["rows"])
+        if key not in old_results:
+            continue
+        for metric in metrics:
+            old_value, new_value = old_results[key].get(metric), result.get(metric)
+            if not old_value or new_value is None:
+                continue
+            ratio = new_value / old_value
+            status = ""
+            if metric != "wall_seconds" or max(old_value, new_value) >= MIN_SECONDS:
+                if ratio > 1 + threshold:
+                    status = "regression"
+                elif ratio < 1 - threshold:
+                    status = "improved"
+            rows.append(key + (metric, old_value, new_value, ratio, status))
+    return rows
+
+
+# Print a comparison table and return the number of regressions
+def print_comparison(rows, file=None):
+    file = file or sys.stdout
+    file.write(f"{'Suite':<6}{'Case':<43}{'Rows':>9} {'Metric':<17}{'Old':>14}{'New':>14}{'Change':>9}\n")
+    file.write("-" * 115 + "\n")
+    for suite, case, size, metric, old_value, new_value, ratio, status in rows:
+        file.write(f"{suite:<6}{case:<43}{size:>9} {metric:<17}{old_value:>14.6g}{new_value:>14.6g}"
+                   f"{ratio - 1:>+9.1%} {status}\n")
+    return sum(1 for row in rows if row[-1] == "regression")
@@ -0,0 +1,33 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from benchmarks.generators import generate_gym_entries, generate_job_postings
+from benchmarks.runner import compare_results, run_benchmarks
+
+
+def test_generators_are_seeded():
+    assert list(generate_job_postings(50, seed=1)) == list(generate_job_postings(50, seed=1))
+    assert list(generate_job_postings(50, seed=1)) != list(generate_job_postings(50, seed=2))
+    assert list(generate_gym_entries(50, seed=1)) == list(generate_gym_entries(50, seed=1))
+
+def test_generator_cardinalities():
+    postings = list(generate_job_postings(2000, orgs=5, titles=40))
+    assert len({entry["organisaatio"] for entry in postings}) <= 5
+    assert len({entry["tyotehtava"] for entry in postings}) <= 40
+    assert set(postings[0]) == {"id", "organisaatio", "ammattiala", "tyotehtava", "tyoavain", "osoite",
+                                "haku_paattyy_pvm", "x", "y", "linkki"}
+    entries = list(generate_gym_entries(2000, areas=5, groups=12))
+    assert len({entry["area"] for entry in entries}) == 5
+    assert len({entry["groupId"] for entry in entries}) == 12
+
+def test_run_and_compare():
+    results = run_benchmarks(["gym"], sizes=[200], cases=["calc*", "report"], repeat=1,
+                             isolate=False, progress=None)
+    assert [(r["case"], r["rows"]) for r in results["results"]] == [("calculate_statistics", 200), ("report", 200)]
+    assert all(r["wall_seconds"] > 0 and r["alloc_peak_bytes"] > 0 for r in results["results"])
+
+    slower = {"results": [dict(r, wall_seconds=r["wall_seconds"] * 2 + 0.01) for r in results["results"]]}
+    rows = compare_results(results, slower, metrics=("wall_seconds",))
+    assert [row[-1] for row in rows] == ["regression", "regression"]
+    assert [row[-1] for row in compare_results(slower, results, metrics=("wall_seconds",))] == ["improved", "improved"]
@@ -0,0 +1,8 @@
+import sys
+from pathlib import Path
+
+# The tests import every module by its package path from the repository root (analysis.cli,
+# project.src.data_analysis, extra_project.src.gym_aggregates), the same way python -m runs them
+ROOT = str(Path(__file__).resolve().parent)
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
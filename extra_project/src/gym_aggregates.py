@@ -0,0 +1,223 @@
+# Aggregates for the gym data analysis that can all be computed in a single pass.
+# Each aggregate keeps its own running state: add() is called once per entry and
+# result() returns the finished value. An AggregationEngine feeds every registered
+# aggregate from the same loop, so a report costs one scan of the data no matter
+# how many statistics it contains.
+# Aggregates of the same kind can also be combined with merge(), so parts of the data
+# can be aggregated separately (e.g. in parallel, see gym_parallel.py) and reduced afterwards.
+
+from analysis.ranking import FIRST_SEEN, top_k
+
+
+# Summarize a list of numeric values: average, maximum, minimum, median and standard deviation.
+# The values are sorted only once and the result uses the same keys as calculate_statistics.
+def summarize_values(values):
+    if not values:
+        return {}
+    count = len(values)
+    ordered = sorted(values)
+    avg = sum(ordered) / count
+    middle = count // 2
+    if count % 2 != 0:
+        median_value = ordered[middle]
+    else:
+        median_value = (ordered[middle - 1] + ordered[middle]) / 2
+    std_dev = (sum((x - avg) ** 2 for x in ordered) / count) ** 0.5
+    return {
+        "Average": round(avg, 2),
+        "Maximum": ordered[-1],
+        "Minimum": ordered[0],
+        "Median": median_value,
+        "Standard deviation": round(std_dev, 2)
+    }
+
+
+# Count all entries
+class CountAggregate:
+    def __init__(self):
+        self.count = 0
+
+    def add(self, entry):
+        self.count += 1
+
+    def merge(self, other):
+        self.count += other.count
+
+    def result(self):
+        return self.count
+
+
+# Count the values of a key and keep the k most frequent ones (k=None keeps all of them)
+# By default entries with equal counts keep the order in which the values were first seen;
+# see analysis.ranking for the other tie-breaking rules.
+class FrequencyAggregate:
+    def __init__(self, key, k=5, tie_break=FIRST_SEEN):
+        self.key = key
+        self.k = k
+        self.tie_break = tie_break
+        self.counts = {}
+
+    def add(self, entry):
+        if self.key in entry:
+            val = entry[self.key]
+            self.counts[val] = self.counts.get(val, 0) + 1
+
+    def merge(self, other):
+        for val, count in other.counts.items():
+            self.counts[val] = self.counts.get(val, 0) + count
+
+    def result(self):
+        return top_k(self.counts, self.k, self.tie_break)
+
+
+# Summary statistics of the numeric values of a key: average, maximum, minimum and standard deviation
+# Values that cannot be converted to a number are skipped. Only the count, minimum, maximum and
+# running moments are kept (Welford updates, merged with Chan's formula like ApproxStatisticsAggregate
+# in gym_sketches.py), so the memory stays the same however many entries are added or merged.
+# The result has no Median: the exact median needs every value. With median=True the values are all
+# kept (memory grows with the data, and run_parallel ships them between processes) and the result is
+# that of summarize_values, Median included.
+class StatisticsAggregate:
+    def __init__(self, key, median=False):
+        self.key = key
+        self.values = [] if median else None
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min_value = None
+        self.max_value = None
+
+    def add(self, entry):
+        if self.key in entry:
+            try:
+                value = float(entry[self.key])
+            except (TypeError, ValueError):
+                return
+            if self.values is not None:
+                self.values.append(value)
+                return
+            self.n += 1
+            delta = value - self.mean
+            self.mean += delta / self.n
+            self.m2 += delta * (value - self.mean)
+            self.min_value = value if self.min_value is None else min(self.min_value, value)
+            self.max_value = value if self.max_value is None else max(self.max_value, value)
+
+    def merge(self, other):
+        if (self.values is None) != (other.values is None):
+            raise ValueError("Cannot merge statistics with and without the median")
+        if self.values is not None:
+            self.values.extend(other.values)
+            return
+        if other.n == 0:
+            return
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self.m2 += other.m2 + delta * delta * self.n * other.n / n
+        self.mean += delta * other.n / n
+        self.n = n
+        self.min_value = other.min_value if self.min_value is None else min(self.min_value, other.min_value)
+        self.max_value = other.max_value if self.max_value is None else max(self.max_value, other.max_value)
+
+    def result(self):
+        if self.values is not None:
+            return summarize_values(self.values)
+        if self.n == 0:
+            return {}
+        return {
+            "Average": round(self.mean, 2),
+            "Maximum": self.max_value,
+            "Minimum": self.min_value,
+            "Standard deviation": round((self.m2 / self.n) ** 0.5, 2)
+        }
+
+
+# Keep the entries whose date is within [start_date, end_date] and that match every key-value pair
+# filters is a list of (key, value) pairs; an entry missing the date key or any filter key is skipped.
+class FilterAggregate:
+    def __init__(self, date_key, start_date, end_date, filters):
+        self.date_key = date_key
+        self.start_date = start_date
+        self.end_date = end_date
+        self.filters = list(filters)
+        self.entries = []
+
+    def add(self, entry):
+        if self.date_key not in entry:
+            return
+        for key, value in self.filters:
+            if key not in entry or entry[key] != value:
+                return
+        if self.start_date <= entry[self.date_key] <= self.end_date:
+            self.entries.append(entry)
+
+    def merge(self, other):
+        self.entries.extend(other.entries)
+
+    def result(self):
+        return self.entries
+
+
+# Collect the distinct values of a key, returned as a sorted list
+class DistinctAggregate:
+    def __init__(self, key):
+        self.key = key
+        self.values = set()
+
+    def add(self, entry):
+        if self.key in entry:
+            self.values.add(entry[self.key])
+
+    def merge(self, other):
+        self.values |= other.values
+
+    def result(self):
+        return sorted(self.values)
+
+
+# Feed a group of named aggregates from a single pass over the data
+# Usage:
+#   engine = AggregationEngine()
+#   engine.register("total", CountAggregate())
+#   engine.register("areas", FrequencyAggregate("area"))
+#   results = engine.run(stream_json_file(filename))   # {"total": ..., "areas": [...]}
+class AggregationEngine:
+    def __init__(self):
+        self.aggregates = {}
+
+    def register(self, name, aggregate):
+        if name in self.aggregates:
+            raise ValueError(f"Aggregate '{name}' is already registered")
+        self.aggregates[name] = aggregate
+        return aggregate
+
+    # Feed a single entry to all aggregates
+    def add(self, entry):
+        for aggregate in self.aggregates.values():
+            aggregate.add(entry)
+
+    # Feed every entry of data to all aggregates
+    def feed(self, data):
+        adders = [aggregate.add for aggregate in self.aggregates.values()]
+        for entry in data:
+            for add in adders:
+                add(entry)
+
+    # Combine the state of another engine with the same registered aggregates into this one
+    def merge(self, other):
+        for name, aggregate in self.aggregates.items():
+            aggregate.merge(other.aggregates[name])
+
+    def results(self):
+        return {name: aggregate.result() for name, aggregate in self.aggregates.items()}
+
+    def run(self, data):
+        self.feed(data)
+        return self.results()
+
+
+# Run a single aggregate over the data and return its result
+def run_aggregate(data, aggregate):
+    for entry in data:
+        aggregate.add(entry)
+    return aggregate.result()
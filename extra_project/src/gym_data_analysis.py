@@ -1,68 +1,72 @@
 import json
+import sys
+from itertools import chain
+from pathlib import Path
 
-def load_json_file(filename):
+from analysis.cache import cached_load
+from analysis.instrument import Instrument
+from analysis.jsonstream import ArrayStreamDecoder
+from analysis.writers import open_buffered
+
+from .gym_aggregates import (
+    AggregationEngine, CountAggregate, DistinctAggregate, FilterAggregate,
+    FrequencyAggregate, StatisticsAggregate, run_aggregate
+)
+
+# Parse a whole JSON file
+def read_json_file(filename):
+    with open(filename, 'r') as file:
+        return json.load(file)
+
+def load_json_file(filename, use_cache=False):
     # Load and parse a JSON file, handling errors.
+    # With use_cache=True the parsed data is kept in a binary snapshot next to the file,
+    # so loading the same unchanged file again skips JSON parsing.
     try:
-        with open(filename, 'r') as file:
-            data = json.load(file)
-        return data
+        if use_cache:
+            return cached_load(filename, read_json_file)
+        return read_json_file(filename)
     except (json.JSONDecodeError, FileNotFoundError, IOError) as error:
         print(f" Error loading JSON file: {error}")
         return None
 
+# Stream the records of a JSON file whose top level is an array, one record at a time.
+# The file is read in chunks and each array element is decoded as soon as it is complete,
+# so only one record (plus the current chunk) is kept in memory, however large the file is.
+# A file that cannot be read or is not valid JSON raises its error (after printing it), so
+# the records read before the error are never mistaken for the whole file.
+def stream_json_file(filename, chunk_size=65536):
+    decoder = ArrayStreamDecoder()
+    try:
+        with open(filename, 'r') as file:
+            for chunk in iter(lambda: file.read(chunk_size), ""):
+                yield from decoder.feed(chunk)
+                if decoder.whole:
+                    raise json.JSONDecodeError("Expecting '[' at the start of the file", chunk, 0)
+            yield from decoder.close()
+    except (json.JSONDecodeError, FileNotFoundError, IOError) as error:
+        print(f" Error streaming JSON file: {error}")
+        raise
+
+# The analysis functions below walk the data only once, so they accept a list
+# or any iterator of entries, such as the generator returned by stream_json_file.
+
 # Count the total number of entries in the dataset
 def count_entries(data):
-    return len(data)
+    try:
+        return len(data)
+    except TypeError:
+        return sum(1 for _ in data)
 
 # Find the most frequent occurrences of a specific key in the dataset
-# This function counts the occurrences of each unique value for the specified key and returns the top 5 most common entries.
-def most_frequent_entries(data, key):
-    freq_dict = {}
-    for entry in data:
-        if key in entry:
-            val = entry[key]
-            if val in freq_dict:
-                freq_dict[val] += 1
-            else:
-                freq_dict[val] = 1
-    sorted_freq = []
-    for k in freq_dict:
-        inserted = False
-        for i in range(len(sorted_freq)):
-            if freq_dict[k] > sorted_freq[i][1]:
-                sorted_freq.insert(i, (k, freq_dict[k]))
-                inserted = True
-                break
-        if not inserted:
-            sorted_freq.append((k, freq_dict[k]))
-    return sorted_freq[:5]  # Top 5 most common entries
+# This function counts the occurrences of each unique value for the specified key and returns the top k (default 5) most common entries.
+def most_frequent_entries(data, key, k=5):
+    return run_aggregate(data, FrequencyAggregate(key, k))
 
 # Calculate summary statistics for a given numeric key in the dataset
 # This function computes the average, maximum, minimum, median, and standard deviation for the specified key.
 def calculate_statistics(data, key):
-    values = []
-    for entry in data:
-        if key in entry:
-            try:
-                values.append(float(entry[key]))
-            except ValueError:
-                continue
-            
-    # Calculate average, maximum, minimum, median, and standard deviation
-    if values:
-        avg = sum(values) / len(values)
-        max_value = max(values)
-        min_value = min(values)
-        median_value = sorted(values)[len(values) // 2] if len(values) % 2 != 0 else (sorted(values)[len(values) // 2 - 1] + sorted(values)[len(values) // 2]) / 2
-        std_dev = (sum([(x - avg) ** 2 for x in values]) / len(values)) ** 0.5
-        return {
-            "Average": round(avg,2),
-            "Maximum": max_value,
-            "Minimum": min_value,
-            "Median": median_value,
-            "Standard deviation": round(std_dev,2)
-        }
-    return {}
+    return run_aggregate(data, StatisticsAggregate(key, median=True))
 
 # Filter the dataset based on a date range and two specific key-value pairs
 # This function returns entries that fall within the specified date range and match the given key-value pairs.
@@ -71,25 +75,21 @@ def filter_by_date_and_key(data,
     filter_key, filter_value, 
     filter_key2, filter_value2
     ):
-    filtered_data = []
-    for entry in data:
-        
-        if (date_key in entry and filter_key in entry) and (date_key in entry and filter_key2 in entry):
-            date_value = entry[date_key]
-            if (start_date <= date_value <= end_date and entry[filter_key] == filter_value) and (start_date <= date_value <= end_date and entry[filter_key2] == filter_value2):
-                filtered_data.append(entry)
-    return filtered_data
+    filters = [(filter_key, filter_value), (filter_key2, filter_value2)]
+    return run_aggregate(data, FilterAggregate(date_key, start_date, end_date, filters))
 
 # Get all unique key from the dataset, for example groupId
 # This function returns a sorted list of unique group IDs found in the dataset.
 # Note: This function is not used in the main analysis but can be useful for further analysis.
 def get_all_group_ids(data):
-    return sorted(set(entry.get("groupId") for entry in data if "groupId" in entry))
+    return run_aggregate(data, DistinctAggregate("groupId"))
 
 
 # Generate a report of the analysis results
+# The report is written through a large buffer. filtered_data and group_ids can also be
+# iterators, so long listings are written without first being collected into a list.
 def generate_report(filename, total_entries, frequent_entries, stats, filtered_data,count_appearance, group_ids ):
-    with open(filename, 'w') as report:
+    with open_buffered(filename) as report:
         report.write(f"Total Entries: {total_entries}\n")
         
         # Writing table header for frequent entries if available
@@ -102,6 +102,10 @@ def generate_report(filename, total_entries, frequent_entries, stats, filtered_d
                 if len(entry) == 2:
                     location, count = entry
                     report.write(f"{location:<25} {count:>10}\n")
+                elif len(entry) == 3:
+                    # Approximate counts come with their maximum overestimation
+                    location, count, error = entry
+                    report.write(f"{location:<25} {count:>10} (±{error})\n")
         
         # Writing table header for statistics 
         if stats:
@@ -113,10 +117,14 @@ def generate_report(filename, total_entries, frequent_entries, stats, filtered_d
             # Writing table rows for statistics
             for stat, value in stats.items():
                 report.write(f"{(stat):<25} {(value):>10}\n")
+            # The sketches report their rank error; an exact median is only possible with every value in memory
+            if "Median" in stats and "Percentile rank error" not in stats:
+                report.write("Exact median: every value was kept in memory (O(n)); --approximate uses fixed memory\n")
         
          # Writing table header for filtered data if available         
-        if filtered_data:
-            first_entry = filtered_data[0]
+        filtered_rows = iter(filtered_data)
+        first_entry = next(filtered_rows, None)
+        if first_entry is not None:
             headers = list(first_entry.keys())
             filer_name = "FILTERED DATA"
             report.write(f"\n{filer_name:>50}\n")
@@ -125,7 +133,7 @@ def generate_report(filename, total_entries, frequent_entries, stats, filtered_d
             report.write("-" * 100 + "\n")
             
             # Writing table rows
-            for entry in filtered_data:
+            for entry in chain([first_entry], filtered_rows):
                 if len(headers) >= 2:
                     report.write(f"{str(entry.get(headers[0], '')):<25} {str(entry.get(headers[1], '')):>20} {str(entry.get(headers[2], '')):>20}{str(entry.get(headers[4], '')):>20}\n")
 
@@ -136,43 +144,81 @@ def generate_report(filename, total_entries, frequent_entries, stats, filtered_d
             report.write(f"{key}: {values}\n")
         
         # Writing all unique key for example: groupIds
+        # In approximate mode only the estimated number of distinct ids is known
         report.write("\nAll Unique Group IDs:\n")
         report.write("=" * 35 + "\n")
-        for gid in group_ids:
-            report.write(f"{gid}\n")
+        if isinstance(group_ids, dict):
+            for key, value in group_ids.items():
+                report.write(f"{key}: {value}\n")
+        else:
+            report.writelines(f"{gid}\n" for gid in group_ids)
             
 
-# Testing function 
+# Testing function, run from the repository root: python -m extra_project.src.gym_data_analysis
+# The exact median keeps every usageMinutes value in memory, so the default report needs O(n) memory
+# (the report says so under the statistics); everything else is computed while the file streams.
+# Run with --approximate to compute the frequencies, median and distinct ids with fixed-memory sketches
+# Run with --raw to answer the report with raw scans of the memory-mapped file (see gym_rawscan.py)
 if __name__ == "__main__":
-    json_file = "../json/ulkoliikunta-daily-2021.json"
-    data = load_json_file(json_file)
-    if data:
-        total_entries = count_entries(data)
-        
-        # Example key for frequent entries and statistics
-        frequent = most_frequent_entries(data, "area")
-        statistics_data = calculate_statistics(data, "usageMinutea") # should be numeric 
-        
-        # Filter data for a specific date range and two specific key-value pairs
-        # Note: Ensure that the date format in the dataset matches the format used in the filter
-        filtered_data = filter_by_date_and_key(data, 
-                        "utcdate", "2021-08-01T00:00:00.000Z", "2021-08-30T23:59:59.999Z", 
-                        "groupId", "OG30", 
-                        "area", "Pirkkola"
-                   )
-        filtered_entries_count = count_entries(filtered_data)
-        count_appearance = {"Number of filtered entries": filtered_entries_count}
-        
-        # Get unique value in a specific key
-        group_ids = get_all_group_ids(data)
+    json_file = str(Path(__file__).resolve().parents[1] / "json" / "ulkoliikunta-daily-2021.json")
+    approximate = "--approximate" in sys.argv
+    raw = "--raw" in sys.argv
+    if approximate:
+        from .gym_sketches import ApproxDistinctAggregate, ApproxFrequencyAggregate, ApproxStatisticsAggregate
+    
+    # Register every statistic of the report once and compute them all in one pass over the file
+    engine = AggregationEngine()
+    engine.register("total_entries", CountAggregate())
+    if approximate:
+        engine.register("frequent", ApproxFrequencyAggregate("area", 5))
+        engine.register("statistics", ApproxStatisticsAggregate("usageMinutes"))
+    else:
+        engine.register("frequent", FrequencyAggregate("area", 5))
+        # should be numeric; the exact median keeps every value in memory (O(n))
+        engine.register("statistics", StatisticsAggregate("usageMinutes", median=True))
+    
+    # Filter data for a specific date range and two specific key-value pairs
+    # Note: Ensure that the date format in the dataset matches the format used in the filter
+    engine.register("filtered", FilterAggregate(
+                    "utcdate", "2021-08-01T00:00:00.000Z", "2021-08-30T23:59:59.999Z", 
+                    [("groupId", "OG30"), ("area", "Pirkkola")]
+                ))
+    
+    # Get unique value in a specific key
+    if approximate:
+        engine.register("group_ids", ApproxDistinctAggregate("groupId"))
+    else:
+        engine.register("group_ids", DistinctAggregate("groupId"))
+    
+    # Parsing and all the aggregates run interleaved in one pass, so they are timed as one stage.
+    # Set ANALYSIS_TRACE=trace.json to save the stage timings (see analysis/instrument.py).
+    instrument = Instrument.from_environment()
+    try:
+        if raw:
+            from .gym_rawscan import RawScanner, report_results
+            with instrument.stage("raw_scan", inputs=[json_file]) as stage, RawScanner(json_file) as scanner:
+                results = report_results(scanner, "utcdate", "2021-08-01T00:00:00.000Z", "2021-08-30T23:59:59.999Z",
+                                         [("groupId", "OG30"), ("area", "Pirkkola")])
+                stage.rows = results["total_entries"]
+        else:
+            with instrument.stage("stream_json_file+aggregate", inputs=[json_file],
+                                  aggregates=list(engine.aggregates)) as stage:
+                results = engine.run(stream_json_file(json_file))
+                stage.rows = results["total_entries"]
+        if results["total_entries"]:
+            filtered_data = results["filtered"]
+            count_appearance = {"Number of filtered entries": count_entries(filtered_data)}
     
-    generate_report(
-            "gym_data_analysis.txt",
-            total_entries,
-            frequent,
-            statistics_data,
-            filtered_data,
-            count_appearance,
-            group_ids
-        )
-    print("Report generated successfully.")
\ No newline at end of file
+            with instrument.stage("generate_report", rows=results["total_entries"], outputs=["gym_data_analysis.txt"]):
+                generate_report(
+                        "gym_data_analysis.txt",
+                        results["total_entries"],
+                        results["frequent"],
+                        results["statistics"],
+                        filtered_data,
+                        count_appearance,
+                        results["group_ids"]
+                    )
+            print("Report generated successfully.")
+    finally:
+        instrument.finish()
\ No newline at end of file
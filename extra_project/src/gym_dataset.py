@@ -0,0 +1,202 @@
+# Columnar, NumPy-backed version of the ulkoliikunta usage data.
+# Instead of a list of per-row dicts, every field is stored as one array:
+#   - numeric fields (usageMinutes, sets, repetitions) as int32 (int64 when the values do not
+#     fit), or float32 with NaN for missing values when a column is not purely integer
+#   - categorical fields (area, groupId, trackableId) as int32 codes into a list of categories
+#   - utcdate as datetime64[ms]
+# The analysis methods work on whole columns at once, so they are much faster than the
+# dict-based functions in gym_data_analysis.py and use a fraction of the memory.
+# NumPy is an optional dependency: import this module only when it is installed.
+from array import array
+
+import numpy as np
+
+from .gym_data_analysis import stream_json_file
+
+DATE_FIELD = "utcdate"
+NUMERIC_FIELDS = ("usageMinutes", "sets", "repetitions")
+CATEGORICAL_FIELDS = ("area", "groupId", "trackableId")
+
+
+# Convert an ISO date string (e.g. "2021-08-15T00:00:00.000Z") to numpy datetime64[ms]
+# The trailing "Z" is removed because numpy does not accept timezone designators.
+def to_datetime64(value):
+    if value is None:
+        return np.datetime64("NaT", "ms")
+    if value.endswith("Z"):
+        value = value[:-1]
+    return np.datetime64(value, "ms")
+
+
+# Turn a column of Python numbers into a compact numpy array
+# Integer columns become int32, or stay int64 when a value does not fit in int32;
+# anything else (and integers beyond int64) becomes float32 with NaN for missing values.
+def _numeric_column(values):
+    if all(isinstance(val, int) and not isinstance(val, bool) for val in values):
+        try:
+            column = np.frombuffer(array("q", values), dtype=np.int64)
+        except OverflowError:
+            pass
+        else:
+            limits = np.iinfo(np.int32)
+            if not len(column) or (column.min() >= limits.min and column.max() <= limits.max):
+                return column.astype(np.int32)
+            return column.copy()
+    column = np.empty(len(values), dtype=np.float32)
+    for i, val in enumerate(values):
+        try:
+            column[i] = float(val)
+        except (TypeError, ValueError):
+            column[i] = np.nan
+    return column
+
+
+class GymDataset:
+    def __init__(self, dates, numeric, codes, categories, category_codes=None):
+        self.dates = dates                  # datetime64[ms] array
+        self.numeric = numeric              # field -> int32/int64/float32 array
+        self.codes = codes                  # field -> int32 array of category codes (-1 = missing)
+        self.categories = categories        # field -> list of category values
+        # field -> {category value: code}, so a value is looked up in O(1)
+        if category_codes is None:
+            category_codes = {field: {value: code for code, value in enumerate(values)}
+                              for field, values in categories.items()}
+        self.category_codes = category_codes
+
+    # Build the dataset from an iterable of dict records in a single pass
+    # Works with a list or with the generator returned by stream_json_file.
+    @classmethod
+    def from_records(cls, records):
+        date_lookup = {}
+        date_codes = array("i")
+        numeric_values = {field: [] for field in NUMERIC_FIELDS}
+        lookups = {field: {} for field in CATEGORICAL_FIELDS}
+        codes = {field: array("i") for field in CATEGORICAL_FIELDS}
+
+        for record in records:
+            # utcdate has only a few distinct values (one per day), so it is coded as well
+            date_value = record.get(DATE_FIELD)
+            date_codes.append(date_lookup.setdefault(date_value, len(date_lookup)))
+            for field in NUMERIC_FIELDS:
+                numeric_values[field].append(record.get(field))
+            for field in CATEGORICAL_FIELDS:
+                value = record.get(field)
+                if value is None:
+                    codes[field].append(-1)
+                else:
+                    lookup = lookups[field]
+                    codes[field].append(lookup.setdefault(value, len(lookup)))
+
+        distinct_dates = np.array([to_datetime64(value) for value in date_lookup], dtype="datetime64[ms]")
+        dates = distinct_dates[np.frombuffer(date_codes, dtype=np.int32)] if len(date_codes) else distinct_dates
+        return cls(
+            dates,
+            {field: _numeric_column(values) for field, values in numeric_values.items()},
+            {field: np.frombuffer(codes[field], dtype=np.int32).copy() for field in CATEGORICAL_FIELDS},
+            {field: list(lookups[field]) for field in CATEGORICAL_FIELDS},
+            lookups
+        )
+
+    # Load the dataset from a JSON file without keeping the dict records in memory
+    @classmethod
+    def from_json_file(cls, filename):
+        return cls.from_records(stream_json_file(filename))
+
+    def __len__(self):
+        return len(self.dates)
+
+    # Total size of the column arrays in bytes
+    def memory_usage(self):
+        arrays = [self.dates] + list(self.numeric.values()) + list(self.codes.values())
+        return sum(column.nbytes for column in arrays)
+
+    # Return the values of a column as a numpy array (categories are decoded)
+    def column(self, key):
+        if key == DATE_FIELD:
+            return self.dates
+        if key in self.numeric:
+            return self.numeric[key]
+        if key in self.codes:
+            categories = np.array(self.categories[key] + [None], dtype=object)
+            return categories[self.codes[key]]
+        raise KeyError(key)
+
+    # Boolean mask of the rows where key == value
+    def equals_mask(self, key, value):
+        if key in self.codes:
+            code = self.category_codes[key].get(value)
+            if code is None:
+                return np.zeros(len(self), dtype=bool)
+            return self.codes[key] == code
+        if key == DATE_FIELD:
+            return self.dates == to_datetime64(value)
+        if key in self.numeric:
+            return self.numeric[key] == value
+        raise KeyError(key)
+
+    # Boolean mask of the rows whose date is within [start_date, end_date]
+    def date_range_mask(self, start_date, end_date):
+        return (self.dates >= to_datetime64(start_date)) & (self.dates <= to_datetime64(end_date))
+
+    # Return a new dataset with the rows selected by a boolean mask or an index array
+    def take(self, rows):
+        return GymDataset(
+            self.dates[rows],
+            {field: column[rows] for field, column in self.numeric.items()},
+            {field: column[rows] for field, column in self.codes.items()},
+            self.categories,
+            self.category_codes
+        )
+
+    # Convert the rows back to dict records, in the same form as the JSON file
+    def to_records(self):
+        columns = {DATE_FIELD: [None if np.isnat(value) else str(value) + "Z" for value in self.dates]}
+        for field in CATEGORICAL_FIELDS:
+            columns[field] = self.column(field).tolist()
+        for field in NUMERIC_FIELDS:
+            columns[field] = [None if val != val else val for val in self.numeric[field].tolist()]
+        fields = [DATE_FIELD] + list(CATEGORICAL_FIELDS) + list(NUMERIC_FIELDS)
+        return [dict(zip(fields, row)) for row in zip(*(columns[field] for field in fields))]
+
+    # Vectorized calculate_statistics: average, maximum, minimum, median and standard deviation
+    def calculate_statistics(self, key):
+        values = self.numeric[key]
+        if values.dtype.kind == "f":
+            values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return {}
+        values = values.astype(np.float64)
+        return {
+            "Average": round(float(values.mean()), 2),
+            "Maximum": float(values.max()),
+            "Minimum": float(values.min()),
+            "Median": float(np.median(values)),
+            "Standard deviation": round(float(values.std()), 2)
+        }
+
+    # Vectorized most_frequent_entries: the k most common values of a key with their counts
+    # Ties keep the order in which the values first appear, like the dict-based version.
+    def most_frequent_entries(self, key, k=5):
+        if key in self.codes:
+            codes = self.codes[key]
+            counts = np.bincount(codes[codes >= 0], minlength=len(self.categories[key]))
+            order = np.argsort(-counts, kind="stable")[:k]
+            return [(self.categories[key][i], int(counts[i])) for i in order if counts[i] > 0]
+        values = self.column(key)
+        unique, first_index, counts = np.unique(values, return_index=True, return_counts=True)
+        order = np.lexsort((first_index, -counts))[:k]
+        return [(unique[i].item(), int(counts[i])) for i in order]
+
+    # Vectorized filter_by_date_and_key: rows within the date range matching both key-value pairs
+    # Returns a new GymDataset; call to_records() on it to get dicts.
+    def filter_by_date_and_key(self,
+        date_key, start_date, end_date,
+        filter_key, filter_value,
+        filter_key2, filter_value2
+        ):
+        if date_key != DATE_FIELD:
+            raise KeyError(date_key)
+        mask = self.equals_mask(filter_key, filter_value)
+        mask &= self.equals_mask(filter_key2, filter_value2)
+        mask &= self.date_range_mask(start_date, end_date)
+        return self.take(mask)
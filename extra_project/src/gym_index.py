@@ -0,0 +1,82 @@
+# Index over the gym dataset for fast date range and equality queries.
+# The index is built once and can then answer many filter_by_date_and_key style queries:
+#   - the entries are ordered by date (utcdate), so a date range is found with two binary searches
+#   - hash indexes on area and groupId map each value to the positions of its entries in that
+#     date order, so a range inside one area or group is also found with binary search
+# A range + equality query then costs O(log n + k) instead of a full scan of the data.
+from bisect import bisect_left, bisect_right
+
+DEFAULT_INDEXED_KEYS = ("area", "groupId")
+
+
+class GymIndex:
+    def __init__(self, data, date_key="utcdate", keys=DEFAULT_INDEXED_KEYS):
+        self.date_key = date_key
+        entries = [entry for entry in data if date_key in entry]
+        # The ulkoliikunta data is normally already ordered by date, so sorting is usually skipped
+        if any(entries[i][date_key] > entries[i + 1][date_key] for i in range(len(entries) - 1)):
+            entries.sort(key=lambda entry: entry[date_key])
+        self.entries = entries
+        self.dates = [entry[date_key] for entry in entries]
+
+        # value -> positions in self.entries (ascending, therefore also ordered by date)
+        self.hash_indexes = {}
+        for key in keys:
+            index = {}
+            for position, entry in enumerate(entries):
+                if key in entry:
+                    index.setdefault(entry[key], []).append(position)
+            self.hash_indexes[key] = index
+
+    def __len__(self):
+        return len(self.entries)
+
+    # Return the positions [lo, hi) of the entries whose date is within [start_date, end_date]
+    def date_range(self, start_date, end_date):
+        return bisect_left(self.dates, start_date), bisect_right(self.dates, end_date)
+
+    # Return the date-ordered positions of the entries where key == value
+    # Only keys given to the constructor are indexed.
+    def lookup(self, key, value):
+        return self.hash_indexes[key].get(value, [])
+
+    # Return the positions where key == value and the date is within [start_date, end_date]
+    def lookup_between(self, key, value, start_date, end_date):
+        positions = self.lookup(key, value)
+        lo, hi = self.date_range(start_date, end_date)
+        return positions[bisect_left(positions, lo):bisect_left(positions, hi)]
+
+    # Return the entries at the given positions
+    def entries_at(self, positions):
+        return [self.entries[position] for position in positions]
+
+    # Return the entries whose date is within [start_date, end_date]
+    def between(self, start_date, end_date):
+        lo, hi = self.date_range(start_date, end_date)
+        return self.entries[lo:hi]
+
+    # Indexed version of filter_by_date_and_key with the same arguments
+    # The most selective indexed key is searched first and the other key is checked on its matches only.
+    # The entries are returned in date order.
+    def filter_by_date_and_key(self,
+        date_key, start_date, end_date,
+        filter_key, filter_value,
+        filter_key2, filter_value2
+        ):
+        if date_key != self.date_key:
+            raise KeyError(date_key)
+        candidates = []
+        for key, value in ((filter_key, filter_value), (filter_key2, filter_value2)):
+            if key in self.hash_indexes:
+                candidates.append(self.lookup_between(key, value, start_date, end_date))
+        if candidates:
+            positions = min(candidates, key=len)
+        else:
+            positions = range(*self.date_range(start_date, end_date))
+
+        filtered_data = []
+        for position in positions:
+            entry = self.entries[position]
+            if (filter_key in entry and entry[filter_key] == filter_value) and (filter_key2 in entry and entry[filter_key2] == filter_value2):
+                filtered_data.append(entry)
+        return filtered_data
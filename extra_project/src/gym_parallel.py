@@ -0,0 +1,169 @@
+# Parallel analysis of the gym data across CPU cores.
+# The input (one JSON file, or a directory of daily/monthly ulkoliikunta JSON files) is cut into
+# partitions by byte range. Each partition is parsed and aggregated in a separate process with a
+# copy of an AggregationEngine, and the partial engines are merged in a final reduce step:
+#
+#   engine = AggregationEngine()
+#   engine.register("areas", FrequencyAggregate("area"))
+#   engine.register("stats", StatisticsAggregate("usageMinutes"))
+#   results = run_parallel(engine, "../json", workers=4)
+#
+# The partial engines are pickled back to the parent, so their size is what crosses between
+# processes: counters for most aggregates, but every value for StatisticsAggregate(key, median=True)
+# and every matching record for FilterAggregate.
+#
+# Partitions are located without parsing: a record starts at a "{" and ends at the next "}" that
+# are not inside a string value (see analysis/jsonstream.py). Each byte range is moved forward to
+# the start of a record, so every record belongs to exactly one partition. This holds for the
+# ulkoliikunta files, whose records are flat objects; files with nested objects have to be split
+# by file (partition_bytes=None) instead, otherwise their records fail to parse.
+import copy
+import json
+import mmap
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from analysis.jsonstream import count_quotes, record_end
+
+from .gym_data_analysis import stream_json_file
+
+DEFAULT_PARTITION_BYTES = 32 * 1024 * 1024  # 32 MB
+MIN_PARTITION_BYTES = 1024 * 1024           # 1 MB
+READ_SIZE = 1024 * 1024
+
+
+# List the JSON files of the input: the file itself, or every *.json file of a directory
+def input_files(source):
+    if os.path.isdir(source):
+        return sorted(
+            os.path.join(source, name) for name in os.listdir(source) if name.endswith(".json")
+        )
+    return [source]
+
+
+# Cut the input into (filename, start, end) byte ranges of about partition_bytes each
+# Every range but the first of a file starts at the opening "{" of a record.
+# With partition_bytes=None every file is a single partition.
+def make_partitions(source, partition_bytes=DEFAULT_PARTITION_BYTES):
+    partitions = []
+    for filename in input_files(source):
+        size = os.path.getsize(filename)
+        if not partition_bytes or size <= partition_bytes:
+            partitions.append((filename, 0, None))
+            continue
+        starts = [0] + record_starts(filename, range(partition_bytes, size, partition_bytes))
+        ends = starts[1:] + [size]
+        partitions.extend((filename, start, end) for start, end in zip(starts, ends) if start < end)
+    return partitions
+
+
+# Offsets of the first record starting at or after each of the (increasing) cut offsets of a file
+# The quotes before each cut are counted, so a "{" inside a string value is never taken for a record.
+def record_starts(filename, cuts):
+    starts = []
+    with open(filename, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        quotes = 0     # unescaped quotes in data[:pos]
+        pos = 0
+        for cut in cuts:
+            if cut < pos:
+                continue
+            quotes += count_quotes(data, pos, cut)
+            pos = cut
+            while True:
+                brace = data.find(b"{", pos)
+                if brace == -1:
+                    return starts
+                quotes += count_quotes(data, pos, brace)
+                pos = brace
+                if quotes % 2 == 0:
+                    starts.append(brace)
+                    break
+                pos += 1
+    return starts
+
+
+# Read the records whose opening "{" lies in [start, end) of a file of flat JSON records
+# start must be 0 or the start of a record, as in the partitions of make_partitions.
+def read_partition(filename, start, end):
+    with open(filename, 'rb') as file:
+        file.seek(start)
+        offset = start        # file offset of buffer[0]
+        buffer = b""
+        pos = 0
+        while True:
+            # Between two records: the next "{" starts a record
+            open_at = buffer.find(b"{", pos)
+            close_at = record_end(buffer, open_at) if open_at != -1 else None
+            if close_at is None:
+                # Need more data: keep only the unfinished record
+                if open_at == -1:
+                    offset += len(buffer)
+                    buffer = b""
+                else:
+                    offset += open_at
+                    buffer = buffer[open_at:]
+                if end is not None and offset >= end:
+                    return
+                more = file.read(READ_SIZE)
+                if not more:
+                    if open_at != -1:
+                        raise json.JSONDecodeError("Unterminated record", buffer.decode("utf-8", "replace"), 0)
+                    return
+                buffer += more
+                pos = 0
+                continue
+            if end is not None and offset + open_at >= end:
+                return
+            yield json.loads(buffer[open_at:close_at])
+            pos = close_at
+
+
+# Aggregate one partition into a fresh copy of the engine (runs in a worker process)
+def aggregate_partition(engine, partition):
+    filename, start, end = partition
+    if start == 0 and end is None:
+        records = stream_json_file(filename)
+    else:
+        records = read_partition(filename, start, end)
+    engine.feed(records)
+    return engine
+
+
+# Run every aggregate of engine over the input in parallel and return the merged results
+# engine must have its aggregates registered but not fed yet; workers defaults to the number of CPUs.
+# With workers=1 the partitions are processed one after another in this process.
+def run_parallel(engine, source, workers=None, partition_bytes=DEFAULT_PARTITION_BYTES):
+    workers = workers or os.cpu_count() or 1
+    if partition_bytes:
+        # Make at least one partition per worker, unless that would make them tiny
+        total = sum(os.path.getsize(filename) for filename in input_files(source))
+        partition_bytes = min(partition_bytes, max(MIN_PARTITION_BYTES, -(-total // workers)))
+    partitions = make_partitions(source, partition_bytes)
+    empty = copy.deepcopy(engine)
+    if workers == 1:
+        partials = [aggregate_partition(copy.deepcopy(empty), partition) for partition in partitions]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            partials = list(pool.map(aggregate_partition, [empty] * len(partitions), partitions))
+    # Reduce in partition order, so merged entry lists keep the file order
+    for partial in partials:
+        engine.merge(partial)
+    return engine.results()
+
+
+# Run every aggregate of engine over several remote JSON feeds (e.g. one per area or month)
+# The feeds are downloaded concurrently and each one is decoded straight into its own copy of
+# the engine while it downloads (see analysis/fetcher.py); the copies are merged in the order of
+# urls. Options (concurrency, timeout, retries, ...) go to AsyncFetcher. Feeds that fail are
+# left out and reported.
+def run_remote(engine, urls, **options):
+    # Imported here so asyncio is only loaded when remote feeds are used
+    from analysis.fetcher import fetch_all
+    empty = copy.deepcopy(engine)
+    fetched = fetch_all({url: (url, lambda: copy.deepcopy(empty)) for url in urls}, **options)
+    for url, result in fetched.items():
+        if result["result"] is None:
+            print(f"Failed to fetch {url}: {result['error']}")
+            continue
+        engine.merge(result["result"])
+    return engine.results()
@@ -0,0 +1,175 @@
+# Small query API for the gym dataset.
+# Instead of writing a new scan function for every filter, conditions are chained:
+#
+#   rows = (query(data)
+#           .where(area="Pirkkola")
+#           .between("utcdate", "2021-08-01T00:00:00.000Z", "2021-08-31T23:59:59.999Z")
+#           .where_in("groupId", {"OG30", "OG10"}))
+#   for entry in rows: ...          # results are produced lazily
+#   rows.count()
+#
+# The conditions are compiled once when the results are requested. When the query runs on a
+# GymIndex, the most selective condition that the index can answer is used to pick the candidate
+# entries and only the remaining conditions are checked on them. Without an index the conditions
+# are checked in order of expected selectivity (equality first, ranges last).
+from bisect import bisect_left
+from heapq import merge
+
+from .gym_index import GymIndex
+
+
+# key == value
+class Equals:
+    rank = 0
+
+    def __init__(self, key, value):
+        self.key = key
+        self.value = value
+
+    def matches(self, entry):
+        return self.key in entry and entry[self.key] == self.value
+
+    # Date-ordered positions of the matching entries in the index, or None if the key is not indexed
+    def positions(self, index):
+        if self.key in index.hash_indexes:
+            return index.lookup(self.key, self.value)
+        if self.key == index.date_key:
+            return range(*index.date_range(self.value, self.value))
+        return None
+
+    def __repr__(self):
+        return f"{self.key} == {self.value!r}"
+
+
+# key is one of values
+class In:
+    rank = 1
+
+    def __init__(self, key, values):
+        self.key = key
+        self.values = frozenset(values)
+
+    def matches(self, entry):
+        return self.key in entry and entry[self.key] in self.values
+
+    def positions(self, index):
+        if self.key not in index.hash_indexes:
+            return None
+        lists = [index.lookup(self.key, value) for value in self.values]
+        return list(merge(*lists))
+
+    def __repr__(self):
+        return f"{self.key} in {sorted(self.values)!r}"
+
+
+# low <= key <= high
+class Between:
+    rank = 2
+
+    def __init__(self, key, low, high):
+        self.key = key
+        self.low = low
+        self.high = high
+
+    def matches(self, entry):
+        return self.key in entry and self.low <= entry[self.key] <= self.high
+
+    def positions(self, index):
+        if self.key != index.date_key:
+            return None
+        return range(*index.date_range(self.low, self.high))
+
+    def __repr__(self):
+        return f"{self.low!r} <= {self.key} <= {self.high!r}"
+
+
+# Restrict sorted positions to a date range of the index, using binary search
+def _restrict_to_range(positions, date_range):
+    lo, hi = date_range
+    if isinstance(positions, range):
+        return range(max(positions.start, lo), min(positions.stop, hi))
+    return positions[bisect_left(positions, lo):bisect_left(positions, hi)]
+
+
+class Query:
+    def __init__(self, data, predicates=()):
+        self.data = data
+        self.predicates = tuple(predicates)
+
+    # Each call returns a new query, so a partly built query can be reused
+    def _with(self, predicate):
+        return Query(self.data, self.predicates + (predicate,))
+
+    # Keep the entries where every given key has the given value, e.g. where(area="Pirkkola")
+    def where(self, **conditions):
+        query = self
+        for key, value in conditions.items():
+            query = query._with(Equals(key, value))
+        return query
+
+    # Keep the entries whose key has one of the given values
+    def where_in(self, key, values):
+        return self._with(In(key, values))
+
+    # Keep the entries with low <= key <= high (dates compare as ISO strings)
+    def between(self, key, low, high):
+        return self._with(Between(key, low, high))
+
+    # Choose how the query runs: returns (candidate positions or None, predicates to check per entry)
+    # Candidate positions are only available when the query runs on a GymIndex.
+    def plan(self):
+        checks = sorted(self.predicates, key=lambda predicate: predicate.rank)
+        if not isinstance(self.data, GymIndex):
+            return None, checks
+
+        index = self.data
+        # A date range on the index is just a binary search, so every candidate list is narrowed by it
+        date_ranges = [index.date_range(predicate.low, predicate.high) for predicate in self.predicates
+                       if isinstance(predicate, Between) and predicate.key == index.date_key]
+        best = None
+        for predicate in self.predicates:
+            positions = predicate.positions(index)
+            if positions is None:
+                continue
+            for date_range in date_ranges:
+                positions = _restrict_to_range(positions, date_range)
+            if best is None or len(positions) < len(best[1]):
+                best = (predicate, positions)
+        if best is None:
+            return range(len(index)), checks
+
+        # The driver and the date ranges are already satisfied by every candidate
+        driver, positions = best
+        remaining = [predicate for predicate in checks if predicate is not driver
+                     and not (isinstance(predicate, Between) and predicate.key == index.date_key)]
+        return positions, remaining
+
+    # Describe the chosen plan, useful when checking whether a query uses the index
+    def explain(self):
+        positions, checks = self.plan()
+        source = "scan" if positions is None else f"index ({len(positions)} candidates)"
+        return f"{source}; check: {', '.join(repr(predicate) for predicate in checks) or 'nothing'}"
+
+    def __iter__(self):
+        positions, checks = self.plan()
+        if positions is None:
+            entries = self.data
+        else:
+            entries = (self.data.entries[position] for position in positions)
+        for entry in entries:
+            for predicate in checks:
+                if not predicate.matches(entry):
+                    break
+            else:
+                yield entry
+
+    def count(self):
+        return sum(1 for _ in self)
+
+    def to_list(self):
+        return list(self)
+
+
+# Start a query over a list of entries, an iterator of entries (e.g. stream_json_file) or a GymIndex
+def query(data):
+    return Query(data)
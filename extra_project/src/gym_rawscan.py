@@ -0,0 +1,222 @@
+# Raw scans of a gym JSON file for ad-hoc questions, without parsing it into dicts.
+# The file is memory-mapped and the records are found and read as bytes:
+#   - a record is the text from a "{" to the next "}" outside string values (the ulkoliikunta
+#     records are flat objects, like in gym_parallel.py; see analysis/jsonstream.py)
+#   - an equality filter is first searched as a plain byte string (e.g. b'"OG30"') over the whole
+#     file, and only the records around its occurrences are looked at; without one, a date range
+#     whose ends share a prefix ("2021-08-...") is searched the same way
+#   - in a candidate record, only the fields the query touches are located with a regex, compared
+#     as bytes, and decoded when their value is needed (numbers for statistics, keys of counts)
+#   - a field asked for without any condition is found in one regex pass over the whole file
+#
+#   with RawScanner("../json/ulkoliikunta-daily-2021.json") as scan:
+#       scan.count(equals={"groupId": "OG30"}, start="2021-08-01T00:00:00.000Z", end="2021-08-31T23:59:59.999Z")
+#       scan.statistics("usageMinutes", equals={"area": "Pirkkola"})
+#       scan.frequencies("area", k=5)
+#
+# Results are the same as those of the aggregates in gym_aggregates.py. Field names are matched
+# anywhere in a record, so a string value that itself contains '"key":' would confuse the scan.
+import json
+import mmap
+import re
+from operator import methodcaller
+
+from analysis.jsonstream import enclosing_record_start, record_end
+from analysis.ranking import FIRST_SEEN, top_k
+
+from .gym_aggregates import summarize_values
+
+# A value after its field name: a string (escapes allowed) or any other token
+VALUE = rb'\s*:\s*("[^"\\]*(?:\\.[^"\\]*)*"|[^,}\s]+)'
+
+
+# Decode a raw JSON value (bytes); plain strings and integers skip the json module
+def decode_value(raw):
+    if raw[:1] == b'"' and b"\\" not in raw:
+        return raw[1:-1].decode("utf-8")
+    if raw.isdigit():
+        return int(raw)
+    return json.loads(raw)
+
+
+# The JSON text of a value as bytes, as it would appear in the file
+def encode_value(value):
+    return json.dumps(value, ensure_ascii=False).encode("utf-8")
+
+
+class RawScanner:
+    def __init__(self, filename):
+        self.filename = filename
+        self.file = open(filename, 'rb')
+        try:
+            self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # An empty file cannot be mapped: it has no records
+            self.data = b""
+        self.patterns = {}   # field -> compiled regex of "field": value
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self.file.close()
+
+    def _pattern(self, key):
+        pattern = self.patterns.get(key)
+        if pattern is None:
+            pattern = self.patterns[key] = re.compile(b'"' + re.escape(key.encode("utf-8")) + b'"' + VALUE)
+        return pattern
+
+    # Raw value (bytes) of a field in the record data[start:end], or None when it is missing
+    def raw_value(self, key, start, end):
+        match = self._pattern(key).search(self.data, start, end)
+        return match.group(1) if match else None
+
+    # Raw values of a field in the matching records that have it
+    # Without conditions the field is searched over the whole file in one regex pass.
+    def raw_values(self, key, equals=None, date_key="utcdate", start=None, end=None):
+        if not equals and start is None and end is None:
+            return map(methodcaller("group", 1), self._pattern(key).finditer(self.data))
+        return (
+            raw for raw in (self.raw_value(key, record_start, record_end)
+                            for record_start, record_end in self.spans(equals, date_key, start, end))
+            if raw is not None
+        )
+
+    # (start, end) of the records matching every condition, in file order
+    # equals maps fields to wanted values; start and end bound date_key (both ends included),
+    # like FilterAggregate. A record missing a field that has a condition does not match.
+    def spans(self, equals=None, date_key="utcdate", start=None, end=None):
+        wanted = [(key, encode_value(value), value) for key, value in (equals or {}).items()]
+        low = None if start is None else start.encode("utf-8")
+        high = None if end is None else end.encode("utf-8")
+        for record_start, record_end in self._candidates(wanted, low, high):
+            if self._matches(record_start, record_end, wanted, date_key, low, high):
+                yield record_start, record_end
+
+    # Records that can match: around the occurrences of the most selective literal, or all of them
+    def _candidates(self, wanted, low, high):
+        needle = None
+        if wanted:
+            # A longer literal occurs in fewer places; strings (quoted on both sides) are exact tokens.
+            # Non-ASCII characters may be written as \u escapes, so a string is searched up to the first one.
+            literals = [raw if raw.isascii() else raw[:next(i for i, byte in enumerate(raw) if byte > 127)]
+                        for _, raw, _ in wanted]
+            needle = max(literals, key=lambda raw: (raw[-1:] == b'"', len(raw)))
+        elif low is not None and high is not None:
+            prefix = _common_prefix(low, high)
+            if prefix:
+                needle = b'"' + prefix
+        data = self.data
+        pos = 0   # always between two records
+        if needle is None:
+            while True:
+                record_start = data.find(b"{", pos)
+                if record_start == -1:
+                    return
+                end = record_end(data, record_start)
+                if end is None:
+                    return
+                yield record_start, end
+                pos = end
+        while True:
+            hit = data.find(needle, pos)
+            if hit == -1:
+                return
+            record_start = enclosing_record_start(data, pos, hit)
+            if record_start is None:
+                # Before the first record after pos
+                pos = hit + 1
+                continue
+            end = record_end(data, record_start)
+            if end is None:
+                return
+            # The literal must lie inside the record, not after it
+            if hit < end:
+                yield record_start, end
+            pos = end
+
+    def _matches(self, start, end, wanted, date_key, low, high):
+        for key, raw_wanted, value in wanted:
+            raw = self.raw_value(key, start, end)
+            if raw is None:
+                return False
+            if raw != raw_wanted and (b"\\" not in raw or json.loads(raw) != value):
+                return False
+        if low is not None or high is not None:
+            raw = self.raw_value(date_key, start, end)
+            if raw is None:
+                return False
+            # ISO dates compare the same as bytes as they do as strings
+            day = raw[1:-1] if raw[:1] == b'"' and b"\\" not in raw else encode_value(json.loads(raw))
+            if (low is not None and day < low) or (high is not None and day > high):
+                return False
+        return True
+
+    # Number of matching records
+    def count(self, equals=None, date_key="utcdate", start=None, end=None):
+        return sum(1 for _ in self.spans(equals, date_key, start, end))
+
+    # Matching records parsed into dicts (only these are parsed)
+    def records(self, equals=None, date_key="utcdate", start=None, end=None):
+        for record_start, record_end in self.spans(equals, date_key, start, end):
+            yield json.loads(self.data[record_start:record_end])
+
+    # Decoded values of a field in the matching records that have it
+    def values(self, key, equals=None, date_key="utcdate", start=None, end=None):
+        return map(decode_value, self.raw_values(key, equals, date_key, start, end))
+
+    # Summary statistics of a numeric field, like StatisticsAggregate with median=True
+    # The raw bytes go straight to float(); values that are not numbers are skipped.
+    def statistics(self, key, equals=None, date_key="utcdate", start=None, end=None):
+        numbers = []
+        for raw in self.raw_values(key, equals, date_key, start, end):
+            try:
+                numbers.append(float(raw.strip(b'"')))
+            except ValueError:
+                pass
+        return summarize_values(numbers)
+
+    # Counts of the values of a field: the k most frequent, like FrequencyAggregate (k=None for all)
+    # The values are counted as raw bytes and each distinct value is decoded once at the end.
+    def frequencies(self, key, k=5, equals=None, date_key="utcdate", start=None, end=None, tie_break=FIRST_SEEN):
+        raw_counts = {}
+        for raw in self.raw_values(key, equals, date_key, start, end):
+            raw_counts[raw] = raw_counts.get(raw, 0) + 1
+        counts = {}
+        for raw, count in raw_counts.items():
+            value = decode_value(raw)
+            counts[value] = counts.get(value, 0) + count
+        return top_k(counts, k, tie_break)
+
+    # Distinct values of a field, sorted, like DistinctAggregate
+    def distinct(self, key, equals=None, date_key="utcdate", start=None, end=None):
+        return sorted(value for value, _ in self.frequencies(key, None, equals, date_key, start, end))
+
+
+# Results of the gym_data_analysis.py report from raw scans, under the names its engine uses
+# filters is a list of (key, value) pairs, like for FilterAggregate.
+def report_results(scanner, date_key, start_date, end_date, filters, top_key="area", k=5,
+                   stats_key="usageMinutes", distinct_key="groupId"):
+    return {
+        "total_entries": scanner.count(),
+        "frequent": scanner.frequencies(top_key, k),
+        "statistics": scanner.statistics(stats_key),
+        "filtered": list(scanner.records(dict(filters), date_key, start_date, end_date)),
+        "group_ids": scanner.distinct(distinct_key),
+    }
+
+
+# Longest common prefix of two byte strings
+def _common_prefix(first, second):
+    length = 0
+    for a, b in zip(first, second):
+        if a != b:
+            break
+        length += 1
+    return first[:length]
@@ -0,0 +1,178 @@
+# Precomputed rollup cube for the gym usage metrics.
+# For every (day, area, groupId) the cube keeps count, sum, minimum, maximum and sum of squares
+# of usageMinutes, sets and repetitions. Any grouped summary (per area per week, per groupId per
+# month, ...) is then computed from the cube cells, without touching the raw rows again:
+#
+#   cube = RollupCube.build(stream_json_file("../json/ulkoliikunta-daily-2021.json"))
+#   cube.save("gym_rollup.json")
+#   cube.summary("usageMinutes", granularity="month", by=("area",))
+#
+# The cube is saved as JSON and can be updated with new files: update() only adds the records of
+# the (day, area, groupId) cells not in the cube yet, so re-reading a whole file is safe, and the
+# file of another area for a day already in the cube is still added. Rows of a cell already in the
+# cube are skipped and counted in cube.skipped, so late rows do not go missing unnoticed. A feed
+# that only delivers new rows (late ones included) is added with update(records, merge=True),
+# which merges every row into its cell.
+# Records without a date are rejected and counted in cube.rejected.
+# The median cannot be combined from cells, so summaries give count, sum, average, min, max and
+# standard deviation.
+import json
+import os
+from datetime import date
+
+METRICS = ("usageMinutes", "sets", "repetitions")
+GRANULARITIES = ("day", "week", "month", "year", "all")
+DIMENSIONS = ("area", "groupId")
+
+
+# Label of the time bucket a day ("YYYY-MM-DD") belongs to
+def bucket_label(day, granularity):
+    if granularity == "day":
+        return day
+    if granularity == "week":
+        year, week, _ = date.fromisoformat(day).isocalendar()
+        return f"{year}-W{week:02d}"
+    if granularity == "month":
+        return day[:7]
+    if granularity == "year":
+        return day[:4]
+    if granularity == "all":
+        return "all"
+    raise ValueError(f"Unknown granularity: {granularity} (expected one of {', '.join(GRANULARITIES)})")
+
+
+class RollupCube:
+    def __init__(self, metrics=METRICS):
+        self.metrics = tuple(metrics)
+        # (day, area, groupId) -> {metric: [count, sum, min, max, sum of squares]}
+        self.cells = {}
+        self.last_day = None
+        self.rejected = 0
+        self.skipped = 0   # rows of cells already in the cube, left out by update()
+
+    # Build a cube from an iterable of records (a list or stream_json_file)
+    @classmethod
+    def build(cls, records, metrics=METRICS):
+        cube = cls(metrics)
+        cube.update(records)
+        return cube
+
+    # Day, area and groupId of the cell of a record, or None when the record has no date
+    @staticmethod
+    def cell_key(entry):
+        utcdate = entry.get("utcdate")
+        if not isinstance(utcdate, str) or not utcdate[:10]:
+            return None
+        return (utcdate[:10], entry.get("area"), entry.get("groupId"))
+
+    # Add one record to its cell; returns False (and counts it as rejected) when it has no date
+    def add(self, entry, key=None):
+        key = key or self.cell_key(entry)
+        if key is None:
+            self.rejected += 1
+            return False
+        day = key[0]
+        cell = self.cells.get(key)
+        if cell is None:
+            cell = self.cells[key] = {}
+        for metric in self.metrics:
+            if metric not in entry:
+                continue
+            try:
+                value = float(entry[metric])
+            except (TypeError, ValueError):
+                continue
+            stats = cell.get(metric)
+            if stats is None:
+                cell[metric] = [1, value, value, value, value * value]
+            else:
+                stats[0] += 1
+                stats[1] += value
+                stats[2] = min(stats[2], value)
+                stats[3] = max(stats[3], value)
+                stats[4] += value * value
+        if self.last_day is None or day > self.last_day:
+            self.last_day = day
+        return True
+
+    # Add the records of the cells not in the cube yet; returns the number of records added
+    # The rows of cells that were already in the cube are counted in self.skipped. With merge=True
+    # every record is added, also to existing cells: for feeds that never repeat a row.
+    def update(self, records, merge=False):
+        ingested = set() if merge else set(self.cells)
+        added = 0
+        for entry in records:
+            key = self.cell_key(entry)
+            if key in ingested:
+                self.skipped += 1
+                continue
+            added += self.add(entry, key)
+        return added
+
+    # Grouped summary of a metric
+    # granularity is "day", "week", "month", "year" or "all"; by lists the dimensions to group by
+    # ("area" and/or "groupId"). area, group_id, start and end (days, inclusive) restrict the cells.
+    # Returns {(bucket, *dimension values): {"Count", "Sum", "Average", "Maximum", "Minimum", "Standard deviation"}}
+    def summary(self, metric, granularity="day", by=("area",), area=None, group_id=None, start=None, end=None):
+        for dimension in by:
+            if dimension not in DIMENSIONS:
+                raise ValueError(f"Unknown dimension: {dimension}")
+        labels = {}
+        totals = {}
+        for (day, cell_area, cell_group), cell in self.cells.items():
+            if metric not in cell:
+                continue
+            if (area is not None and cell_area != area) or (group_id is not None and cell_group != group_id):
+                continue
+            if (start is not None and day < start) or (end is not None and day > end):
+                continue
+            if day not in labels:
+                labels[day] = bucket_label(day, granularity)
+            values = {"area": cell_area, "groupId": cell_group}
+            key = (labels[day],) + tuple(values[dimension] for dimension in by)
+            count, total, low, high, squares = cell[metric]
+            stats = totals.get(key)
+            if stats is None:
+                totals[key] = [count, total, low, high, squares]
+            else:
+                stats[0] += count
+                stats[1] += total
+                stats[2] = min(stats[2], low)
+                stats[3] = max(stats[3], high)
+                stats[4] += squares
+
+        summary = {}
+        for key in sorted(totals, key=lambda key: tuple("" if part is None else str(part) for part in key)):
+            count, total, low, high, squares = totals[key]
+            average = total / count
+            variance = max(squares / count - average * average, 0.0)
+            summary[key] = {
+                "Count": count,
+                "Sum": total,
+                "Average": round(average, 2),
+                "Maximum": high,
+                "Minimum": low,
+                "Standard deviation": round(variance ** 0.5, 2)
+            }
+        return summary
+
+    # Save the cube as JSON (written to a temporary file first, then renamed)
+    def save(self, path):
+        cells = [[day, cell_area, cell_group, cell] for (day, cell_area, cell_group), cell in self.cells.items()]
+        temp_file = f"{path}.tmp"
+        with open(temp_file, 'w') as file:
+            json.dump({"metrics": self.metrics, "last_day": self.last_day, "rejected": self.rejected,
+                       "skipped": self.skipped, "cells": cells}, file)
+        os.replace(temp_file, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r') as file:
+            saved = json.load(file)
+        cube = cls(saved["metrics"])
+        cube.last_day = saved["last_day"]
+        cube.rejected = saved.get("rejected", 0)
+        cube.skipped = saved.get("skipped", 0)
+        for day, cell_area, cell_group, cell in saved["cells"]:
+            cube.cells[(day, cell_area, cell_group)] = cell
+        return cube
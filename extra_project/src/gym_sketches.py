@@ -0,0 +1,268 @@
+# Approximate aggregates with fixed memory for very large gym datasets.
+# The exact aggregates keep every distinct value (frequencies, distinct ids) or every number
+# (median), so their memory grows with the data. The sketches below use a fixed amount of memory
+# and report their error bound next to each result:
+#   HyperLogLog  - number of distinct values, relative error about 1.04 / sqrt(2 ** p)
+#   SpaceSaving  - heavy hitters for top-k, each count overestimated by at most n / capacity
+#   KLLSketch    - quantiles (median, percentiles), rank error about 1.65 / k
+# Each sketch can be merged with another one of the same size, and the *Aggregate classes plug
+# into AggregationEngine and run_parallel like the exact aggregates in gym_aggregates.py.
+import hashlib
+import heapq
+import math
+import random
+from itertools import chain
+
+
+# Stable 64-bit hash of a value (Python's hash() changes between processes)
+def hash64(value):
+    return int.from_bytes(hashlib.blake2b(str(value).encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HyperLogLog:
+    def __init__(self, p=12):
+        self.p = p
+        self.m = 1 << p
+        self.registers = bytearray(self.m)
+
+    def add(self, value):
+        h = hash64(value)
+        index = h >> (64 - self.p)
+        rest = (h << self.p) & ((1 << 64) - 1)
+        # Position of the first 1 bit in the remaining 64 - p bits
+        rank = min(64 - self.p, 64 - rest.bit_length()) + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        if other.p != self.p:
+            raise ValueError("Cannot merge HyperLogLog sketches of different precision")
+        self.registers = bytearray(max(a, b) for a, b in zip(self.registers, other.registers))
+
+    def count(self):
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        estimate = alpha * self.m * self.m / sum(2.0 ** -register for register in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * self.m and zeros:
+            # Small cardinalities: linear counting is more accurate
+            estimate = self.m * math.log(self.m / zeros)
+        return round(estimate)
+
+    def relative_error(self):
+        return 1.04 / math.sqrt(self.m)
+
+
+class SpaceSaving:
+    def __init__(self, capacity=1000):
+        self.capacity = capacity
+        self.counters = {}   # value -> [count, maximum overestimation]
+        self.heap = []       # (count, push number, value), possibly outdated; used to find the smallest counter
+        self.pushes = 0      # tie-breaker, so values of different types are never compared
+        self.total = 0
+
+    def _push(self, count, value):
+        self.pushes += 1
+        heapq.heappush(self.heap, (count, self.pushes, value))
+
+    def add(self, value, count=1):
+        self.total += count
+        counter = self.counters.get(value)
+        if counter is not None:
+            counter[0] += count
+            return
+        if len(self.counters) < self.capacity:
+            self.counters[value] = [count, 0]
+            self._push(count, value)
+            return
+        # Replace the value with the smallest counter; outdated heap entries are refreshed on the way
+        while True:
+            smallest, _, old_value = heapq.heappop(self.heap)
+            current = self.counters[old_value][0]
+            if current == smallest:
+                break
+            self._push(current, old_value)
+        del self.counters[old_value]
+        self.counters[value] = [smallest + count, smallest]
+        self._push(smallest + count, value)
+
+    # Smallest count of a full sketch: a value it does not track may have occurred up to that often
+    def _untracked_bound(self):
+        if len(self.counters) < self.capacity:
+            return 0
+        return min(count for count, _ in self.counters.values())
+
+    # Merge another sketch: a value missing from one of them gets that sketch's smallest count
+    # added to both its count and its error, then the capacity largest counters are kept
+    def merge(self, other):
+        own_bound = self._untracked_bound()
+        other_bound = other._untracked_bound()
+        merged = {}
+        for value in chain(self.counters, (value for value in other.counters if value not in self.counters)):
+            count, error = self.counters.get(value, (own_bound, own_bound))
+            other_count, other_error = other.counters.get(value, (other_bound, other_bound))
+            merged[value] = [count + other_count, error + other_error]
+        if len(merged) > self.capacity:
+            merged = dict(heapq.nlargest(self.capacity, merged.items(), key=lambda item: item[1][0]))
+        self.counters = merged
+        self.total += other.total
+        self.heap = []
+        for value, (count, _) in merged.items():
+            self._push(count, value)
+
+    # The k values with the highest counts as (value, count, maximum overestimation)
+    def top_k(self, k):
+        ranked = heapq.nlargest(k, self.counters.items(), key=lambda item: item[1][0])
+        return [(value, count, error) for value, (count, error) in ranked]
+
+    def error_bound(self):
+        return self.total / self.capacity
+
+
+class KLLSketch:
+    def __init__(self, k=200, seed=0):
+        self.k = k
+        self.levels = [[]]
+        self.count = 0
+        self.random = random.Random(seed)
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(2, math.ceil(self.k * (2 / 3) ** depth))
+
+    def add(self, value):
+        self.levels[0].append(value)
+        self.count += 1
+        if len(self.levels[0]) >= self._capacity(0):
+            self._compress()
+
+    # Halve every level that is over capacity: sort it, keep every other item (random offset)
+    # and move the kept items one level up, where each of them counts twice as much
+    def _compress(self):
+        for level in range(len(self.levels)):
+            if len(self.levels[level]) >= self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append([])
+                items = sorted(self.levels[level])
+                offset = self.random.randint(0, 1)
+                self.levels[level + 1].extend(items[offset::2])
+                self.levels[level] = []
+
+    def merge(self, other):
+        while len(self.levels) < len(other.levels):
+            self.levels.append([])
+        for level, items in enumerate(other.levels):
+            self.levels[level].extend(items)
+        self.count += other.count
+        self._compress()
+
+    # Approximate value at quantile q (0 <= q <= 1)
+    def quantile(self, q):
+        weighted = sorted(
+            (value, 1 << level) for level, items in enumerate(self.levels) for value in items
+        )
+        if not weighted:
+            return None
+        total = sum(weight for _, weight in weighted)
+        target = q * total
+        seen = 0
+        for value, weight in weighted:
+            seen += weight
+            if seen >= target:
+                return value
+        return weighted[-1][0]
+
+    def rank_error(self):
+        return 1.65 / self.k
+
+
+# Approximate number of distinct values of a key (e.g. trackableId)
+class ApproxDistinctAggregate:
+    def __init__(self, key, p=12):
+        self.key = key
+        self.sketch = HyperLogLog(p)
+
+    def add(self, entry):
+        if self.key in entry:
+            self.sketch.add(entry[self.key])
+
+    def merge(self, other):
+        self.sketch.merge(other.sketch)
+
+    def result(self):
+        return {
+            "Distinct values": self.sketch.count(),
+            "Relative error": round(self.sketch.relative_error(), 4)
+        }
+
+
+# Approximate top k values of a key, as (value, count, maximum overestimation)
+class ApproxFrequencyAggregate:
+    def __init__(self, key, k=5, capacity=1000):
+        self.key = key
+        self.k = k
+        self.sketch = SpaceSaving(capacity)
+
+    def add(self, entry):
+        if self.key in entry:
+            self.sketch.add(entry[self.key])
+
+    def merge(self, other):
+        self.sketch.merge(other.sketch)
+
+    def result(self):
+        return self.sketch.top_k(self.k)
+
+
+# Summary statistics of a numeric key in fixed memory
+# Average, maximum, minimum and standard deviation are exact (running moments, merged with
+# Chan's formula); the median and percentiles come from a KLL sketch.
+class ApproxStatisticsAggregate:
+    def __init__(self, key, k=200):
+        self.key = key
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min_value = None
+        self.max_value = None
+        self.sketch = KLLSketch(k)
+
+    def add(self, entry):
+        if self.key not in entry:
+            return
+        try:
+            value = float(entry[self.key])
+        except (TypeError, ValueError):
+            return
+        self.n += 1
+        delta = value - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (value - self.mean)
+        self.min_value = value if self.min_value is None else min(self.min_value, value)
+        self.max_value = value if self.max_value is None else max(self.max_value, value)
+        self.sketch.add(value)
+
+    def merge(self, other):
+        if other.n == 0:
+            return
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self.m2 += other.m2 + delta * delta * self.n * other.n / n
+        self.mean += delta * other.n / n
+        self.n = n
+        self.min_value = other.min_value if self.min_value is None else min(self.min_value, other.min_value)
+        self.max_value = other.max_value if self.max_value is None else max(self.max_value, other.max_value)
+        self.sketch.merge(other.sketch)
+
+    def result(self):
+        if self.n == 0:
+            return {}
+        return {
+            "Average": round(self.mean, 2),
+            "Maximum": self.max_value,
+            "Minimum": self.min_value,
+            "Median": self.sketch.quantile(0.5),
+            "Standard deviation": round((self.m2 / self.n) ** 0.5, 2),
+            "25th percentile": self.sketch.quantile(0.25),
+            "75th percentile": self.sketch.quantile(0.75),
+            "Percentile rank error": f"±{self.sketch.rank_error():.1%}"
+        }
@@ -0,0 +1,93 @@
+import pytest
+import sys
+from pathlib import Path
+
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from extra_project.src.gym_aggregates import (
+    AggregationEngine,
+    CountAggregate,
+    DistinctAggregate,
+    FilterAggregate,
+    FrequencyAggregate,
+    StatisticsAggregate,
+    summarize_values
+)
+
+sample_data = [
+    {"utcdate": "2021-08-15T00:00:00.000Z", "area": "Hietaniemi", "groupId": "OG10", "usageMinutes": 120},
+    {"utcdate": "2021-08-20T00:00:00.000Z", "area": "Hietaniemi", "groupId": "OG10", "usageMinutes": 150},
+    {"utcdate": "2021-08-22T00:00:00.000Z", "area": "Pirkkola", "groupId": "OG23", "usageMinutes": 90},
+    {"utcdate": "2021-09-01T00:00:00.000Z", "area": "Pirkkola", "groupId": "OG23", "usageMinutes": "n/a"}
+]
+
+def test_summarize_values():
+    stats = summarize_values([4.0, 1.0, 3.0, 2.0])
+    assert stats["Median"] == 2.5
+    assert stats["Minimum"] == 1.0
+    assert stats["Maximum"] == 4.0
+    assert summarize_values([]) == {}
+
+def test_engine_runs_all_aggregates_in_one_pass():
+    passes = []
+
+    def records():
+        passes.append(1)
+        yield from sample_data
+
+    engine = AggregationEngine()
+    engine.register("total", CountAggregate())
+    engine.register("areas", FrequencyAggregate("area", 1))
+    engine.register("stats", StatisticsAggregate("usageMinutes"))
+    engine.register("filtered", FilterAggregate(
+        "utcdate", "2021-08-01T00:00:00.000Z", "2021-08-31T23:59:59.999Z",
+        [("groupId", "OG10"), ("area", "Hietaniemi")]
+    ))
+    engine.register("groups", DistinctAggregate("groupId"))
+    results = engine.run(records())
+
+    assert len(passes) == 1
+    assert results["total"] == 4
+    assert results["areas"] == [("Hietaniemi", 2)]
+    assert results["stats"]["Average"] == 120.0
+    assert len(results["filtered"]) == 2
+    assert results["groups"] == ["OG10", "OG23"]
+
+def test_statistics_keep_running_totals_unless_median_is_asked():
+    values = [3, 7, "8", 1.5, "n/a", None, 10, 4]
+    numbers = [3.0, 7.0, 8.0, 1.5, 10.0, 4.0]
+    expected = summarize_values(numbers)
+    del expected["Median"]
+
+    first, second = StatisticsAggregate("v"), StatisticsAggregate("v")
+    for value in values[:3]:
+        first.add({"v": value})
+    for value in values[3:]:
+        second.add({"v": value})
+    first.merge(second)
+    first.merge(StatisticsAggregate("v"))
+    assert first.values is None
+    # The default result has no Median
+    assert first.result() == expected and "Median" not in first.result()
+    assert StatisticsAggregate("v").result() == {}
+
+    # Large values keep their precision, also when merged
+    large = [StatisticsAggregate("v") for _ in range(2)]
+    for i, value in enumerate(1e9 + offset for offset in range(1, 6)):
+        large[i % 2].add({"v": value})
+    large[0].merge(large[1])
+    assert large[0].result()["Standard deviation"] == 1.41
+    assert large[0].result()["Average"] == 1e9 + 3
+
+    exact = StatisticsAggregate("v", median=True)
+    for value in values:
+        exact.add({"v": value})
+    assert exact.result() == summarize_values(numbers)
+    with pytest.raises(ValueError):
+        exact.merge(StatisticsAggregate("v"))
+
+def test_register_duplicate_name():
+    engine = AggregationEngine()
+    engine.register("total", CountAggregate())
+    with pytest.raises(ValueError):
+        engine.register("total", CountAggregate())
@@ -6,9 +6,10 @@ import sys
 from pathlib import Path
 
 
-sys.path.append(str(Path(__file__).resolve().parents[1]))
-from src.gym_data_analysis import (
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from extra_project.src.gym_data_analysis import (
     load_json_file,
+    stream_json_file,
     count_entries,
     most_frequent_entries,
     calculate_statistics,
@@ -51,13 +52,55 @@ def test_load_json_file():
 
     os.remove(filename)
 
+def test_load_json_file_with_cache(tmp_path):
+    filename = tmp_path / "data.json"
+    filename.write_text(json.dumps(sample_data))
+
+    assert load_json_file(str(filename), use_cache=True) == sample_data
+    assert (tmp_path / ".cache").is_dir()
+    # The second load is served from the snapshot
+    assert load_json_file(str(filename), use_cache=True) == sample_data
+
+def test_stream_json_file(tmp_path):
+    filename = tmp_path / "data.json"
+    filename.write_text(json.dumps(sample_data, indent=2))
+
+    # A tiny chunk size forces records to be split across reads
+    records = stream_json_file(str(filename), chunk_size=7)
+    assert not isinstance(records, list)
+    assert list(records) == sample_data
+
+def test_stream_json_file_missing_file():
+    with pytest.raises(FileNotFoundError):
+        list(stream_json_file("does-not-exist.json"))
+
+def test_stream_json_file_malformed(tmp_path):
+    filename = tmp_path / "data.json"
+    # Truncated in the middle: the first record must not be taken for the whole file
+    filename.write_text('[{"a": 1}, {"a": 2')
+    with pytest.raises(json.JSONDecodeError):
+        list(stream_json_file(str(filename)))
+    filename.write_text('[{"a": 1} {"a": 2}]')
+    with pytest.raises(json.JSONDecodeError):
+        list(stream_json_file(str(filename)))
+
 def test_count_entries():
     assert count_entries(sample_data) == 3
+    assert count_entries(iter(sample_data)) == 3
+
+def test_analysis_on_stream(tmp_path):
+    filename = tmp_path / "data.json"
+    filename.write_text(json.dumps(sample_data))
+
+    assert most_frequent_entries(stream_json_file(str(filename)), "groupId")[0] == ("OG10", 2)
+    assert calculate_statistics(stream_json_file(str(filename)), "usageMinutes")["Median"] == 120.0
+    assert get_all_group_ids(stream_json_file(str(filename))) == ["OG10", "OG23"]
 
 def test_most_frequent_entries():
     result = most_frequent_entries(sample_data, "groupId")
     assert result[0] == ("OG10", 2)
     assert result[1] == ("OG23", 1)
+    assert most_frequent_entries(sample_data, "groupId", k=1) == [("OG10", 2)]
 
 def test_calculate_statistics():
     stats = calculate_statistics(sample_data, "usageMinutes")
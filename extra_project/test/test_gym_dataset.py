@@ -0,0 +1,74 @@
+import pytest
+import sys
+from pathlib import Path
+
+np = pytest.importorskip("numpy")
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from extra_project.src.gym_data_analysis import (
+    calculate_statistics,
+    filter_by_date_and_key,
+    most_frequent_entries
+)
+from extra_project.src.gym_dataset import GymDataset
+
+# Sample test data
+sample_data = [
+    {"utcdate": "2021-08-15T00:00:00.000Z", "area": "Hietaniemi", "groupId": "OG10", "usageMinutes": 120},
+    {"utcdate": "2021-08-20T00:00:00.000Z", "area": "Hietaniemi", "groupId": "OG10", "usageMinutes": 150},
+    {"utcdate": "2021-08-22T00:00:00.000Z", "area": "Pirkkola", "groupId": "OG23", "usageMinutes": 90},
+    {"utcdate": "2021-09-02T00:00:00.000Z", "area": "Pirkkola", "groupId": "OG10", "usageMinutes": 60}
+]
+
+@pytest.fixture
+def dataset():
+    return GymDataset.from_records(sample_data)
+
+def test_columns(dataset):
+    assert len(dataset) == 4
+    assert dataset.numeric["usageMinutes"].dtype == np.int32
+    assert dataset.codes["area"].dtype == np.int32
+    assert dataset.dates.dtype == np.dtype("datetime64[ms]")
+    assert dataset.column("groupId").tolist() == ["OG10", "OG10", "OG23", "OG10"]
+
+def test_large_integers_are_not_wrapped():
+    data = [dict(entry, usageMinutes=minutes) for entry, minutes in zip(sample_data, [2 ** 31, -5, 7, 2 ** 40])]
+    dataset = GymDataset.from_records(data)
+    assert dataset.numeric["usageMinutes"].dtype == np.int64
+    assert dataset.numeric["usageMinutes"].tolist() == [2 ** 31, -5, 7, 2 ** 40]
+    # Beyond int64 the column falls back to floats
+    data[0]["usageMinutes"] = 2 ** 70
+    assert GymDataset.from_records(data).numeric["usageMinutes"].dtype == np.float32
+
+def test_calculate_statistics(dataset):
+    assert dataset.calculate_statistics("usageMinutes") == calculate_statistics(sample_data, "usageMinutes")
+    # Missing numeric fields become NaN and are ignored
+    assert dataset.calculate_statistics("sets") == {}
+
+def test_most_frequent_entries(dataset):
+    assert dataset.most_frequent_entries("groupId") == most_frequent_entries(sample_data, "groupId")
+    assert dataset.most_frequent_entries("area", 1) == [("Hietaniemi", 2)]
+
+def test_filter_by_date_and_key(dataset):
+    args = ("utcdate", "2021-08-01T00:00:00.000Z", "2021-08-31T23:59:59.999Z",
+            "groupId", "OG10", "area", "Hietaniemi")
+    filtered = dataset.filter_by_date_and_key(*args)
+    assert len(filtered) == 2
+    assert [row["usageMinutes"] for row in filtered.to_records()] == [120, 150]
+    assert [row["utcdate"] for row in filtered.to_records()] == [
+        row["utcdate"] for row in filter_by_date_and_key(sample_data, *args)
+    ]
+
+def test_filter_unknown_value(dataset):
+    filtered = dataset.filter_by_date_and_key(
+        "utcdate", "2021-08-01T00:00:00.000Z", "2021-08-31T23:59:59.999Z",
+        "groupId", "OG99", "area", "Hietaniemi"
+    )
+    assert len(filtered) == 0
+
+def test_equals_mask_uses_category_codes(dataset):
+    assert dataset.category_codes["area"] == {"Hietaniemi": 0, "Pirkkola": 1}
+    assert dataset.equals_mask("area", "Pirkkola").tolist() == [False, False, True, True]
+    assert not dataset.equals_mask("groupId", "OG99").any()
+    subset = dataset.take(dataset.equals_mask("groupId", "OG10"))
+    assert subset.equals_mask("area", "Pirkkola").tolist() == [False, False, True]
@@ -0,0 +1,44 @@
+import sys
+from pathlib import Path
+
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from extra_project.src.gym_data_analysis import filter_by_date_and_key
+from extra_project.src.gym_index import GymIndex
+
+# Sample test data, deliberately not in date order
+sample_data = [
+    {"utcdate": "2021-08-20T00:00:00.000Z", "area": "Hietaniemi", "groupId": "OG10", "usageMinutes": 150},
+    {"utcdate": "2021-08-15T00:00:00.000Z", "area": "Hietaniemi", "groupId": "OG10", "usageMinutes": 120},
+    {"utcdate": "2021-08-22T00:00:00.000Z", "area": "Pirkkola", "groupId": "OG23", "usageMinutes": 90},
+    {"utcdate": "2021-09-02T00:00:00.000Z", "area": "Hietaniemi", "groupId": "OG10", "usageMinutes": 60},
+    {"area": "Hietaniemi", "groupId": "OG10", "usageMinutes": 30}
+]
+
+def test_entries_sorted_by_date():
+    index = GymIndex(sample_data)
+    assert len(index) == 4
+    assert index.dates == sorted(index.dates)
+
+def test_between():
+    index = GymIndex(sample_data)
+    entries = index.between("2021-08-15T00:00:00.000Z", "2021-08-22T00:00:00.000Z")
+    assert [entry["usageMinutes"] for entry in entries] == [120, 150, 90]
+
+def test_lookup_between():
+    index = GymIndex(sample_data)
+    positions = index.lookup_between("groupId", "OG10", "2021-08-01T00:00:00.000Z", "2021-08-31T23:59:59.999Z")
+    assert [entry["usageMinutes"] for entry in index.entries_at(positions)] == [120, 150]
+    assert index.lookup("area", "Kallio") == []
+
+def test_filter_by_date_and_key_matches_scan():
+    index = GymIndex(sample_data)
+    args = ("utcdate", "2021-08-01T00:00:00.000Z", "2021-08-31T23:59:59.999Z",
+            "groupId", "OG10", "area", "Hietaniemi")
+    expected = sorted(filter_by_date_and_key(sample_data, *args), key=lambda entry: entry["utcdate"])
+    assert index.filter_by_date_and_key(*args) == expected
+
+    # A key without a hash index is checked on the entries of the date range
+    args = ("utcdate", "2021-08-01T00:00:00.000Z", "2021-09-30T23:59:59.999Z",
+            "usageMinutes", 90, "area", "Pirkkola")
+    assert index.filter_by_date_and_key(*args) == [sample_data[2]]
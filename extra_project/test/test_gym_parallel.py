@@ -0,0 +1,94 @@
+import json
+import pytest
+import sys
+import threading
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from extra_project.src.gym_aggregates import (
+    AggregationEngine,
+    CountAggregate,
+    DistinctAggregate,
+    FrequencyAggregate,
+    StatisticsAggregate
+)
+from extra_project.src.gym_parallel import make_partitions, read_partition, run_parallel, run_remote
+
+# Sample test data
+sample_data = [
+    {"utcdate": "2021-08-%02dT00:00:00.000Z" % (i % 28 + 1), "area": ["Hietaniemi", "Pirkkola", "Kallio"][i % 3],
+     "groupId": "OG%d" % (i % 7), "usageMinutes": i * 3 % 101}
+    for i in range(300)
+]
+
+def make_engine():
+    engine = AggregationEngine()
+    engine.register("total", CountAggregate())
+    engine.register("areas", FrequencyAggregate("area"))
+    engine.register("stats", StatisticsAggregate("usageMinutes"))
+    engine.register("groups", DistinctAggregate("groupId"))
+    return engine
+
+def write_files(directory, parts):
+    size = len(sample_data) // parts
+    for i in range(parts):
+        chunk = sample_data[i * size:(i + 1) * size]
+        (directory / f"day-{i:02d}.json").write_text(json.dumps(chunk, indent=2))
+
+def test_byte_range_partitions_cover_every_record_once(tmp_path):
+    write_files(tmp_path, 1)
+    filename = str(tmp_path / "day-00.json")
+    partitions = make_partitions(filename, partition_bytes=500)
+    assert len(partitions) > 10
+    records = [record for partition in partitions for record in read_partition(*partition)]
+    assert records == sample_data
+
+def test_braces_and_quotes_inside_strings(tmp_path):
+    # Braces, escaped quotes and backslashes in the values must not split or misalign the records
+    data = [dict(entry, area=["{Hietaniemi}", 'Pirkkola "}{"', "Kallio \\", "} {"][i % 4])
+            for i, entry in enumerate(sample_data)]
+    filename = tmp_path / "odd.json"
+    filename.write_text(json.dumps(data))
+    for partition_bytes in (97, 128, 500):
+        partitions = make_partitions(str(filename), partition_bytes=partition_bytes)
+        assert len(partitions) > 10
+        assert [record for partition in partitions for record in read_partition(*partition)] == data
+
+def test_truncated_partition_fails(tmp_path):
+    filename = tmp_path / "truncated.json"
+    filename.write_text(json.dumps(sample_data)[:-30])
+    with pytest.raises(json.JSONDecodeError):
+        for partition in make_partitions(str(filename), partition_bytes=500):
+            list(read_partition(*partition))
+
+def test_parallel_matches_single_pass(tmp_path):
+    write_files(tmp_path, 1)
+    expected = make_engine().run(sample_data)
+    results = run_parallel(make_engine(), str(tmp_path / "day-00.json"), workers=1, partition_bytes=700)
+    assert results == expected
+
+def test_directory_in_process_pool(tmp_path):
+    write_files(tmp_path, 4)
+    expected = make_engine().run(sample_data)
+    assert run_parallel(make_engine(), str(tmp_path), workers=2) == expected
+
+def test_run_remote(tmp_path):
+    write_files(tmp_path, 3)
+    class QuietHandler(SimpleHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(QuietHandler, directory=str(tmp_path)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        urls = [f"{base}/day-{i:02d}.json" for i in range(3)] + [f"{base}/missing.json"]
+        results = run_remote(make_engine(), urls, backoff=0.01)
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert results == make_engine().run(sample_data)
+
@@ -0,0 +1,55 @@
+import sys
+from pathlib import Path
+
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from extra_project.src.gym_index import GymIndex
+from extra_project.src.gym_query import query
+
+# Sample test data
+sample_data = [
+    {"utcdate": "2021-08-15T00:00:00.000Z", "area": "Hietaniemi", "groupId": "OG10", "usageMinutes": 120},
+    {"utcdate": "2021-08-20T00:00:00.000Z", "area": "Hietaniemi", "groupId": "OG10", "usageMinutes": 150},
+    {"utcdate": "2021-08-22T00:00:00.000Z", "area": "Pirkkola", "groupId": "OG23", "usageMinutes": 90},
+    {"utcdate": "2021-08-25T00:00:00.000Z", "area": "Pirkkola", "groupId": "OG30", "usageMinutes": 45},
+    {"utcdate": "2021-09-02T00:00:00.000Z", "area": "Pirkkola", "groupId": "OG30", "usageMinutes": 60}
+]
+
+AUGUST = ("2021-08-01T00:00:00.000Z", "2021-08-31T23:59:59.999Z")
+
+def test_where_and_between():
+    rows = query(sample_data).where(area="Hietaniemi", groupId="OG10").between("utcdate", *AUGUST)
+    assert [entry["usageMinutes"] for entry in rows] == [120, 150]
+
+def test_where_in():
+    rows = query(sample_data).where_in("groupId", {"OG23", "OG30"}).between("usageMinutes", 50, 100)
+    assert [entry["usageMinutes"] for entry in rows] == [90, 60]
+
+def test_results_are_lazy():
+    seen = []
+
+    def records():
+        for entry in sample_data:
+            seen.append(entry)
+            yield entry
+
+    rows = iter(query(records()).where(area="Hietaniemi"))
+    assert seen == []
+    assert next(rows)["usageMinutes"] == 120
+    assert len(seen) == 1
+
+def test_index_uses_most_selective_condition():
+    index = GymIndex(sample_data)
+    rows = query(index).where(area="Pirkkola").where_in("groupId", {"OG30"}).between("utcdate", *AUGUST)
+    assert rows.explain().startswith("index (1 candidates)")
+    assert rows.to_list() == [sample_data[3]]
+
+def test_index_and_scan_agree():
+    index = GymIndex(sample_data)
+    for build in (
+        lambda q: q.where(area="Pirkkola"),
+        lambda q: q.between("utcdate", *AUGUST).where(groupId="OG10"),
+        lambda q: q.where_in("area", {"Pirkkola", "Kallio"}).between("usageMinutes", 0, 100),
+        lambda q: q.where(usageMinutes=150),
+    ):
+        assert build(query(index)).to_list() == build(query(sample_data)).to_list()
@@ -0,0 +1,97 @@
+import json
+import sys
+from pathlib import Path
+
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from extra_project.src.gym_data_analysis import (
+    calculate_statistics,
+    filter_by_date_and_key,
+    get_all_group_ids,
+    most_frequent_entries
+)
+from extra_project.src.gym_rawscan import RawScanner, decode_value, report_results
+
+# Sample test data
+sample_data = [
+    {"utcdate": "2021-%02d-%02dT00:00:00.000Z" % (7 + i % 3, i % 28 + 1), "area": ["Hietaniemi", "Pirkkola", "Kivistö"][i % 3],
+     "groupId": "OG%d" % (i % 7), "trackableId": "OG%d_%d" % (i % 7, i), "usageMinutes": i * 3 % 101}
+    for i in range(300)
+]
+
+AUGUST = ("2021-08-01T00:00:00.000Z", "2021-08-31T23:59:59.999Z")
+
+
+def write_data(path, data, **options):
+    path.write_text(json.dumps(data, **options), encoding="utf-8")
+    return str(path)
+
+
+def test_count_matches_full_parse(tmp_path):
+    filename = write_data(tmp_path / "data.json", sample_data, indent=2)
+    with RawScanner(filename) as scan:
+        assert scan.count() == 300
+        expected = [entry for entry in sample_data
+                    if entry["groupId"] == "OG3" and AUGUST[0] <= entry["utcdate"] <= AUGUST[1]]
+        assert scan.count(equals={"groupId": "OG3"}, start=AUGUST[0], end=AUGUST[1]) == len(expected) > 0
+        # Only the date range: searched by its common prefix "2021-08-"
+        assert scan.count(start=AUGUST[0], end=AUGUST[1]) == 100
+        assert scan.count(start="2021-09-01") == 100
+        # Numbers compare as their JSON text; "OG3" does not match inside "OG3_10"
+        assert scan.count(equals={"usageMinutes": 0}) == sum(1 for entry in sample_data if entry["usageMinutes"] == 0)
+        assert scan.count(equals={"groupId": "OG99"}) == 0
+        assert scan.count(equals={"missing": "x"}) == 0
+
+
+def test_results_match_the_aggregates(tmp_path):
+    # Compact separators and escaped non-ASCII characters are read the same way
+    filename = write_data(tmp_path / "data.json", sample_data, separators=(",", ":"))
+    with RawScanner(filename) as scan:
+        assert scan.statistics("usageMinutes") == calculate_statistics(sample_data, "usageMinutes")
+        assert scan.frequencies("area", 2) == most_frequent_entries(sample_data, "area", 2)
+        assert scan.distinct("groupId") == get_all_group_ids(sample_data)
+        assert scan.count(equals={"area": "Kivistö"}) == 100
+        assert list(scan.records(equals={"groupId": "OG3", "area": "Kivistö"}, start=AUGUST[0], end=AUGUST[1])) == \
+            filter_by_date_and_key(sample_data, "utcdate", *AUGUST, "groupId", "OG3", "area", "Kivistö")
+        pirkkola = [entry["usageMinutes"] for entry in sample_data if entry["area"] == "Pirkkola"]
+        assert list(scan.values("usageMinutes", equals={"area": "Pirkkola"})) == pirkkola
+        assert scan.statistics("usageMinutes", equals={"area": "Pirkkola"}) == calculate_statistics(
+            [{"usageMinutes": value} for value in pirkkola], "usageMinutes")
+
+
+def test_report_results(tmp_path):
+    filename = write_data(tmp_path / "data.json", sample_data, indent=2, ensure_ascii=False)
+    with RawScanner(filename) as scan:
+        results = report_results(scan, "utcdate", *AUGUST, [("groupId", "OG3"), ("area", "Kivistö")])
+    assert results["total_entries"] == 300
+    assert results["frequent"] == most_frequent_entries(sample_data, "area")
+    assert results["group_ids"] == get_all_group_ids(sample_data)
+    assert results["filtered"] == filter_by_date_and_key(sample_data, "utcdate", *AUGUST, "groupId", "OG3",
+                                                         "area", "Kivistö")
+
+
+def test_empty_and_odd_values(tmp_path):
+    with RawScanner(write_data(tmp_path / "empty.json", [])) as scan:
+        assert scan.count() == 0 and scan.statistics("usageMinutes") == {}
+    empty_file = tmp_path / "nothing.json"
+    empty_file.write_bytes(b"")
+    with RawScanner(str(empty_file)) as scan:
+        assert scan.count() == 0
+
+    data = [{"area": "A \"quoted\" name", "usageMinutes": "12", "sets": None},
+            {"area": "Plain", "usageMinutes": "n/a", "sets": 1.5}]
+    with RawScanner(write_data(tmp_path / "odd.json", data)) as scan:
+        assert scan.count(equals={"area": 'A "quoted" name'}) == 1
+        assert scan.statistics("usageMinutes")["Average"] == 12.0
+        assert list(scan.values("sets")) == [None, 1.5]
+    assert decode_value(b'"Kivist\\u00f6"') == "Kivistö" and decode_value(b"-3") == -3
+
+def test_braces_inside_strings(tmp_path):
+    data = [{"area": "{Pirkkola}", "groupId": "OG1", "usageMinutes": 1},
+            {"area": 'Kallio "}{"', "groupId": "OG3", "usageMinutes": 2},
+            {"area": "x \\", "note": "} OG3 {", "groupId": "OG2", "usageMinutes": 3},
+            {"area": "} {", "groupId": "OG3", "usageMinutes": 4}]
+    with RawScanner(write_data(tmp_path / "odd.json", data)) as scan:
+        assert scan.count() == 4
+        assert list(scan.records(equals={"groupId": "OG3"})) == [data[1], data[3]]
+        assert list(scan.values("usageMinutes", equals={"area": "} {"})) == [4]
@@ -0,0 +1,83 @@
+import pytest
+import sys
+from pathlib import Path
+
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from extra_project.src.gym_data_analysis import calculate_statistics
+from extra_project.src.gym_rollup import RollupCube, bucket_label
+
+# Sample test data
+sample_data = [
+    {"utcdate": "2021-08-15T00:00:00.000Z", "area": "Hietaniemi", "groupId": "OG10", "usageMinutes": 120, "sets": 10},
+    {"utcdate": "2021-08-15T00:00:00.000Z", "area": "Hietaniemi", "groupId": "OG10", "usageMinutes": 150, "sets": 20},
+    {"utcdate": "2021-08-20T00:00:00.000Z", "area": "Pirkkola", "groupId": "OG23", "usageMinutes": 90, "sets": 5},
+    {"utcdate": "2021-09-02T00:00:00.000Z", "area": "Hietaniemi", "groupId": "OG23", "usageMinutes": 60, "sets": 8}
+]
+
+def test_bucket_label():
+    assert bucket_label("2021-08-15", "week") == "2021-W32"
+    assert bucket_label("2021-08-15", "month") == "2021-08"
+    with pytest.raises(ValueError):
+        bucket_label("2021-08-15", "hour")
+
+def test_summary_by_month_and_area():
+    cube = RollupCube.build(sample_data)
+    summary = cube.summary("usageMinutes", granularity="month", by=("area",))
+    assert list(summary) == [("2021-08", "Hietaniemi"), ("2021-08", "Pirkkola"), ("2021-09", "Hietaniemi")]
+    august = summary[("2021-08", "Hietaniemi")]
+    assert august["Count"] == 2
+    assert august["Sum"] == 270
+    assert august["Average"] == 135.0
+    assert august["Standard deviation"] == 15.0
+
+def test_total_matches_calculate_statistics():
+    cube = RollupCube.build(sample_data)
+    total = cube.summary("usageMinutes", granularity="all", by=())[("all",)]
+    expected = calculate_statistics(sample_data, "usageMinutes")
+    for key in ("Average", "Maximum", "Minimum", "Standard deviation"):
+        assert total[key] == expected[key]
+
+def test_filters():
+    cube = RollupCube.build(sample_data)
+    summary = cube.summary("sets", granularity="all", by=("groupId",), area="Hietaniemi", end="2021-08-31")
+    assert summary == {("all", "OG10"): {
+        "Count": 2, "Sum": 30.0, "Average": 15.0, "Maximum": 20.0, "Minimum": 10.0, "Standard deviation": 5.0
+    }}
+
+def test_save_load_and_incremental_update(tmp_path):
+    path = str(tmp_path / "cube.json")
+    RollupCube.build(sample_data[:3]).save(path)
+
+    cube = RollupCube.load(path)
+    # Days already in the cube are skipped, only the new day is added
+    assert cube.update(sample_data) == 1
+    assert cube.skipped == 3
+    assert cube.last_day == "2021-09-02"
+    assert cube.summary("usageMinutes", "all", by=()) == RollupCube.build(sample_data).summary("usageMinutes", "all", by=())
+
+def test_update_adds_new_cells_of_known_days():
+    cube = RollupCube.build(sample_data[:2])
+    # Another area's export for a day already in the cube: only its cells are new
+    other_area = [dict(entry, area="Pirkkola") for entry in sample_data[:2]]
+    assert cube.update(other_area + sample_data) == 4
+    assert cube.update(other_area + sample_data) == 0
+    assert cube.summary("usageMinutes", "all", by=()) == \
+        RollupCube.build(sample_data + other_area).summary("usageMinutes", "all", by=())
+
+def test_late_rows_are_counted_or_merged(tmp_path):
+    late = dict(sample_data[0], usageMinutes=30)
+    cube = RollupCube.build(sample_data)
+    assert cube.update([late]) == 0 and cube.skipped == 1
+    path = str(tmp_path / "cube.json")
+    cube.save(path)
+    assert RollupCube.load(path).skipped == 1
+
+    assert cube.update([late], merge=True) == 1
+    assert cube.summary("usageMinutes", "all", by=()) == \
+        RollupCube.build(sample_data + [late]).summary("usageMinutes", "all", by=())
+
+def test_records_without_date_are_rejected():
+    cube = RollupCube.build(sample_data + [{"utcdate": None, "usageMinutes": 5}, {"usageMinutes": 7}])
+    assert cube.rejected == 2
+    assert cube.summary("usageMinutes", "all", by=())[("all",)]["Count"] == 4
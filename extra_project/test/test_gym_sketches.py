@@ -0,0 +1,82 @@
+import random
+import sys
+from pathlib import Path
+
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from extra_project.src.gym_aggregates import AggregationEngine
+from extra_project.src.gym_sketches import (
+    ApproxDistinctAggregate,
+    ApproxFrequencyAggregate,
+    ApproxStatisticsAggregate,
+    HyperLogLog,
+    KLLSketch,
+    SpaceSaving
+)
+
+def test_hyperloglog_within_error_bound():
+    sketch = HyperLogLog(p=12)
+    for i in range(20000):
+        sketch.add(f"OG{i}")
+    assert abs(sketch.count() - 20000) <= 20000 * 3 * sketch.relative_error()
+
+def test_hyperloglog_merge():
+    left, right = HyperLogLog(), HyperLogLog()
+    for i in range(500):
+        left.add(i)
+        right.add(i + 250)
+    left.merge(right)
+    assert abs(left.count() - 750) <= 750 * 3 * left.relative_error()
+
+def test_space_saving_finds_heavy_hitters():
+    sketch = SpaceSaving(capacity=20)
+    values = ["Hietaniemi"] * 500 + ["Pirkkola"] * 300 + [f"rare{i}" for i in range(400)] + [1, 2]
+    random.Random(3).shuffle(values)
+    for value in values:
+        sketch.add(value)
+    top = sketch.top_k(2)
+    assert [value for value, _, _ in top] == ["Hietaniemi", "Pirkkola"]
+    for value, count, error in top:
+        assert count - error <= values.count(value) <= count
+    assert len(sketch.counters) == 20
+
+def test_space_saving_merge_keeps_the_bounds():
+    parts = [["A"] * 50, ["A"] * 3 + ["B"] * 10 + ["C"] * 10, ["C", "D", "A", "C"] * 4]
+    merged = SpaceSaving(capacity=2)
+    values = []
+    for part in parts:
+        sketch = SpaceSaving(capacity=2)
+        for value in part:
+            sketch.add(value)
+        merged.merge(sketch)
+        values.extend(part)
+        assert merged.total == len(values) and len(merged.counters) <= 2
+        # "A" was pushed out of the second sketch, so its occurrences there only show in the bound
+        for value, (count, error) in merged.counters.items():
+            assert count - error <= values.count(value) <= count
+
+def test_kll_median_within_rank_error():
+    rng = random.Random(7)
+    values = [rng.random() for _ in range(50000)]
+    sketch = KLLSketch(k=200)
+    for value in values:
+        sketch.add(value)
+    median = sketch.quantile(0.5)
+    rank = sum(1 for value in values if value <= median) / len(values)
+    assert abs(rank - 0.5) <= 3 * sketch.rank_error()
+    assert sum(len(level) for level in sketch.levels) < 1000
+
+def test_approximate_aggregates_in_engine():
+    data = [{"area": "Pirkkola" if i % 3 else "Kallio", "trackableId": f"T{i % 50}", "usageMinutes": i % 100}
+            for i in range(3000)]
+    engine = AggregationEngine()
+    engine.register("areas", ApproxFrequencyAggregate("area", k=1, capacity=10))
+    engine.register("ids", ApproxDistinctAggregate("trackableId"))
+    engine.register("stats", ApproxStatisticsAggregate("usageMinutes"))
+    results = engine.run(data)
+
+    assert results["areas"] == [("Pirkkola", 2000, 0)]
+    assert results["ids"]["Distinct values"] == 50
+    assert results["stats"]["Average"] == 49.5
+    assert abs(results["stats"]["Median"] - 49.5) <= 3
+    assert "Percentile rank error" in results["stats"]
@@ -1,152 +1,211 @@
-import urllib.request
+import csv
 import json
-import ssl
-from datetime import datetime
+import os
+import sys
 
-def load_json(file_url):
+from analysis.cache import cached_load
+from analysis.instrument import Instrument
+from analysis.ranking import rank_descending
+from analysis.writers import open_buffered, open_writer
+
+from .job_deadlines import DeadlineClassifier, PostingView
+from .job_geo import GeoGridIndex
+from .job_record import PostingList, compact_postings, posting_hook, posting_rows
+from .job_stats import JobPostingStats
+
+# Feed clients by (url, snapshot file), so repeated polls reuse the same connection
+_feed_clients = {}
+
+# Parse a local JSON file
+# With compact=True the postings are read as JobPosting records (see job_record.py).
+def read_json_file(file_path, compact=False):
+    with open(file_path, 'r') as file:
+        return json.load(file, object_hook=posting_hook() if compact else None)
+
+def read_compact_json_file(file_path):
+    return read_json_file(file_path, compact=True)
+
+# Function to load JSON data
+# The data can come from a URL or a local file (a path or a file:// URL).
+# With use_cache=True a local file is loaded through a binary snapshot next to it,
+# so loading the same unchanged file again skips JSON parsing.
+# With compact=True the postings are loaded as JobPosting records, which take several times less
+# memory than dicts; every function below accepts both.
+def load_json(file_url, use_cache=False, compact=False):
     try:
+        if use_cache:
+            local_path = file_url[len("file://"):] if file_url.startswith("file://") else file_url
+            if os.path.isfile(local_path):
+                if compact:
+                    return cached_load(local_path, read_compact_json_file, variant="compact",
+                                       to_snapshot=posting_rows, from_snapshot=compact_postings)
+                return cached_load(local_path, read_json_file)
+        if os.path.isfile(file_url):
+            return read_json_file(file_url, compact)
+
+        # Imported here so scripts working on local files do not pay for loading the HTTP stack
+        import ssl
+        import urllib.request
         context = ssl._create_unverified_context()
 
         with urllib.request.urlopen(file_url, context=context) as response:
-            return json.loads(response.read())
+            return json.loads(response.read(), object_hook=posting_hook() if compact else None)
     except Exception as error:
         print(f"\nFailed to load JSON data from URL: {file_url}")
         print(f"Reason: {error}\n")
         print("Please check your internet connection or the URL and try again.\n")
         return None
 
+# Function to load several JSON feeds at the same time (e.g. the job feeds of several cities)
+# sources maps a name to a URL. The feeds are downloaded concurrently with timeouts and retries
+# and decoded while they download (see analysis/fetcher.py), so they all arrive in about the time
+# of the slowest one. Returns {name: data}, with None for a feed that could not be loaded.
+def load_json_sources(sources, compact=False, **options):
+    # Imported here so asyncio is only loaded when several feeds are fetched
+    from analysis.fetcher import RecordList, fetch_all
+
+    options.setdefault("verify", False)   # like load_json, the Vantaa feed certificate is not verified
+    consumer = PostingList if compact else RecordList
+    results = fetch_all({name: (url, consumer) for name, url in sources.items()}, **options)
+    data = {}
+    for name, result in results.items():
+        if result["result"] is None:
+            print(f"\nFailed to load JSON data from URL: {result['url']}")
+            print(f"Reason: {result['error']}\n")
+            data[name] = None
+        else:
+            data[name] = list(result["result"])
+    return data
+
+# Function to load JSON data incrementally
+# Only the first call downloads the whole feed. Later calls send ETag / If-Modified-Since and merge
+# the added, changed and removed postings into a local snapshot (saved to snapshot_file, if given).
+# Returns the current list of postings and the changes of this fetch.
+def load_json_incremental(file_url, snapshot_file=None):
+    try:
+        client = _feed_clients.get((file_url, snapshot_file))
+        if client is None:
+            # Imported here so http.client is only loaded when the feed is polled
+            from .job_feed import JobFeedClient
+            client = JobFeedClient(file_url, snapshot_file)
+            _feed_clients[(file_url, snapshot_file)] = client
+        changes = client.fetch()
+        return client.data(), changes
+    except Exception as error:
+        print(f"\nFailed to load JSON data from URL: {file_url}")
+        print(f"Reason: {error}\n")
+        return None, None
+
+# Function to record the fetched postings in the history archive (an SQLite file, see job_archive.py)
+# Returns the number of added, changed, removed and unchanged postings since the previous fetch.
+def archive_postings(data, archive_file, fetched_at=None):
+    # Imported here so sqlite3 is only loaded when the archive is used
+    from .job_archive import PostingArchive
+    try:
+        with PostingArchive(archive_file) as archive:
+            return archive.record_fetch(data, fetched_at)
+    except Exception as error:
+        print(f"Failed to archive postings to {archive_file}: {error}")
+        return None
+
 # Function to count the number of entries
 # This function takes the data as input and returns the number of entries.
 def count_entries(data):
     return len(data)
 
+# The analysis functions below count the data on every call, unless they are given its statistics:
+# build JobPostingStats(data) once (see job_stats.py) and pass it as stats= to answer all of them
+# from one pass. Nothing here caches the statistics or ties them to the data: the caller builds
+# them, keeps them in step with the data (add, remove, apply_changes) and discards them with it.
+# Statistics of other data, or of data changed since, give wrong answers without any error.
+def _posting_stats(data, stats=None):
+    return JobPostingStats(data) if stats is None else stats
+
 # Function to calculate summary statistics
 # This function takes the data as input and returns a dictionary with the most common organization and job title.
-def calculate_summary_statistics(data):
-    orgs = []
-    titles = []
-
-    for entry in data:
-        orgs.append(entry['organisaatio'])
-        titles.append(entry['tyotehtava'])
-
-    org_freq = {}
-    title_freq = {}
-
-    for org in orgs:
-        org_freq[org] = org_freq.get(org, 0) + 1
-    
-    for title in titles:
-        title_freq[title] = title_freq.get(title, 0) + 1
-
-    max_org = None
-    max_org_count = -1
-    for org, count in org_freq.items():
-        if count > max_org_count:
-            max_org = org
-            max_org_count = count
-    
-    max_title = None
-    max_title_count = -1
-    for title, count in title_freq.items():
-        if count > max_title_count:
-            max_title = title
-            max_title_count = count
-
-    return {
-        'most_common_organization': max_org,
-        'most_common_job_title': max_title
-    }
+def calculate_summary_statistics(data, stats=None):
+    return _posting_stats(data, stats).summary()
 
 # Function to analyze job postings by organization
 # This function counts the number of job postings for each organization
 # and calculates the total, average, minimum, maximum, and standard deviation of postings.
-def job_posting_analysis(data):
-    org_counts = {}
-
-    for entry in data:
-        org = entry['organisaatio']
-        org_counts[org] = org_counts.get(org, 0) + 1
-
-    count_values = list(org_counts.values())
-
-    total = 0
-    for val in count_values:
-        total += val
-    average = total / len(count_values)
-
-    # Manual min/max
-    min_val = min(count_values)
-    max_val = max(count_values)
-
-    # Standard deviation
-    variance = 0
-    for val in count_values:
-        variance += (val - average) ** 2
-    stddev = (variance / len(count_values)) ** 0.5
-
-    return {
-        'total_postings': total,
-        'average': average,
-        'min': min_val,
-        'max': max_val,
-        'stddev': stddev,
-        'organization_counter': org_counts
-    }
+def job_posting_analysis(data, stats=None):
+    return _posting_stats(data, stats).analysis()
 
 # Filter and count job titles for a specific organization
 # This function takes the data and an organization name as input and returns a dictionary with job titles as keys and their counts as values.
-# It iterates through the data, checking if the organization matches the input, and updates the counts accordingly.
-def filter_and_count_job_titles(data, org_name):
+# With ammattiala, only the postings of that field count.
+# With stats= (the caller's JobPostingStats of this same data, see above) the counts are an O(1) lookup.
+# Without it every call scans all of data; nothing is cached between calls.
+def filter_and_count_job_titles(data, org_name, ammattiala=None, stats=None):
+    if stats is not None:
+        return stats.job_titles(org_name, ammattiala)
     job_counts = {}
     for entry in data:
-        if entry['organisaatio'] == org_name:
+        if entry['organisaatio'] == org_name and (ammattiala is None or entry.get('ammattiala') == ammattiala):
             title = entry['tyotehtava']
             job_counts[title] = job_counts.get(title, 0) + 1
     return job_counts
 
+# Job titles of every organisation, counted in one pass: {organisation: {title: count}}
+# With by_field=True the titles are also split by field: {organisation: {ammattiala: {title: count}}}
+def count_job_titles_by_organization(data, by_field=False, stats=None):
+    return _posting_stats(data, stats).title_breakdown(by_field)
+
 # Function to check application deadlines
 # This function checks the application deadlines in the data and returns a dictionary with counts of expired and open postings.
-# It uses the datetime module to compare the current date with the deadline date.
-def check_application_deadlines(data):
-    expired = []
-    open_now = []
-
-    for entry in data:
-        deadline_str = entry.get('haku_paattyy_pvm')
-        if deadline_str:
-            try:
-                deadline_date = datetime.strptime(deadline_str, "%Y-%m-%d")
-                if deadline_date < datetime.today():
-                    expired.append(entry)
-                else:
-                    open_now.append(entry)
-            except ValueError:
-                print(f"Invalid date format in entry: {deadline_str}")
+# Today's date is taken once per call and each distinct deadline string is parsed only once (see job_deadlines.py).
+# The expired and open postings are returned as views over data, not as copies.
+def check_application_deadlines(data, today=None):
+    if not isinstance(data, (list, tuple)):
+        data = list(data)
+    classifier = DeadlineClassifier(today)
+    positions = classifier.classify(data)
+    for deadline_str in sorted(classifier.invalid):
+        print(f"Invalid date format in entry: {deadline_str}")
     
     return {
-        "expired_count": len(expired),
-        "open_count": len(open_now),
-        "expired_postings": expired,
-        "open_postings": open_now
+        "expired_count": len(positions["expired"]),
+        "open_count": len(positions["open"]),
+        "expired_postings": PostingView(data, positions["expired"]),
+        "open_postings": PostingView(data, positions["open"])
     }
 
+# Find the job postings within radius_km of a point (longitude, latitude), nearest first
+# The postings can be restricted to one organisation and to postings whose application is still open.
+# For many query points over the same data, build one GeoGridIndex (see job_geo.py) and query it directly.
+def find_jobs_near(data, lon, lat, radius_km, org_name=None, open_only=False, today=None):
+    if not isinstance(data, (list, tuple)):
+        data = list(data)
+    among = None
+    if open_only:
+        among = DeadlineClassifier(today).classify(data)["open"]
+    if org_name is not None:
+        among = [position for position in (range(len(data)) if among is None else among)
+                 if data[position]['organisaatio'] == org_name]
+    found = GeoGridIndex(data).within_radius(lon, lat, radius_km, among=among)
+    return PostingView(data, [position for position, _ in found])
+
 # Function to generate reports
 # This function generates a text and CSV report based on the data, summary statistics, and job posting analysis.
+# Both files are written through large buffers; the CSV file is written with the csv module,
+# so organisations and titles containing commas or quotes are quoted correctly (RFC 4180).
 def generate_reports(data, summary, analysis, specific_org, job_titles, txt_file, csv_file):
     try:
-        with open(txt_file, 'w') as txt, open(csv_file, 'w') as csv:
+        with open_buffered(txt_file) as txt, open_buffered(csv_file, newline="") as csv_out:
+            csv_rows = csv.writer(csv_out, lineterminator="\r\n")
+            total_entries = count_entries(data)
             
             # For txt file
-            txt.write(f"Total number of entries: {count_entries(data)}\n")
+            txt.write(f"Total number of entries: {total_entries}\n")
             txt.write(f"Most common organization: {summary['most_common_organization']}\n")
             txt.write(f"Most common job title: {summary['most_common_job_title']}\n\n")
             
             #For CSV file
-            csv.write("Key,Value\n")
-            csv.write(f"Total Entries,{count_entries(data)}\n")
-            csv.write(f"Most Common Organization,{summary['most_common_organization']}\n")
-            csv.write(f"Most Common Job Title,{summary['most_common_job_title']}\n")
+            csv_rows.writerow(["Key", "Value"])
+            csv_rows.writerow(["Total Entries", total_entries])
+            csv_rows.writerow(["Most Common Organization", summary['most_common_organization']])
+            csv_rows.writerow(["Most Common Job Title", summary['most_common_job_title']])
             
             
             # Job Posting Stats
@@ -160,108 +219,165 @@ def generate_reports(data, summary, analysis, specific_org, job_titles, txt_file
             txt.write(f"{'Maximum postings':<35} | {analysis['max']}\n")
             txt.write(f"{'Standard deviation':<35} | {analysis['stddev']:.2f}\n\n")
 
-            csv.write(f"Total Postings,{analysis['total_postings']}\n")
-            csv.write(f"Average,{analysis['average']:.2f}\n")
-            csv.write(f"Minimum,{analysis['min']}\n")
-            csv.write(f"Maximum,{analysis['max']}\n")
-            csv.write(f"Standard Deviation,{analysis['stddev']:.2f}\n")
+            csv_rows.writerow(["Total Postings", analysis['total_postings']])
+            csv_rows.writerow(["Average", f"{analysis['average']:.2f}"])
+            csv_rows.writerow(["Minimum", analysis['min']])
+            csv_rows.writerow(["Maximum", analysis['max']])
+            csv_rows.writerow(["Standard Deviation", f"{analysis['stddev']:.2f}"])
             
            ## Job postings by organization 
             txt.write("Postings by each organization:\n")
             txt.write("=" * 100 + "\n")
             txt.write(f"{'Organization':<50}{'Number of job posted':>10}\n")
             txt.write("-" * 100 + "\n")
-            csv.write("Organization,Number of job posted\n")
+            csv_rows.writerow(["Organization", "Number of job posted"])
             
             # Sort the organizations by count in descending order
-            # This is done by creating a list of tuples and sorting it
-            org_items = list(analysis['organization_counter'].items())
-            for i in range(len(org_items)):
-                for j in range(i + 1, len(org_items)):
-                    if org_items[i][1] < org_items[j][1]:
-                        org_items[i], org_items[j] = org_items[j], org_items[i]
+            org_items = rank_descending(analysis['organization_counter'])
             
             # Write the sorted organizations to the text and CSV files
             for org, count in org_items:
                 txt.write(f"{org:<50}{count:>10}\n")
-                csv.write(f"\"{org}\",{count}\n")
+            csv_rows.writerows(org_items)
 
             # Job titles posted by a specific organization
             txt.write(f"\nJob titles posted by '{specific_org}'\n")
             txt.write("=" * 100 + "\n")
             txt.write(f"{'Job Title':<50}{'Number of job posted':>10}\n")
             txt.write("-" * 100 + "\n")
-            csv.write(f"\nJob Titles ({specific_org}),Job Title,Number of job posted\n")
+            csv_rows.writerow([])
+            csv_rows.writerow([f"Job Titles ({specific_org})", "Number of job posted"])
 
-            job_items = list(job_titles.items())
+            job_items = rank_descending(job_titles)
             for title, count in job_items:
                 txt.write(f"{title:<50}{count:>10}\n")
-                csv.write(f"\"{title}\",{count}\n")
+            csv_rows.writerows(job_items)
                 
     except Exception as e:
         print(f"Error generating reports: {e}")
 
+# Columns of the expired and available job listings
+LISTING_COLUMNS = ['tyotehtava', 'organisaatio', 'haku_paattyy_pvm']
+LISTING_HEADERS = ['Job Title', 'Organization', 'Deadline']
+
+# Function to write a listing of job postings in any report format
+# The postings can be any iterable (e.g. a generator), they are written one at a time.
+# fmt is one of "text", "csv", "jsonl" or "columnar"; returns the number of postings written.
+def write_job_listing(postings, output_file, fmt="text", title=None):
+    options = {"headers": LISTING_HEADERS}
+    if fmt == "text":
+        options.update(widths=[35, 35, 15], aligns=["<", "<", ">"], title=title)
+    elif fmt in ("jsonl", "columnar"):
+        options = {}
+    with open_writer(output_file, fmt, LISTING_COLUMNS, **options) as writer:
+        return writer.write_rows(
+            {column: entry.get(column, 'Unknown') for column in LISTING_COLUMNS} for entry in postings
+        )
+
+# Function to write the job titles of every organisation in any report format
+# Organisations come with the most postings first and their titles by count, one row per
+# (organisation, title), or per (organisation, field, title) with by_field=True.
+# Returns the number of rows written.
+def write_title_breakdown(data, output_file, fmt="text", by_field=False, stats=None):
+    stats = _posting_stats(data, stats)
+    columns = ['organisaatio', 'ammattiala', 'tyotehtava', 'count'] if by_field else \
+        ['organisaatio', 'tyotehtava', 'count']
+    headers = ['Organization', 'Field', 'Job Title', 'Count'] if by_field else \
+        ['Organization', 'Job Title', 'Count']
+
+    def rows():
+        for org, _ in rank_descending(stats.org_counts):
+            if by_field:
+                fields = stats.org_field_titles[org]
+                field_totals = {field: sum(titles.values()) for field, titles in fields.items()}
+                for field, _ in rank_descending(field_totals):
+                    for title, count in rank_descending(fields[field]):
+                        yield [org, field if field is not None else 'Unknown', title, count]
+            else:
+                for title, count in rank_descending(stats.org_titles[org]):
+                    yield [org, title, count]
+
+    options = {"headers": headers}
+    if fmt == "text":
+        widths = [50, 35, 50, 8] if by_field else [50, 50, 8]
+        options.update(widths=widths, aligns=["<"] * (len(columns) - 1) + [">"],
+                       title="Job titles by organization")
+    elif fmt in ("jsonl", "columnar"):
+        options = {}
+    with open_writer(output_file, fmt, columns, **options) as writer:
+        return writer.write_rows(rows())
+
 # Function to generate a report of expired job postings
 def generate_expired_and_Opening_jobs_report(expired_data, available_data, output_file, output_available):
     try:
-        with open(output_file, 'w') as file, open(output_available, 'w') as file1:
-            
-            file.write(f"Total expired job postings: {len(expired_data)}\n")
-            file.write("Expired Job Postings\n")
-            file.write("=" * 100 + "\n")
-            file.write(f"{'Job Title':<35}{'Organization':<35}{'Deadline':>15}\n")
-            file.write("-" * 100 + "\n")
-            for entry in expired_data:
-                title = entry.get('tyotehtava', 'Unknown')
-                org = entry.get('organisaatio', 'Unknown')
-                deadline = entry.get('haku_paattyy_pvm', 'Unknown')
-                file.write(f"{title:<35}| {org:<35}| {deadline:>15}\n")
-                
-            file1.write(f"Total Opening job postings: {len(available_data)}\n")
-            file1.write("Available Job Postings\n")
-            file1.write("=" * 100 + "\n")
-            file1.write(f"{'Job Title':<35}{'Organization':<35}{'Deadline':>15}\n")
-            file1.write("-" * 100 + "\n")
-            for entry in available_data:
-                title = entry.get('tyotehtava', 'Unknown')
-                org = entry.get('organisaatio', 'Unknown')
-                opened = entry.get('haku_paattyy_pvm', 'Unknown')
-                file1.write(f"{title:<35}| {org:<35}| {opened:>15}\n")
-                
+        write_job_listing(expired_data, output_file,
+                          title=f"Total expired job postings: {len(expired_data)}\nExpired Job Postings")
+        write_job_listing(available_data, output_available,
+                          title=f"Total Opening job postings: {len(available_data)}\nAvailable Job Postings")
         print(f"Expired job postings written to: {output_file}")
     except Exception as e:
         print(f"Failed to write expired jobs report: {e}")
 
-# Testing the function
+# Testing the function, run from the repository root: python -m project.src.data_analysis
+# Each stage of the run is timed; set ANALYSIS_TRACE=trace.json (and optionally
+# ANALYSIS_TRACE_FORMAT=chrome, ANALYSIS_TRACEMALLOC=1, ANALYSIS_PROFILE=run.prof) to save the
+# measurements, see analysis/instrument.py.
 if __name__ == "__main__":
     url = 'http://gis.vantaa.fi/rest/tyopaikat/v1/kaikki'
-    data = load_json(url)
+    instrument = Instrument.from_environment()
+    try:
+        with instrument.stage("load_json", inputs=[url]) as stage:
+            data = load_json(url)
+            stage.rows = len(data) if data else 0
     
-    if data:
-        jobs= check_application_deadlines(data)
-        open_data = jobs['open_postings']
-        expired_data = jobs['expired_postings']
-        openinng_data = jobs['open_postings']
+        if data:
+            rows = count_entries(data)
+            with instrument.stage("check_application_deadlines", rows=rows):
+                jobs= check_application_deadlines(data)
+            open_data = jobs['open_postings']
+            expired_data = jobs['expired_postings']
+            openinng_data = jobs['open_postings']
         
-        summary_statistics = calculate_summary_statistics(data)
-        job_analysis = job_posting_analysis(data)
-        specific_org = "Kasvatus ja oppiminen, Toisen asteen koulutus"
-        job_titles = filter_and_count_job_titles(data, specific_org)
+            # One pass over the data for the summary, the analysis and the job titles
+            with instrument.stage("job_posting_stats", rows=rows):
+                stats = JobPostingStats(data)
+            with instrument.stage("calculate_summary_statistics", rows=rows):
+                summary_statistics = calculate_summary_statistics(data, stats)
+            with instrument.stage("job_posting_analysis", rows=rows):
+                job_analysis = job_posting_analysis(data, stats)
+            specific_org = "Kasvatus ja oppiminen, Toisen asteen koulutus"
+            with instrument.stage("filter_and_count_job_titles", rows=rows):
+                job_titles = filter_and_count_job_titles(data, specific_org, stats=stats)
         
-        print(f"Number of entries: {count_entries(data)}")
+            print(f"Number of entries: {rows}")
+
+            # python -m project.src.data_analysis --archive job_archive.sqlite keeps the history of every run
+            if "--archive" in sys.argv[1:-1]:
+                archive_file = sys.argv[sys.argv.index("--archive") + 1]
+                with instrument.stage("archive_postings", rows=rows, outputs=[archive_file]):
+                    changes = archive_postings(data, archive_file)
+                if changes:
+                    print(f"Archived to {archive_file}: {changes['added']} added, {changes['changed']} changed, "
+                          f"{changes['removed']} removed")
         
-        generate_reports(
-            data,
-            summary_statistics,
-            job_analysis, 
-            specific_org,
-            job_titles,
-            'report.txt', 
-            'report.csv')
+            with instrument.stage("generate_reports", rows=rows, outputs=['report.txt', 'report.csv']):
+                generate_reports(
+                    data,
+                    summary_statistics,
+                    job_analysis, 
+                    specific_org,
+                    job_titles,
+                    'report.txt', 
+                    'report.csv')
         
-        generate_expired_and_Opening_jobs_report(
-            expired_data,
-            openinng_data,
-            'expired_jobs.txt',
-            'available_jobs.txt'
-            )
\ No newline at end of file
+            with instrument.stage("generate_expired_and_Opening_jobs_report", rows=len(expired_data) + len(openinng_data),
+                                  outputs=['expired_jobs.txt', 'available_jobs.txt']):
+                generate_expired_and_Opening_jobs_report(
+                    expired_data,
+                    openinng_data,
+                    'expired_jobs.txt',
+                    'available_jobs.txt'
+                    )
+    finally:
+        # Saved even when a stage failed
+        instrument.finish()
@@ -0,0 +1,280 @@
+# Append-only history of the job posting feed in a local SQLite database.
+# Every fetch of the feed is recorded with record_fetch(): postings that are new or changed get a
+# new row in the versions table, and postings that disappeared from the feed get a removal row.
+# Version rows are never updated or deleted, so the state of the feed at any past moment can be
+# read back, and the trend queries run on indexed tables instead of replaying raw JSON snapshots:
+#
+#   with PostingArchive("job_archive.sqlite") as archive:
+#       archive.record_fetch(load_json(url))
+#       archive.open_on("2025-05-01", organisaatio="Kasvatus ja oppiminen, Varhaiskasvatus")
+#       archive.time_to_fill()
+#       archive.weekly_volume(group_by="ammattiala")
+#
+# The postings table keeps one summary row per posting (first seen, last seen, removed, latest
+# organisation, field and deadline) for the per-posting queries. A posting that comes back after
+# being removed starts a new listing: its first_seen moves to the fetch it reappeared in, so
+# time_to_fill and weekly_volume do not count the gap (the earlier listing stays in history()).
+import hashlib
+import json
+import sqlite3
+import statistics
+from datetime import date, datetime, timezone
+
+from .job_deadlines import DeadlineClassifier
+from .job_feed import posting_key
+
+GROUP_COLUMNS = ("organisaatio", "ammattiala", "tyotehtava")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS fetches (
+    id INTEGER PRIMARY KEY,
+    fetched_at TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    added INTEGER NOT NULL,
+    changed INTEGER NOT NULL,
+    removed INTEGER NOT NULL
+);
+-- One row per posting version; content is NULL when the posting was removed from the feed
+CREATE TABLE IF NOT EXISTS versions (
+    key TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    fetched_at TEXT NOT NULL,
+    content TEXT,
+    organisaatio TEXT,
+    ammattiala TEXT,
+    tyotehtava TEXT,
+    deadline TEXT,
+    PRIMARY KEY (key, version)
+);
+CREATE TABLE IF NOT EXISTS postings (
+    key TEXT PRIMARY KEY,
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL,
+    removed_at TEXT,
+    version INTEGER NOT NULL,
+    content_hash TEXT,
+    organisaatio TEXT,
+    ammattiala TEXT,
+    tyotehtava TEXT,
+    deadline TEXT
+);
+CREATE INDEX IF NOT EXISTS versions_fetched_at ON versions (fetched_at);
+CREATE INDEX IF NOT EXISTS versions_organisaatio ON versions (organisaatio);
+CREATE INDEX IF NOT EXISTS versions_ammattiala ON versions (ammattiala);
+CREATE INDEX IF NOT EXISTS versions_deadline ON versions (deadline);
+CREATE INDEX IF NOT EXISTS postings_organisaatio ON postings (organisaatio);
+CREATE INDEX IF NOT EXISTS postings_ammattiala ON postings (ammattiala);
+CREATE INDEX IF NOT EXISTS postings_deadline ON postings (deadline);
+CREATE INDEX IF NOT EXISTS postings_first_seen ON postings (first_seen);
+"""
+
+
+# Timestamp as a sortable UTC string ("YYYY-MM-DDTHH:MM:SS"); accepts datetime, date or an ISO string
+# A day (a date or "YYYY-MM-DD") is its midnight, or its last second with end_of_day=True.
+# Strings are parsed like the other values, so every stored timestamp has the same format.
+def timestamp(value=None, end_of_day=False):
+    if value is None:
+        value = datetime.now(timezone.utc)
+    if isinstance(value, str):
+        value = value.strip()
+        if len(value) == 10:
+            value = date.fromisoformat(value)
+        else:
+            value = datetime.fromisoformat(value[:-1] + "+00:00" if value.endswith("Z") else value)
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value.isoformat(timespec="seconds")
+    return f"{value.isoformat()}T{'23:59:59' if end_of_day else '00:00:00'}"
+
+
+# Label of the ISO week of a day, e.g. "2025-W18"
+def week_label(day):
+    year, week, _ = date.fromisoformat(day[:10]).isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+class PostingArchive:
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(SCHEMA)
+        self.dates = DeadlineClassifier()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    # Normalised deadline of a posting ("YYYY-MM-DD"), or None without a valid one
+    def _deadline(self, entry):
+        deadline = entry.get('haku_paattyy_pvm')
+        if not deadline:
+            return None
+        parsed = self.dates.parse(deadline)
+        return parsed.isoformat() if parsed else None
+
+    # Record one fetch of the whole feed (a list of postings, dicts or JobPosting)
+    # Returns the number of added, changed, removed and unchanged postings.
+    # An empty feed is far more likely a failed fetch than every job filled, so it is refused
+    # (ValueError) unless allow_empty=True; recording it would mark every posting as removed.
+    # Fetches are recorded in time order: one older than the latest recorded fetch is refused
+    # (ValueError), since its versions would be numbered after newer ones.
+    def record_fetch(self, postings, fetched_at=None, allow_empty=False):
+        fetched_at = timestamp(fetched_at)
+        (latest_fetch,) = self.connection.execute("SELECT MAX(fetched_at) FROM fetches").fetchone()
+        if latest_fetch is not None and fetched_at < latest_fetch:
+            raise ValueError(f"The fetch at {fetched_at} is older than the latest recorded fetch ({latest_fetch})")
+        current = {}
+        for entry in postings:
+            if hasattr(entry, "to_dict"):
+                entry = entry.to_dict()
+            current[posting_key(entry)] = entry
+        if not current and not allow_empty:
+            raise ValueError("The fetch has no postings; pass allow_empty=True to record it")
+
+        # Latest version of every posting ever seen: key -> (version, content hash or None when removed)
+        latest = {key: (version, content_hash) for key, version, content_hash in
+                  self.connection.execute("SELECT key, version, content_hash FROM postings")}
+        new_versions = []
+        hashes = {}
+        seen = []
+        counts = {"added": 0, "changed": 0, "removed": 0, "unchanged": 0}
+        for key, entry in current.items():
+            content = json.dumps(entry, sort_keys=True, ensure_ascii=False)
+            content_hash = hashlib.sha1(content.encode("utf-8")).hexdigest()
+            version, previous = latest.get(key, (0, None))
+            if previous == content_hash:
+                counts["unchanged"] += 1
+                seen.append((fetched_at, key))
+                continue
+            counts["added" if previous is None else "changed"] += 1
+            new_versions.append((key, version + 1, fetched_at, content, entry.get('organisaatio'),
+                                 entry.get('ammattiala'), entry.get('tyotehtava'), self._deadline(entry)))
+            hashes[key] = content_hash
+        removals = [
+            (key, version + 1, fetched_at, None, None, None, None, None)
+            for key, (version, content_hash) in latest.items() if content_hash is not None and key not in current
+        ]
+        counts["removed"] = len(removals)
+
+        with self.connection:
+            self.connection.executemany("INSERT INTO versions VALUES (?, ?, ?, ?, ?, ?, ?, ?)", new_versions + removals)
+            self.connection.executemany(
+                """INSERT INTO postings (key, first_seen, last_seen, removed_at, version, content_hash,
+                                         organisaatio, ammattiala, tyotehtava, deadline)
+                   VALUES (?, ?, ?, NULL, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (key) DO UPDATE SET
+                       first_seen = CASE WHEN removed_at IS NULL THEN first_seen ELSE excluded.first_seen END,
+                       last_seen = excluded.last_seen, removed_at = NULL, version = excluded.version,
+                       content_hash = excluded.content_hash, organisaatio = excluded.organisaatio,
+                       ammattiala = excluded.ammattiala, tyotehtava = excluded.tyotehtava,
+                       deadline = excluded.deadline""",
+                [(key, fetched_at, fetched_at, version, hashes[key], org, field, title, deadline)
+                 for key, version, _, _, org, field, title, deadline in new_versions]
+            )
+            self.connection.executemany("UPDATE postings SET last_seen = ? WHERE key = ?", seen)
+            self.connection.executemany(
+                "UPDATE postings SET removed_at = ?, version = ?, content_hash = NULL WHERE key = ?",
+                [(fetched_at, version, key) for key, version, *_ in removals]
+            )
+            self.connection.execute(
+                "INSERT INTO fetches (fetched_at, total, added, changed, removed) VALUES (?, ?, ?, ?, ?)",
+                (fetched_at, len(current), counts["added"], counts["changed"], counts["removed"])
+            )
+        return counts
+
+    # Postings in the feed at a moment (datetime or timestamp string), as they were then
+    # A day means the end of it, like in open_on. The postings are in the order they first
+    # appeared in the archive.
+    def snapshot(self, at, organisaatio=None, ammattiala=None):
+        return self._live(timestamp(at, end_of_day=True), organisaatio=organisaatio, ammattiala=ammattiala)
+
+    # Postings open on a day: in the feed that day (as last fetched by the end of it) with a
+    # deadline after the day, like check_application_deadlines
+    def open_on(self, day, organisaatio=None, ammattiala=None):
+        day = day.isoformat() if isinstance(day, date) else day[:10]
+        return self._live(timestamp(day, end_of_day=True), open_after=day, organisaatio=organisaatio, ammattiala=ammattiala)
+
+    def _live(self, at, open_after=None, organisaatio=None, ammattiala=None):
+        query = """SELECT v.content FROM versions v
+                   WHERE v.fetched_at <= :at AND v.content IS NOT NULL
+                     AND v.version = (SELECT MAX(version) FROM versions WHERE key = v.key AND fetched_at <= :at)"""
+        params = {"at": at}
+        if open_after is not None:
+            query += " AND v.deadline > :day"
+            params["day"] = open_after
+        if organisaatio is not None:
+            query += " AND v.organisaatio = :organisaatio"
+            params["organisaatio"] = organisaatio
+        if ammattiala is not None:
+            query += " AND v.ammattiala = :ammattiala"
+            params["ammattiala"] = ammattiala
+        # In order of first appearance in the archive
+        query += " ORDER BY (SELECT MIN(rowid) FROM versions WHERE key = v.key)"
+        return [json.loads(content) for (content,) in self.connection.execute(query, params)]
+
+    # Days from first seen to removal from the feed, per organisation (or another column)
+    # Only postings that have been removed count. Returns {group: {"count", "average_days",
+    # "median_days", "min_days", "max_days"}}, groups with the most postings first.
+    def time_to_fill(self, group_by="organisaatio"):
+        if group_by not in GROUP_COLUMNS:
+            raise ValueError(f"Unknown group column: {group_by} (expected one of {', '.join(GROUP_COLUMNS)})")
+        days = {}
+        for group, elapsed in self.connection.execute(
+            f"""SELECT {group_by}, julianday(removed_at) - julianday(first_seen) FROM postings
+                WHERE removed_at IS NOT NULL"""
+        ):
+            days.setdefault(group, []).append(elapsed)
+        result = {}
+        for group, values in sorted(days.items(), key=lambda item: (-len(item[1]), str(item[0]))):
+            result[group] = {
+                "count": len(values),
+                "average_days": round(sum(values) / len(values), 2),
+                "median_days": round(statistics.median(values), 2),
+                "min_days": round(min(values), 2),
+                "max_days": round(max(values), 2)
+            }
+        return result
+
+    # Number of new postings per ISO week of first appearance, optionally split by a column
+    # Returns {week: count}, or {(week, group): count} with group_by, in week order.
+    def weekly_volume(self, group_by=None, start=None, end=None):
+        if group_by is not None and group_by not in GROUP_COLUMNS:
+            raise ValueError(f"Unknown group column: {group_by} (expected one of {', '.join(GROUP_COLUMNS)})")
+        query = f"SELECT date(first_seen), {group_by or 'NULL'}, COUNT(*) FROM postings WHERE 1 = 1"
+        params = []
+        if start is not None:
+            query += " AND first_seen >= ?"
+            params.append(timestamp(start))
+        if end is not None:
+            query += " AND first_seen <= ?"
+            params.append(f"{timestamp(end)[:10]}T23:59:59")
+        query += f" GROUP BY 1{', 2' if group_by else ''}"
+        volume = {}
+        for day, group, count in self.connection.execute(query, params):
+            key = week_label(day) if group_by is None else (week_label(day), group)
+            volume[key] = volume.get(key, 0) + count
+        if group_by is None:
+            return dict(sorted(volume.items()))
+        return dict(sorted(volume.items(), key=lambda item: (item[0][0], str(item[0][1]))))
+
+    # All versions of one posting as (version, fetched_at, posting or None when removed)
+    def history(self, key):
+        return [
+            (version, fetched_at, None if content is None else json.loads(content))
+            for version, fetched_at, content in self.connection.execute(
+                "SELECT version, fetched_at, content FROM versions WHERE key = ? ORDER BY version", (str(key),)
+            )
+        ]
+
+    # The recorded fetches as dicts, oldest first
+    def fetches(self):
+        columns = ("fetched_at", "total", "added", "changed", "removed")
+        return [dict(zip(columns, row)) for row in self.connection.execute(
+            "SELECT fetched_at, total, added, changed, removed FROM fetches ORDER BY id"
+        )]
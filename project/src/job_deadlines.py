@@ -0,0 +1,102 @@
+# Classification of job postings by application deadline.
+# DeadlineClassifier fixes "today" once per run and parses each distinct deadline string only
+# once (most postings share a handful of dates). Results are lists of positions in the data, and
+# PostingView wraps such a list as a read-only sequence of postings, so nothing is copied.
+from datetime import date, datetime
+
+
+# Read-only sequence of the postings at the given positions of data
+class PostingView:
+    def __init__(self, data, positions):
+        self.data = data
+        self.positions = positions
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return PostingView(self.data, self.positions[i])
+        return self.data[self.positions[i]]
+
+    def __iter__(self):
+        for position in self.positions:
+            yield self.data[position]
+
+    def __repr__(self):
+        return f"PostingView({len(self)} postings)"
+
+
+class DeadlineClassifier:
+    def __init__(self, today=None):
+        self.today = today or date.today()
+        self.cache = {}        # deadline string -> date, or None when the string is not a valid date
+        self.invalid = set()   # deadline strings that could not be parsed
+
+    # Parse a deadline string ("YYYY-MM-DD") once and remember the result
+    def parse(self, deadline):
+        if isinstance(deadline, date):
+            return deadline
+        if deadline in self.cache:
+            return self.cache[deadline]
+        try:
+            parsed = date.fromisoformat(deadline)
+        except ValueError:
+            # fromisoformat is strict; strptime also accepts e.g. "2025-5-8"
+            try:
+                parsed = datetime.strptime(deadline, "%Y-%m-%d").date()
+            except ValueError:
+                parsed = None
+                self.invalid.add(deadline)
+        self.cache[deadline] = parsed
+        return parsed
+
+    # Days from today until the deadline of a posting, or None without a valid deadline
+    def days_left(self, entry):
+        deadline = entry.get('haku_paattyy_pvm')
+        if not deadline:
+            return None
+        parsed = self.parse(deadline)
+        if parsed is None:
+            return None
+        return (parsed - self.today).days
+
+    # Split the postings into expired, open and invalid positions
+    # A posting whose deadline is today counts as expired, like comparing it with datetime.today().
+    # Postings without a deadline are in none of the lists.
+    def classify(self, data):
+        expired, open_now, invalid = [], [], []
+        for position, entry in enumerate(data):
+            deadline = entry.get('haku_paattyy_pvm')
+            if not deadline:
+                continue
+            parsed = self.parse(deadline)
+            if parsed is None:
+                invalid.append(position)
+            elif parsed <= self.today:
+                expired.append(position)
+            else:
+                open_now.append(position)
+        return {"expired": expired, "open": open_now, "invalid": invalid}
+
+    # Group the positions of the open postings by days left until the deadline
+    # edges=(7, 30) gives the buckets "1-7", "8-30" and "31+" (days left).
+    def bucket_by_days(self, data, edges=(7, 30)):
+        labels = []
+        low = 1
+        for edge in edges:
+            labels.append(f"{low}-{edge}")
+            low = edge + 1
+        labels.append(f"{low}+")
+        buckets = {label: [] for label in labels}
+        for position, entry in enumerate(data):
+            days = self.days_left(entry)
+            if days is None or days <= 0:
+                continue
+            for edge, label in zip(edges, labels):
+                if days <= edge:
+                    buckets[label].append(position)
+                    break
+            else:
+                buckets[labels[-1]].append(position)
+        return buckets
@@ -0,0 +1,135 @@
+# Incremental fetching of the job posting feed.
+# load_json downloads the whole feed on every call. JobFeedClient instead:
+#   - keeps one HTTP(S) connection open and reuses it for every poll
+#   - sends If-None-Match / If-Modified-Since, so an unchanged feed costs only a 304 response
+#   - keeps a local snapshot of the postings keyed by their id (optionally saved to a file)
+#     and reports which postings were added, changed or removed since the previous fetch
+import http.client
+import json
+import os
+import ssl
+import urllib.parse
+
+
+# Key used to identify a posting between fetches
+def posting_key(entry):
+    if entry.get('id') is not None:
+        return str(entry['id'])
+    return entry.get('tyoavain') or entry.get('linkki') or json.dumps(entry, sort_keys=True)
+
+
+# Compare two {key: posting} dicts and return the added, changed and removed postings
+# For changed postings, replaced holds the previous versions in the same order.
+def diff_postings(old, new):
+    added = [entry for key, entry in new.items() if key not in old]
+    changed_keys = [key for key, entry in new.items() if key in old and old[key] != entry]
+    changed = [new[key] for key in changed_keys]
+    replaced = [old[key] for key in changed_keys]
+    removed = [entry for key, entry in old.items() if key not in new]
+    return added, changed, replaced, removed
+
+
+class JobFeedClient:
+    def __init__(self, url, snapshot_file=None, timeout=30):
+        self.url = url
+        self.snapshot_file = snapshot_file
+        self.timeout = timeout
+        parts = urllib.parse.urlsplit(url)
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        self.port = parts.port
+        self.path = parts.path or "/"
+        if parts.query:
+            self.path += "?" + parts.query
+        # Created once and shared by every connection (the feed's certificate is not verified, like load_json)
+        self.context = ssl._create_unverified_context() if self.scheme == "https" else None
+        self.connection = None
+
+        self.etag = None
+        self.last_modified = None
+        self.postings = {}
+        if snapshot_file and os.path.exists(snapshot_file):
+            self.load_snapshot()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def _connect(self):
+        if self.scheme == "https":
+            return http.client.HTTPSConnection(self.host, self.port, timeout=self.timeout, context=self.context)
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    # Send a GET request on the open connection, reconnecting once if the server closed it
+    def _get(self, headers):
+        for attempt in range(2):
+            if self.connection is None:
+                self.connection = self._connect()
+            try:
+                self.connection.request("GET", self.path, headers=headers)
+                response = self.connection.getresponse()
+                return response, response.read()
+            except (http.client.RemoteDisconnected, http.client.CannotSendRequest,
+                    ConnectionResetError, BrokenPipeError):
+                self.close()
+                if attempt == 1:
+                    raise
+
+    # Fetch the feed and merge it into the local snapshot
+    # Returns a dict with the added, changed and removed postings, plus in "replaced" the previous
+    # versions of the changed ones. "not_modified" is True when the server answered 304 and
+    # nothing had to be downloaded or parsed.
+    def fetch(self):
+        headers = {"Accept": "application/json"}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+
+        response, body = self._get(headers)
+        if response.getheader("Connection", "").lower() == "close":
+            self.close()
+        if response.status == 304:
+            return {"not_modified": True, "added": [], "changed": [], "replaced": [], "removed": []}
+        if response.status != 200:
+            raise http.client.HTTPException(f"Unexpected HTTP status {response.status} from {self.url}")
+
+        new_postings = {posting_key(entry): entry for entry in json.loads(body)}
+        added, changed, replaced, removed = diff_postings(self.postings, new_postings)
+        self.postings = new_postings
+        self.etag = response.getheader("ETag")
+        self.last_modified = response.getheader("Last-Modified")
+        if self.snapshot_file:
+            self.save_snapshot()
+        return {"not_modified": False, "added": added, "changed": changed, "replaced": replaced, "removed": removed}
+
+    # All postings of the current snapshot
+    def data(self):
+        return list(self.postings.values())
+
+    def load_snapshot(self):
+        with open(self.snapshot_file, 'r') as file:
+            snapshot = json.load(file)
+        self.etag = snapshot.get("etag")
+        self.last_modified = snapshot.get("last_modified")
+        self.postings = {posting_key(entry): entry for entry in snapshot.get("postings", [])}
+
+    # Write the snapshot to a temporary file first so a crash never leaves a half-written snapshot
+    def save_snapshot(self):
+        snapshot = {
+            "url": self.url,
+            "etag": self.etag,
+            "last_modified": self.last_modified,
+            "postings": self.data()
+        }
+        temp_file = f"{self.snapshot_file}.tmp"
+        with open(temp_file, 'w') as file:
+            json.dump(snapshot, file)
+        os.replace(temp_file, self.snapshot_file)
@@ -0,0 +1,172 @@
+# Spatial queries over the x/y (longitude/latitude) coordinates of the job postings.
+# GeoGridIndex puts every posting into a uniform grid of cell_km x cell_km cells. A radius or
+# bounding box query only looks at the postings of the cells it overlaps, and the exact
+# great-circle (haversine) distance is computed for those candidates in one vectorized step
+# (with NumPy when it is installed, plain Python otherwise).
+#
+# Results are positions in the data, like DeadlineClassifier.classify(), so they combine with
+# the deadline and organisation filters through the among argument and wrap into a PostingView:
+#
+#   index = GeoGridIndex(data)
+#   open_positions = DeadlineClassifier().classify(data)["open"]
+#   near = index.within_radius(24.94, 60.17, 5, among=open_positions)
+import math
+
+# NumPy is optional and only imported when the first distances are computed (see numpy_module)
+_numpy = None
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180   # length of one degree of latitude
+
+
+# Great-circle distance in kilometres between two (longitude, latitude) points
+def haversine_km(lon1, lat1, lon2, lat2):
+    lon1, lat1, lon2, lat2 = map(math.radians, (lon1, lat1, lon2, lat2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+# The numpy module, or None when it is not installed
+def numpy_module():
+    global _numpy
+    if _numpy is None:
+        try:
+            import numpy
+            _numpy = numpy
+        except ImportError:
+            _numpy = False
+    return _numpy or None
+
+
+# Distances in kilometres from one point to many points (sequences of longitudes and latitudes)
+def haversine_many(lon, lat, lons, lats):
+    np = numpy_module()
+    if np is None:
+        return [haversine_km(lon, lat, x, y) for x, y in zip(lons, lats)]
+    lon, lat = math.radians(lon), math.radians(lat)
+    lons = np.radians(np.asarray(lons, dtype=np.float64))
+    lats = np.radians(np.asarray(lats, dtype=np.float64))
+    a = np.sin((lats - lat) / 2) ** 2 + math.cos(lat) * np.cos(lats) * np.sin((lons - lon) / 2) ** 2
+    return (2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(1.0, np.sqrt(a)))).tolist()
+
+
+# Coordinates of a posting as (longitude, latitude), or None when they are missing or invalid
+def posting_point(entry, x_key="x", y_key="y"):
+    try:
+        lon, lat = float(entry[x_key]), float(entry[y_key])
+    except (KeyError, TypeError, ValueError):
+        return None
+    if math.isnan(lon) or math.isnan(lat) or not -180 <= lon <= 180 or not -90 <= lat <= 90:
+        return None
+    return lon, lat
+
+
+class GeoGridIndex:
+    def __init__(self, data, cell_km=1.0, x_key="x", y_key="y"):
+        self.data = data
+        self.cell_km = cell_km
+        self.points = {}      # position -> (longitude, latitude)
+        self.missing = []     # positions of postings without valid coordinates
+        for position, entry in enumerate(data):
+            point = posting_point(entry, x_key, y_key)
+            if point is None:
+                self.missing.append(position)
+            else:
+                self.points[position] = point
+        # Cells are cell_km high everywhere; their width in degrees is set at the mean latitude
+        # of the postings, which keeps them close to square over a city-sized area.
+        latitudes = [lat for _, lat in self.points.values()]
+        mean_lat = sum(latitudes) / len(latitudes) if latitudes else 0.0
+        self.lat_step = cell_km / KM_PER_DEGREE
+        self.lon_step = cell_km / (KM_PER_DEGREE * max(math.cos(math.radians(mean_lat)), 0.01))
+        self.cells = {}       # (column, row) -> positions, in data order
+        for position, point in self.points.items():
+            self.cells.setdefault(self.cell_of(*point), []).append(position)
+
+    def __len__(self):
+        return len(self.points)
+
+    # Grid cell (column, row) of a point
+    def cell_of(self, lon, lat):
+        return math.floor(lon / self.lon_step), math.floor(lat / self.lat_step)
+
+    # Positions in the cells overlapping a bounding box, in data order
+    def _candidates(self, min_lon, min_lat, max_lon, max_lat):
+        first_col, first_row = self.cell_of(min_lon, min_lat)
+        last_col, last_row = self.cell_of(max_lon, max_lat)
+        wanted = (last_col - first_col + 1) * (last_row - first_row + 1)
+        if wanted > len(self.cells):
+            # Box larger than the populated area: walk the occupied cells instead
+            keys = [
+                (col, row) for col, row in self.cells
+                if first_col <= col <= last_col and first_row <= row <= last_row
+            ]
+        else:
+            keys = [
+                (col, row) for col in range(first_col, last_col + 1) for row in range(first_row, last_row + 1)
+                if (col, row) in self.cells
+            ]
+        candidates = [position for key in keys for position in self.cells[key]]
+        candidates.sort()
+        return candidates
+
+    # Positions of the postings inside a bounding box (edges included)
+    # among restricts the result to the given positions (e.g. open postings of one organisation).
+    def within_bbox(self, min_lon, min_lat, max_lon, max_lat, among=None):
+        among = None if among is None else set(among)
+        result = []
+        for position in self._candidates(min_lon, min_lat, max_lon, max_lat):
+            if among is not None and position not in among:
+                continue
+            lon, lat = self.points[position]
+            if min_lon <= lon <= max_lon and min_lat <= lat <= max_lat:
+                result.append(position)
+        return result
+
+    # Postings within radius_km of a point as (position, distance in km), nearest first
+    def within_radius(self, lon, lat, radius_km, among=None):
+        among = None if among is None else set(among)
+        d_lat = radius_km / KM_PER_DEGREE
+        # Longitude degrees shrink towards the poles: use the latitude of the box edge nearest to a pole
+        edge_lat = min(90.0, abs(lat) + d_lat)
+        cos_edge = math.cos(math.radians(edge_lat))
+        if cos_edge < 1e-6 or radius_km / (KM_PER_DEGREE * cos_edge) >= 180:
+            candidates = sorted(self.points)
+        else:
+            d_lon = radius_km / (KM_PER_DEGREE * cos_edge)
+            candidates = self._candidates(lon - d_lon, lat - d_lat, lon + d_lon, lat + d_lat)
+        if among is not None:
+            candidates = [position for position in candidates if position in among]
+        if not candidates:
+            return []
+        distances = haversine_many(
+            lon, lat,
+            [self.points[position][0] for position in candidates],
+            [self.points[position][1] for position in candidates]
+        )
+        found = [(position, distance) for position, distance in zip(candidates, distances) if distance <= radius_km]
+        found.sort(key=lambda item: item[1])
+        return found
+
+    # Number of postings within radius_km of each (longitude, latitude) query point
+    def count_within_radius(self, query_points, radius_km, among=None):
+        among = None if among is None else set(among)
+        return [len(self.within_radius(lon, lat, radius_km, among)) for lon, lat in query_points]
+
+    # Number of postings per grid cell, for a map view: {(column, row): count}
+    # Cell (column, row) covers longitudes [column * lon_step, (column + 1) * lon_step) and
+    # the same for latitudes with lat_step.
+    def cell_counts(self, among=None):
+        if among is None:
+            return {key: len(positions) for key, positions in self.cells.items()}
+        counts = {}
+        for position in among:
+            if position in self.points:
+                key = self.cell_of(*self.points[position])
+                counts[key] = counts.get(key, 0) + 1
+        return counts
+
+    # Number of postings per named district, where districts maps a name to its bounding box
+    # (min_lon, min_lat, max_lon, max_lat); a posting in several boxes counts in each of them.
+    def district_counts(self, districts, among=None):
+        return {name: len(self.within_bbox(*bbox, among=among)) for name, bbox in districts.items()}
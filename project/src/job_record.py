@@ -0,0 +1,176 @@
+# Compact in-memory representation of a job posting.
+# A posting parsed by the json module is a dict of 10 keys, and every posting holds its own copy
+# of the long organisation, field and title strings, the same URL twice (tyoavain and linkki)
+# and the deadline as a string. JobPosting stores the same fields in __slots__ instead:
+#   - organisaatio, ammattiala, tyotehtava and osoite are interned, so all postings share one
+#     string per distinct value
+#   - linkki is not stored when it is the same as tyoavain
+#   - haku_paattyy_pvm is a datetime.date, shared by all postings with the same deadline
+#     (a deadline that is not a valid date is kept as the original string)
+# This takes several times less memory per posting. JobPosting can be read like the dict it
+# replaces (posting["organisaatio"], posting.get("linkki"), "x" in posting), so the functions of
+# data_analysis.py accept both. Use load_json(..., compact=True) to load postings as JobPosting.
+#
+# The deadlines are parsed by a DeadlineClassifier that belongs to one load (one posting_hook(),
+# compact_postings call or PostingList), so its cache is dropped together with the dataset.
+# Cache snapshots store the postings as plain dicts (posting_rows) and rebuild the records on load:
+# a pickled JobPosting could only be read back under the module path it was written from.
+import sys
+
+from .job_deadlines import DeadlineClassifier
+
+FIELDS = ("id", "organisaatio", "ammattiala", "tyotehtava", "tyoavain", "osoite", "haku_paattyy_pvm", "x", "y", "linkki")
+INTERNED_FIELDS = ("organisaatio", "ammattiala", "tyotehtava", "osoite")
+DATE_FIELD = "haku_paattyy_pvm"
+# Stored in place of linkki when it is the same as tyoavain
+SAME_AS_TYOAVAIN = object()
+
+
+class JobPosting:
+    __slots__ = ("id", "organisaatio", "ammattiala", "tyotehtava", "tyoavain", "osoite",
+                 "haku_paattyy_pvm", "x", "y", "_linkki", "extra")
+
+    # Build a posting from a dict parsed from the feed
+    # Fields missing from the dict stay missing; keys outside FIELDS are kept in extra.
+    # dates parses each distinct deadline string once and hands out one shared date object per
+    # deadline; give the postings of one dataset the same DeadlineClassifier.
+    @classmethod
+    def from_dict(cls, entry, dates=None):
+        posting = cls()
+        posting.extra = None
+        for key, value in entry.items():
+            if key == "linkki":
+                posting._linkki = SAME_AS_TYOAVAIN if "tyoavain" in entry and value == entry["tyoavain"] else value
+            elif key in INTERNED_FIELDS:
+                setattr(posting, key, sys.intern(value) if isinstance(value, str) else value)
+            elif key == DATE_FIELD:
+                if dates is None:
+                    dates = DeadlineClassifier()
+                parsed = dates.parse(value) if isinstance(value, str) and value else None
+                posting.haku_paattyy_pvm = value if parsed is None else parsed
+            elif key in FIELDS:
+                setattr(posting, key, value)
+            else:
+                if posting.extra is None:
+                    posting.extra = {}
+                posting.extra[key] = value
+        return posting
+
+    @property
+    def linkki(self):
+        if self._linkki is SAME_AS_TYOAVAIN:
+            return self.tyoavain
+        return self._linkki
+
+    def __getitem__(self, key):
+        if key == "linkki":
+            try:
+                return self.linkki
+            except AttributeError:
+                raise KeyError(key) from None
+        if key in FIELDS:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        if self.extra is not None and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key):
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def keys(self):
+        keys = [key for key in FIELDS if key in self]
+        if self.extra:
+            keys.extend(self.extra)
+        return keys
+
+    def items(self):
+        return [(key, self[key]) for key in self.keys()]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    # The posting as a plain dict, with the deadline back as a "YYYY-MM-DD" string
+    def to_dict(self):
+        entry = dict(self.items())
+        deadline = entry.get(DATE_FIELD)
+        if deadline is not None and not isinstance(deadline, str):
+            entry[DATE_FIELD] = deadline.isoformat()
+        return entry
+
+    def __eq__(self, other):
+        if isinstance(other, JobPosting):
+            return self.to_dict() == other.to_dict()
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    __hash__ = None
+
+    # Slots without a value are left out, so missing fields stay missing after unpickling
+    # The SAME_AS_TYOAVAIN marker would not survive pickling, so it is stored as a flag.
+    def __getstate__(self):
+        state = {key: getattr(self, key) for key in self.__slots__ if hasattr(self, key)}
+        if state.get("_linkki") is SAME_AS_TYOAVAIN:
+            del state["_linkki"]
+            state["linkki_same"] = True
+        return state
+
+    def __setstate__(self, state):
+        for key, value in state.items():
+            if key == "linkki_same":
+                self._linkki = SAME_AS_TYOAVAIN
+            else:
+                setattr(self, key, value)
+
+    def __repr__(self):
+        return f"JobPosting({self.to_dict()!r})"
+
+
+# json object_hook for one load: postings become JobPosting, any other object stays a dict
+def posting_hook():
+    dates = DeadlineClassifier()
+
+    def hook(entry):
+        if "organisaatio" in entry or "tyotehtava" in entry:
+            return JobPosting.from_dict(entry, dates)
+        return entry
+    return hook
+
+
+# Convert parsed postings (dicts) to JobPosting
+def compact_postings(data):
+    dates = DeadlineClassifier()
+    return [entry if isinstance(entry, JobPosting) else JobPosting.from_dict(entry, dates) for entry in data]
+
+
+# The postings as plain dicts for a cache snapshot; compact_postings turns them back into JobPosting
+# The deadlines stay date objects (datetime.date pickles the same from any entry point).
+def posting_rows(data):
+    return [dict(entry.items()) if isinstance(entry, JobPosting) else entry for entry in data]
+
+
+# List of JobPosting that takes the postings one at a time with add(), e.g. from the
+# concurrent fetcher (analysis/fetcher.py) while the feed downloads
+class PostingList(list):
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.dates = DeadlineClassifier()
+
+    def add(self, entry):
+        self.append(JobPosting.from_dict(entry, self.dates) if isinstance(entry, dict) else entry)
@@ -0,0 +1,138 @@
+# Incrementally maintained statistics over job postings.
+# JobPostingStats keeps the organisation and job title counters and the distribution of
+# postings per organisation (number of organisations, total, sum of squares, and how many
+# organisations have each count for min/max). Adding or removing a posting updates them in
+# O(1), so with a live feed of posting changes the report numbers follow in O(changed postings)
+# instead of being recomputed over all postings.
+#
+# It also keeps the job titles of every organisation (organisation -> title -> count), and the
+# same split by field (organisation -> ammattiala -> title -> count), so the title breakdown of
+# one organisation is a lookup and the breakdown of all of them is ready after one pass.
+
+
+class JobPostingStats:
+    def __init__(self, data=()):
+        self.org_counts = {}
+        self.title_counts = {}
+        self.total = 0
+        self.sum_of_squares = 0     # sum of count ** 2 over organisations
+        self.count_of_counts = {}   # postings per organisation -> number of organisations
+        self.org_titles = {}        # organisation -> title -> count
+        self.org_field_titles = {}  # organisation -> ammattiala -> title -> count
+        for entry in data:
+            self.add(entry)
+
+    # Move one organisation from count old to count new in the distribution
+    def _move_org(self, old, new):
+        if old:
+            self.count_of_counts[old] -= 1
+            if not self.count_of_counts[old]:
+                del self.count_of_counts[old]
+        if new:
+            self.count_of_counts[new] = self.count_of_counts.get(new, 0) + 1
+        self.sum_of_squares += new * new - old * old
+
+    # Add a single posting
+    def add(self, entry):
+        org = entry['organisaatio']
+        count = self.org_counts.get(org, 0)
+        self.org_counts[org] = count + 1
+        self._move_org(count, count + 1)
+        title = entry['tyotehtava']
+        self.title_counts[title] = self.title_counts.get(title, 0) + 1
+        titles = self.org_titles.setdefault(org, {})
+        titles[title] = titles.get(title, 0) + 1
+        field_titles = self.org_field_titles.setdefault(org, {}).setdefault(entry.get('ammattiala'), {})
+        field_titles[title] = field_titles.get(title, 0) + 1
+        self.total += 1
+
+    # Decrease a count in a nested counter, dropping the dicts that become empty
+    @staticmethod
+    def _decrement(counter, keys):
+        *outer, last = keys
+        path = [counter]
+        for key in outer:
+            path.append(path[-1][key])
+        path[-1][last] -= 1
+        if path[-1][last]:
+            return
+        del path[-1][last]
+        for parent, key in zip(reversed(path[:-1]), reversed(outer)):
+            if parent[key]:
+                break
+            del parent[key]
+
+    # Remove a single posting that was added before
+    def remove(self, entry):
+        org = entry['organisaatio']
+        title = entry['tyotehtava']
+        field = entry.get('ammattiala')
+        if title not in self.org_field_titles.get(org, {}).get(field, {}):
+            raise KeyError(f"Posting was never added: {org} / {title}")
+        count = self.org_counts[org]
+        self._move_org(count, count - 1)
+        if count == 1:
+            del self.org_counts[org]
+        else:
+            self.org_counts[org] = count - 1
+        if self.title_counts[title] == 1:
+            del self.title_counts[title]
+        else:
+            self.title_counts[title] -= 1
+        self._decrement(self.org_titles, (org, title))
+        self._decrement(self.org_field_titles, (org, field, title))
+        self.total -= 1
+
+    # Apply the changes returned by JobFeedClient.fetch()
+    def apply_changes(self, changes):
+        for entry in changes['removed'] + changes.get('replaced', []):
+            self.remove(entry)
+        for entry in changes['added'] + changes['changed']:
+            self.add(entry)
+
+    # Same result as calculate_summary_statistics
+    def summary(self):
+        max_org = max(self.org_counts, key=self.org_counts.get) if self.org_counts else None
+        max_title = max(self.title_counts, key=self.title_counts.get) if self.title_counts else None
+        return {
+            'most_common_organization': max_org,
+            'most_common_job_title': max_title
+        }
+
+    # Same result as job_posting_analysis
+    # The variance is computed from the integer total and sum of squares, so it stays exact
+    # however many postings are added and removed.
+    def analysis(self):
+        orgs = len(self.org_counts)
+        if orgs == 0:
+            average = stddev = 0
+            min_val = max_val = 0
+        else:
+            average = self.total / orgs
+            variance = (orgs * self.sum_of_squares - self.total * self.total) / (orgs * orgs)
+            stddev = variance ** 0.5
+            min_val = min(self.count_of_counts)
+            max_val = max(self.count_of_counts)
+        return {
+            'total_postings': self.total,
+            'average': average,
+            'min': min_val,
+            'max': max_val,
+            'stddev': stddev,
+            'organization_counter': dict(self.org_counts)
+        }
+
+    # Job titles of one organisation and their counts, like filter_and_count_job_titles
+    # With ammattiala, only the postings of that field count.
+    def job_titles(self, org, ammattiala=None):
+        if ammattiala is None:
+            return dict(self.org_titles.get(org, {}))
+        return dict(self.org_field_titles.get(org, {}).get(ammattiala, {}))
+
+    # Job titles of every organisation: {organisation: {title: count}}
+    # With by_field=True: {organisation: {ammattiala: {title: count}}}
+    def title_breakdown(self, by_field=False):
+        if by_field:
+            return {org: {field: dict(titles) for field, titles in fields.items()}
+                    for org, fields in self.org_field_titles.items()}
+        return {org: dict(titles) for org, titles in self.org_titles.items()}
@@ -1,17 +1,23 @@
+import json
 import pytest
 import sys
 
 from pathlib import Path
 from datetime import datetime, timedelta
-sys.path.append(str(Path(__file__).resolve().parents[1]))
+sys.path.append(str(Path(__file__).resolve().parents[2]))
 
-from src.data_analysis import (
+from project.src.data_analysis import (
+    load_json,
     count_entries,
     calculate_summary_statistics,
     job_posting_analysis,
     filter_and_count_job_titles,
-    check_application_deadlines
+    check_application_deadlines,
+    count_job_titles_by_organization,
+    write_job_listing,
+    write_title_breakdown
 )
+from project.src.job_stats import JobPostingStats
 
 
 # Sample mock data for tests
@@ -43,6 +49,14 @@ sample_data = [
 def test_count_entries():
     assert count_entries(sample_data) == 4
 
+def test_load_json_local_file_with_cache(tmp_path):
+    filename = tmp_path / "data.json"
+    filename.write_text(json.dumps(sample_data))
+
+    assert load_json(str(filename), use_cache=True) == sample_data
+    assert load_json("file://" + str(filename), use_cache=True) == sample_data
+    assert (tmp_path / ".cache").is_dir()
+
 def test_calculate_summary_statistics():
     stats = calculate_summary_statistics(sample_data)
     assert stats['most_common_organization'] == "Org A"
@@ -60,6 +74,36 @@ def test_filter_and_count_job_titles():
     counts = filter_and_count_job_titles(sample_data, "Org A")
     assert counts == {"Teacher": 2}
 
+def test_job_title_counts_from_shared_stats():
+    data = [dict(entry, ammattiala="Opetusala") for entry in sample_data]
+    stats = JobPostingStats(data)
+    assert filter_and_count_job_titles(data, "Org A", ammattiala="Opetusala", stats=stats) == {"Teacher": 2}
+    assert filter_and_count_job_titles(data, "Org A", ammattiala="Hoitoala", stats=stats) == {}
+    assert filter_and_count_job_titles(data, "Org X", stats=stats) == {}
+    assert calculate_summary_statistics(data, stats) == calculate_summary_statistics(data)
+    assert job_posting_analysis(data, stats) == job_posting_analysis(data)
+
+    # Without stats the data is counted again on every call, so changes in place are seen
+    data[0]["tyotehtava"] = "Principal"
+    data.append({"organisaatio": "Org A", "ammattiala": "Hoitoala", "tyotehtava": "Nurse"})
+    assert filter_and_count_job_titles(data, "Org A") == {"Principal": 1, "Teacher": 1, "Nurse": 1}
+    assert filter_and_count_job_titles(data, "Org A", ammattiala="Hoitoala") == {"Nurse": 1}
+    assert count_job_titles_by_organization(data, by_field=True)["Org A"] == {
+        "Opetusala": {"Principal": 1, "Teacher": 1}, "Hoitoala": {"Nurse": 1}
+    }
+    # Shared stats follow the changes they are told about
+    stats.remove(sample_data[0] | {"ammattiala": "Opetusala"})
+    stats.add(data[0])
+    stats.add(data[-1])
+    assert filter_and_count_job_titles(data, "Org A", stats=stats) == filter_and_count_job_titles(data, "Org A")
+
+def test_write_title_breakdown(tmp_path):
+    output_file = tmp_path / "titles.csv"
+    assert write_title_breakdown(sample_data, str(output_file), "csv") == 3
+    assert output_file.read_text().splitlines() == [
+        "Organization,Job Title,Count", "Org A,Teacher,2", "Org B,Assistant,1", "Org C,Principal,1"
+    ]
+
 def test_check_application_deadlines():
     results = check_application_deadlines(sample_data)
     assert results['expired_count'] == 1
@@ -67,4 +111,11 @@ def test_check_application_deadlines():
     assert len(results['expired_postings']) == 1
     assert len(results['open_postings']) == 2
     
+def test_write_job_listing(tmp_path):
+    output_file = tmp_path / "open_jobs.jsonl"
+    postings = (entry for entry in sample_data if entry['organisaatio'] == "Org A")
+    assert write_job_listing(postings, str(output_file), "jsonl") == 2
+    rows = [json.loads(line) for line in output_file.read_text().splitlines()]
+    assert rows[0]['tyotehtava'] == "Teacher"
+
 # Run the tests with this on root terminal pytest -v project/test/test_data_analysis.py     
\ No newline at end of file
@@ -0,0 +1,109 @@
+import pytest
+import sys
+
+from pathlib import Path
+from datetime import datetime
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from project.src.data_analysis import archive_postings
+from project.src.job_archive import PostingArchive, timestamp
+from project.src.job_record import compact_postings
+
+# Three fetches of the feed, one week apart
+week1 = [
+    {"id": 1, "organisaatio": "Org A", "ammattiala": "Opetus", "tyotehtava": "Teacher", "haku_paattyy_pvm": "2025-05-20"},
+    {"id": 2, "organisaatio": "Org B", "ammattiala": "Hoito", "tyotehtava": "Nurse", "haku_paattyy_pvm": "2025-05-05"},
+    {"id": 3, "organisaatio": "Org A", "ammattiala": "Opetus", "tyotehtava": "Assistant", "haku_paattyy_pvm": "soon"}
+]
+week2 = [
+    {"id": 1, "organisaatio": "Org A", "ammattiala": "Opetus", "tyotehtava": "Teacher", "haku_paattyy_pvm": "2025-05-30"},
+    {"id": 3, "organisaatio": "Org A", "ammattiala": "Opetus", "tyotehtava": "Assistant", "haku_paattyy_pvm": "soon"},
+    {"id": 4, "organisaatio": "Org B", "ammattiala": "Hoito", "tyotehtava": "Doctor", "haku_paattyy_pvm": "2025-06-01"}
+]
+week3 = [week2[2]]
+
+@pytest.fixture
+def archive():
+    archive = PostingArchive(":memory:")
+    assert archive.record_fetch(week1, datetime(2025, 5, 1, 6)) == {"added": 3, "changed": 0, "removed": 0, "unchanged": 0}
+    assert archive.record_fetch(week2, datetime(2025, 5, 8, 6)) == {"added": 1, "changed": 1, "removed": 1, "unchanged": 1}
+    assert archive.record_fetch(week3, datetime(2025, 5, 15, 6)) == {"added": 0, "changed": 0, "removed": 2, "unchanged": 1}
+    yield archive
+    archive.close()
+
+def test_snapshot_and_history(archive):
+    assert archive.snapshot("2025-05-01T12:00:00") == week1
+    assert archive.snapshot(datetime(2025, 5, 9)) == week2
+    assert archive.snapshot("2025-04-30T00:00:00") == []
+    history = archive.history(1)
+    assert [(version, fetched_at) for version, fetched_at, _ in history] == [
+        (1, "2025-05-01T06:00:00"), (2, "2025-05-08T06:00:00"), (3, "2025-05-15T06:00:00")
+    ]
+    assert history[1][2]["haku_paattyy_pvm"] == "2025-05-30" and history[2][2] is None
+    assert [fetch["removed"] for fetch in archive.fetches()] == [0, 1, 2]
+
+def test_open_on(archive):
+    # Posting 3 has no valid deadline, so it is never open
+    assert [entry["id"] for entry in archive.open_on("2025-05-02")] == [1, 2]
+    assert [entry["id"] for entry in archive.open_on("2025-05-05")] == [1]
+    assert [entry["id"] for entry in archive.open_on("2025-05-10")] == [1, 4]
+    assert [entry["id"] for entry in archive.open_on("2025-05-10", organisaatio="Org B")] == [4]
+    assert [entry["id"] for entry in archive.open_on("2025-05-20", ammattiala="Hoito")] == [4]
+
+def test_time_to_fill_and_weekly_volume(archive):
+    assert archive.time_to_fill() == {
+        "Org A": {"count": 2, "average_days": 14.0, "median_days": 14.0, "min_days": 14.0, "max_days": 14.0},
+        "Org B": {"count": 1, "average_days": 7.0, "median_days": 7.0, "min_days": 7.0, "max_days": 7.0}
+    }
+    assert list(archive.time_to_fill(group_by="tyotehtava")) == ["Assistant", "Nurse", "Teacher"]
+    assert archive.weekly_volume() == {"2025-W18": 3, "2025-W19": 1}
+    assert archive.weekly_volume(group_by="organisaatio") == {
+        ("2025-W18", "Org A"): 2, ("2025-W18", "Org B"): 1, ("2025-W19", "Org B"): 1
+    }
+    with pytest.raises(ValueError):
+        archive.weekly_volume(group_by="osoite")
+
+def test_reappearing_posting(archive):
+    assert archive.record_fetch(week1, "2025-05-22T06:00:00") == {"added": 3, "changed": 0, "removed": 1, "unchanged": 0}
+    assert archive.snapshot("2025-05-22T07:00:00") == week1
+    # Postings back in the feed are open again, so only the removed Doctor posting counts as filled
+    assert archive.time_to_fill() == {
+        "Org B": {"count": 1, "average_days": 14.0, "median_days": 14.0, "min_days": 14.0, "max_days": 14.0}
+    }
+    # A relisted posting starts a new listing, so the weeks it was gone are not counted
+    assert archive.record_fetch(week3, "2025-05-29T06:00:00")["removed"] == 3
+    assert archive.time_to_fill() == {
+        "Org A": {"count": 2, "average_days": 7.0, "median_days": 7.0, "min_days": 7.0, "max_days": 7.0},
+        "Org B": {"count": 1, "average_days": 7.0, "median_days": 7.0, "min_days": 7.0, "max_days": 7.0}
+    }
+    assert archive.weekly_volume() == {"2025-W21": 3, "2025-W22": 1}
+
+def test_older_fetch_is_refused(archive):
+    with pytest.raises(ValueError):
+        archive.record_fetch(week1, "2025-05-10T06:00:00")
+    assert len(archive.fetches()) == 3
+
+def test_timestamps_are_normalised(archive):
+    assert timestamp("2025-05-10") == "2025-05-10T00:00:00"
+    assert timestamp("2025-05-10T08:00:00.250Z") == timestamp("2025-05-10T11:00:00+03:00") == "2025-05-10T08:00:00"
+    with pytest.raises(ValueError):
+        timestamp("last week")
+    # A day is the end of it, so it includes the fetches made during the day
+    assert archive.snapshot("2025-05-01") == week1
+    assert archive.snapshot("2025-04-30") == []
+    archive.record_fetch(week1, "2025-05-22")
+    assert archive.fetches()[-1]["fetched_at"] == "2025-05-22T00:00:00"
+
+def test_empty_fetch_is_refused(archive):
+    with pytest.raises(ValueError):
+        archive.record_fetch([], datetime(2025, 5, 22))
+    assert archive.snapshot("2025-05-22") == [week3[0]]
+    assert archive.record_fetch([], datetime(2025, 5, 22), allow_empty=True)["removed"] == 1
+    assert archive.snapshot("2025-05-22") == []
+
+def test_archive_postings_file(tmp_path):
+    path = str(tmp_path / "archive.sqlite")
+    assert archive_postings(compact_postings(week1), path, "2025-05-01T06:00:00")["added"] == 3
+    assert archive_postings(week1, path, "2025-05-02T06:00:00")["unchanged"] == 3
+    with PostingArchive(path) as archive:
+        assert archive.snapshot("2025-05-02T07:00:00") == week1
@@ -0,0 +1,52 @@
+import pytest
+import sys
+
+from pathlib import Path
+from datetime import date
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from project.src.data_analysis import check_application_deadlines
+from project.src.job_deadlines import DeadlineClassifier, PostingView
+
+
+TODAY = date(2025, 5, 1)
+
+# Sample mock data for tests
+sample_data = [
+    {"tyotehtava": "Teacher", "haku_paattyy_pvm": "2025-05-02"},
+    {"tyotehtava": "Assistant", "haku_paattyy_pvm": "2025-04-30"},
+    {"tyotehtava": "Nurse", "haku_paattyy_pvm": "2025-05-01"},
+    {"tyotehtava": "Principal", "haku_paattyy_pvm": "2025-5-20"},
+    {"tyotehtava": "Cook", "haku_paattyy_pvm": "soon"},
+    {"tyotehtava": "Driver", "haku_paattyy_pvm": None},
+    {"tyotehtava": "Cleaner", "haku_paattyy_pvm": "2025-07-01"}
+]
+
+def test_classify():
+    classifier = DeadlineClassifier(TODAY)
+    positions = classifier.classify(sample_data)
+    # A deadline of today has already expired
+    assert positions == {"expired": [1, 2], "open": [0, 3, 6], "invalid": [4]}
+    assert classifier.invalid == {"soon"}
+
+def test_each_deadline_parsed_once():
+    classifier = DeadlineClassifier(TODAY)
+    classifier.classify(sample_data * 100)
+    assert len(classifier.cache) == 6
+
+def test_bucket_by_days():
+    buckets = DeadlineClassifier(TODAY).bucket_by_days(sample_data, edges=(7, 30))
+    assert buckets == {"1-7": [0], "8-30": [3], "31+": [6]}
+
+def test_posting_view():
+    view = PostingView(sample_data, [0, 3])
+    assert len(view) == 2
+    assert view[1]["tyotehtava"] == "Principal"
+    assert [entry["tyotehtava"] for entry in view] == ["Teacher", "Principal"]
+    assert len(view[:1]) == 1
+
+def test_check_application_deadlines_reports_invalid_once(capsys):
+    results = check_application_deadlines(sample_data + sample_data, today=TODAY)
+    assert results["expired_count"] == 4
+    assert results["open_count"] == 6
+    assert capsys.readouterr().out.count("soon") == 1
@@ -0,0 +1,107 @@
+import json
+import pytest
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from project.src.job_feed import JobFeedClient, diff_postings
+
+
+# Local stand-in for the job feed: serves FeedHandler.postings with an ETag
+class FeedHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    postings = []
+    version = 1
+    clients = set()
+    statuses = []
+
+    def do_GET(self):
+        FeedHandler.clients.add(self.client_address)
+        etag = f'"v{FeedHandler.version}"'
+        if self.headers.get("If-None-Match") == etag:
+            FeedHandler.statuses.append(304)
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = json.dumps(FeedHandler.postings).encode("utf-8")
+        FeedHandler.statuses.append(200)
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def feed_url():
+    FeedHandler.postings = [
+        {"id": 1, "organisaatio": "Org A", "tyotehtava": "Teacher"},
+        {"id": 2, "organisaatio": "Org B", "tyotehtava": "Assistant"}
+    ]
+    FeedHandler.version = 1
+    FeedHandler.clients = set()
+    FeedHandler.statuses = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FeedHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/rest/tyopaikat/v1/kaikki"
+    server.shutdown()
+    server.server_close()
+
+def test_diff_postings():
+    old = {"1": {"id": 1, "a": 1}, "2": {"id": 2, "a": 1}}
+    new = {"2": {"id": 2, "a": 2}, "3": {"id": 3, "a": 1}}
+    added, changed, replaced, removed = diff_postings(old, new)
+    assert added == [{"id": 3, "a": 1}]
+    assert changed == [{"id": 2, "a": 2}]
+    assert replaced == [{"id": 2, "a": 1}]
+    assert removed == [{"id": 1, "a": 1}]
+
+def test_not_modified_and_delta(feed_url):
+    with JobFeedClient(feed_url) as client:
+        first = client.fetch()
+        assert len(first["added"]) == 2
+
+        second = client.fetch()
+        assert second["not_modified"]
+        assert len(client.data()) == 2
+
+        FeedHandler.postings = [
+            {"id": 2, "organisaatio": "Org B", "tyotehtava": "Principal"},
+            {"id": 3, "organisaatio": "Org C", "tyotehtava": "Nurse"}
+        ]
+        FeedHandler.version = 2
+        third = client.fetch()
+        assert [entry["id"] for entry in third["added"]] == [3]
+        assert [entry["id"] for entry in third["changed"]] == [2]
+        assert [entry["id"] for entry in third["removed"]] == [1]
+
+    assert FeedHandler.statuses == [200, 304, 200]
+    # All three requests went over the same connection
+    assert len(FeedHandler.clients) == 1
+
+def test_snapshot_survives_restart(feed_url, tmp_path):
+    snapshot_file = str(tmp_path / "snapshot.json")
+    with JobFeedClient(feed_url, snapshot_file) as client:
+        client.fetch()
+
+    with JobFeedClient(feed_url, snapshot_file) as client:
+        assert len(client.data()) == 2
+        assert client.fetch()["not_modified"]
+
+def test_load_json_sources(feed_url):
+    from project.src.data_analysis import load_json_sources
+    from project.src.job_record import JobPosting
+    data = load_json_sources({"vantaa": feed_url, "missing": feed_url.replace("http://", "ftp://")}, compact=True)
+    assert data["missing"] is None
+    assert all(isinstance(entry, JobPosting) for entry in data["vantaa"])
+    assert data["vantaa"] == FeedHandler.postings
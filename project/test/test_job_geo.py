@@ -0,0 +1,66 @@
+import pytest
+import sys
+
+from pathlib import Path
+from datetime import date
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from project.src.data_analysis import find_jobs_near
+from project.src.job_geo import GeoGridIndex, haversine_km, haversine_many
+
+# Helsinki railway station
+CENTRE = (24.9414, 60.1719)
+
+# Sample mock data for tests
+sample_data = [
+    {"organisaatio": "Org A", "tyotehtava": "Teacher", "haku_paattyy_pvm": "2025-06-01", "x": 24.9414, "y": 60.1719},
+    {"organisaatio": "Org B", "tyotehtava": "Nurse", "haku_paattyy_pvm": "2025-04-01", "x": 24.9600, "y": 60.1750},
+    {"organisaatio": "Org A", "tyotehtava": "Cook", "haku_paattyy_pvm": "2025-06-01", "x": 25.0400, "y": 60.2900},
+    {"organisaatio": "Org B", "tyotehtava": "Driver", "haku_paattyy_pvm": "2025-06-01", "x": 24.9300, "y": 60.1650},
+    {"organisaatio": "Org A", "tyotehtava": "Cleaner", "haku_paattyy_pvm": "2025-06-01", "x": None, "y": None}
+]
+
+def test_haversine():
+    # Helsinki - Tampere is about 160 km
+    assert haversine_km(24.9414, 60.1719, 23.7610, 61.4978) == pytest.approx(160, abs=2)
+    assert haversine_km(*CENTRE, *CENTRE) == 0
+    distances = haversine_many(*CENTRE, [24.9600, 25.0400], [60.1750, 60.2900])
+    assert distances == pytest.approx([haversine_km(*CENTRE, 24.96, 60.175), haversine_km(*CENTRE, 25.04, 60.29)])
+
+def test_within_radius():
+    index = GeoGridIndex(sample_data, cell_km=0.5)
+    assert len(index) == 4
+    assert index.missing == [4]
+    found = index.within_radius(*CENTRE, 2)
+    assert [position for position, _ in found] == [0, 3, 1]
+    assert found[0][1] == 0
+    assert all(distance <= 2 for _, distance in found)
+    # The same result as checking the distance of every posting
+    for radius in (0.5, 1, 5, 20, 500):
+        expected = sorted(
+            position for position, entry in enumerate(sample_data[:4])
+            if haversine_km(*CENTRE, entry["x"], entry["y"]) <= radius
+        )
+        assert sorted(position for position, _ in index.within_radius(*CENTRE, radius)) == expected
+
+def test_within_bbox_and_among():
+    index = GeoGridIndex(sample_data)
+    assert index.within_bbox(24.90, 60.16, 24.97, 60.18) == [0, 1, 3]
+    assert index.within_bbox(24.90, 60.16, 24.97, 60.18, among=[1, 2]) == [1]
+    assert index.count_within_radius([CENTRE, (25.04, 60.29)], 1) == [2, 1]
+
+def test_cell_and_district_counts():
+    index = GeoGridIndex(sample_data, cell_km=50)
+    assert sum(index.cell_counts().values()) == 4
+    assert sum(index.cell_counts(among=[0, 4]).values()) == 1
+    districts = {"Centre": (24.90, 60.16, 24.97, 60.18), "North": (25.0, 60.25, 25.1, 60.35)}
+    assert index.district_counts(districts) == {"Centre": 3, "North": 1}
+
+def test_find_jobs_near_with_filters():
+    today = date(2025, 5, 1)
+    near = find_jobs_near(sample_data, *CENTRE, 2, today=today)
+    assert [entry["tyotehtava"] for entry in near] == ["Teacher", "Driver", "Nurse"]
+    near = find_jobs_near(sample_data, *CENTRE, 2, open_only=True, today=today)
+    assert [entry["tyotehtava"] for entry in near] == ["Teacher", "Driver"]
+    near = find_jobs_near(sample_data, *CENTRE, 50, org_name="Org A", open_only=True, today=today)
+    assert [entry["tyotehtava"] for entry in near] == ["Teacher", "Cook"]
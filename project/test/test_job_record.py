@@ -0,0 +1,95 @@
+import json
+import os
+import pickle
+import pytest
+import sys
+
+from pathlib import Path
+from datetime import date
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from project.src.data_analysis import (calculate_summary_statistics, check_application_deadlines,
+                                       filter_and_count_job_titles, job_posting_analysis, load_json,
+                                       write_job_listing)
+from project.src.job_record import JobPosting, compact_postings
+
+URL = "https://vantaa.rekrytointi.com/paikat/?o=A_RJ&jgid=1&jid="
+
+# Sample mock data for tests
+sample_data = [
+    {"id": 1, "organisaatio": "Org A", "ammattiala": "Opetus", "tyotehtava": "Teacher", "tyoavain": URL + "1",
+     "osoite": "", "haku_paattyy_pvm": "2025-05-02", "x": 25.0, "y": 60.3, "linkki": URL + "1"},
+    {"id": 2, "organisaatio": "Org B", "ammattiala": "Hoito", "tyotehtava": "Nurse", "tyoavain": URL + "2",
+     "osoite": "", "haku_paattyy_pvm": "2025-04-30", "x": 25.1, "y": 60.2, "linkki": URL + "2b"},
+    {"id": 3, "organisaatio": "Org A", "ammattiala": "Opetus", "tyotehtava": "Teacher", "tyoavain": URL + "3",
+     "osoite": "", "haku_paattyy_pvm": "soon", "x": 25.2, "y": 60.1, "linkki": URL + "3", "lisatieto": "x"}
+]
+
+def test_record_reads_like_dict():
+    first, second, third = compact_postings(sample_data)
+    assert first["organisaatio"] == "Org A"
+    assert first.haku_paattyy_pvm == date(2025, 5, 2)
+    assert first["linkki"] == URL + "1" and second["linkki"] == URL + "2b"
+    assert third["haku_paattyy_pvm"] == "soon"
+    assert third.get("lisatieto") == "x" and "lisatieto" in third
+    assert first.get("missing", "default") == "default" and "missing" not in first
+    with pytest.raises(KeyError):
+        first["missing"]
+    assert [posting.to_dict() for posting in (first, second, third)] == sample_data
+    assert first == sample_data[0] and list(first) == list(sample_data[0])
+
+def test_shared_values():
+    first, _, third = compact_postings(json.loads(json.dumps(sample_data)))
+    assert first.organisaatio is third.organisaatio
+    assert first.ammattiala is third.ammattiala
+    again = compact_postings([sample_data[0], dict(sample_data[0], id=4)])
+    assert again[0].haku_paattyy_pvm is again[1].haku_paattyy_pvm
+
+def test_missing_fields_and_pickle():
+    posting = JobPosting.from_dict({"organisaatio": "Org A", "linkki": URL})
+    assert "tyoavain" not in posting and posting["linkki"] == URL
+    assert posting.keys() == ["organisaatio", "linkki"]
+    restored = pickle.loads(pickle.dumps(posting))
+    assert restored == posting and "tyoavain" not in restored
+    # linkki that is the same as tyoavain is still resolved after pickling
+    same = pickle.loads(pickle.dumps(compact_postings(sample_data)[0]))
+    assert same["linkki"] == URL + "1" and same == sample_data[0]
+
+def test_load_json_compact(tmp_path):
+    path = tmp_path / "data.json"
+    path.write_text(json.dumps(sample_data))
+    plain = load_json(str(path))
+    compact = load_json(str(path), compact=True)
+    assert all(isinstance(entry, JobPosting) for entry in compact)
+    assert compact == plain
+    # The cached compact snapshot is kept apart from the plain one
+    assert load_json(str(path), use_cache=True) == plain
+    cached = load_json(str(path), use_cache=True, compact=True)
+    assert isinstance(cached[0], JobPosting) and cached == plain
+    assert isinstance(load_json(str(path), use_cache=True)[0], dict)
+
+def test_compact_snapshot_holds_plain_values(tmp_path):
+    path = tmp_path / "data.json"
+    path.write_text(json.dumps(sample_data))
+    load_json(str(path), use_cache=True, compact=True)
+    snapshot = next(name for name in os.listdir(tmp_path / ".cache") if name.endswith(".pickle"))
+    # Readable without importing job_record, so any entry point can use it
+    rows = pickle.loads((tmp_path / ".cache" / snapshot).read_bytes())
+    assert all(type(row) is dict for row in rows)
+    assert rows[0]["haku_paattyy_pvm"] == date(2025, 5, 2)
+    cached = load_json(str(path), use_cache=True, compact=True)
+    assert all(isinstance(entry, JobPosting) for entry in cached) and cached == sample_data
+
+def test_analysis_functions_accept_records(tmp_path):
+    compact = compact_postings(sample_data)
+    assert calculate_summary_statistics(compact) == calculate_summary_statistics(sample_data)
+    assert job_posting_analysis(compact) == job_posting_analysis(sample_data)
+    assert filter_and_count_job_titles(compact, "Org A") == {"Teacher": 2}
+    jobs = check_application_deadlines(compact, today=date(2025, 5, 1))
+    assert (jobs["expired_count"], jobs["open_count"]) == (1, 1)
+
+    write_job_listing(compact, tmp_path / "compact.txt")
+    write_job_listing(sample_data, tmp_path / "plain.txt")
+    assert (tmp_path / "compact.txt").read_text() == (tmp_path / "plain.txt").read_text()
+    write_job_listing(compact, tmp_path / "compact.jsonl", fmt="jsonl")
+    assert json.loads((tmp_path / "compact.jsonl").read_text().splitlines()[0])["haku_paattyy_pvm"] == "2025-05-02"
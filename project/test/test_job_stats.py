@@ -0,0 +1,75 @@
+import pytest
+import sys
+
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from project.src.data_analysis import job_posting_analysis
+from project.src.job_stats import JobPostingStats
+
+
+# Sample mock data for tests
+sample_data = [
+    {"id": 1, "organisaatio": "Org A", "tyotehtava": "Teacher"},
+    {"id": 2, "organisaatio": "Org B", "tyotehtava": "Assistant"},
+    {"id": 3, "organisaatio": "Org A", "tyotehtava": "Teacher"},
+    {"id": 4, "organisaatio": "Org C", "tyotehtava": "Principal"},
+    {"id": 5, "organisaatio": "Org A", "tyotehtava": "Nurse"}
+]
+
+def test_summary():
+    stats = JobPostingStats(sample_data)
+    assert stats.summary() == {
+        'most_common_organization': "Org A",
+        'most_common_job_title': "Teacher"
+    }
+
+def test_add_and_remove_match_full_recompute():
+    stats = JobPostingStats(sample_data)
+    stats.remove(sample_data[0])
+    stats.add({"id": 6, "organisaatio": "Org B", "tyotehtava": "Nurse"})
+    current = sample_data[1:] + [{"id": 6, "organisaatio": "Org B", "tyotehtava": "Nurse"}]
+
+    expected = job_posting_analysis(current)
+    analysis = stats.analysis()
+    assert analysis['stddev'] == pytest.approx(expected['stddev'])
+    for key in ('total_postings', 'average', 'min', 'max', 'organization_counter'):
+        assert analysis[key] == expected[key]
+
+def test_apply_changes():
+    stats = JobPostingStats(sample_data[:2])
+    stats.apply_changes({
+        "added": [sample_data[3]],
+        "changed": [{"id": 2, "organisaatio": "Org B", "tyotehtava": "Principal"}],
+        "replaced": [sample_data[1]],
+        "removed": [sample_data[0]]
+    })
+    assert stats.title_counts == {"Principal": 2}
+    assert stats.analysis()['organization_counter'] == {"Org B": 1, "Org C": 1}
+
+def test_job_titles_by_organization():
+    stats = JobPostingStats(sample_data + [{"id": 6, "organisaatio": "Org A", "ammattiala": "Hoitoala",
+                                            "tyotehtava": "Nurse"}])
+    assert stats.job_titles("Org A") == {"Teacher": 2, "Nurse": 2}
+    assert stats.job_titles("Org A", ammattiala="Hoitoala") == {"Nurse": 1}
+    assert stats.title_breakdown()["Org B"] == {"Assistant": 1}
+    assert stats.title_breakdown(by_field=True)["Org A"] == {None: {"Teacher": 2, "Nurse": 1}, "Hoitoala": {"Nurse": 1}}
+
+    # Removing the last posting of an organisation removes it from the breakdown
+    stats.remove(sample_data[3])
+    stats.remove({"id": 6, "organisaatio": "Org A", "ammattiala": "Hoitoala", "tyotehtava": "Nurse"})
+    assert "Org C" not in stats.title_breakdown()
+    assert stats.title_breakdown(by_field=True)["Org A"] == {None: {"Teacher": 2, "Nurse": 1}}
+    # A title the organisation never posted cannot be removed
+    with pytest.raises(KeyError):
+        stats.remove({"organisaatio": "Org B", "tyotehtava": "Teacher"})
+
+def test_remove_unknown_posting():
+    stats = JobPostingStats(sample_data)
+    with pytest.raises(KeyError):
+        stats.remove({"organisaatio": "Org X", "tyotehtava": "Teacher"})
+
+def test_empty():
+    analysis = JobPostingStats().analysis()
+    assert analysis['total_postings'] == 0
+    assert analysis['organization_counter'] == {}